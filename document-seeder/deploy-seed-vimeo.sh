@@ -9,9 +9,15 @@ REGION=europe-west1  # choose your region
 gcloud builds submit --tag "${IMAGE}"
 
 # Deploy (allow unauthenticated if you want to call from Vercel/N8N)
+# Job state and logs live in the instance's /tmp, so exactly one instance runs:
+# a second would 404 on /jobs/<id> for jobs queued on the first, and scaling
+# to zero would drop the queue and every job's status.
 gcloud run deploy "${SERVICE_NAME}" \
   --image "${IMAGE}" \
   --region "${REGION}" \
   --platform managed \
   --allow-unauthenticated \
+  --no-cpu-throttling \
+  --min-instances=1 \
+  --max-instances=1 \
   --set-env-vars "SUPABASE_URL=${SUPABASE_URL},SUPABASE_SERVICE_ROLE_KEY=${SUPABASE_SERVICE_ROLE_KEY},OPENAI_API_KEY=${OPENAI_API_KEY}"
@@ -0,0 +1,282 @@
+import base64
+import os
+import re
+import shutil
+import subprocess
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from .knowledge_store import insert_knowledge_rows
+    from .word_index import WordIndex
+except ImportError:
+    from knowledge_store import insert_knowledge_rows
+    from word_index import WordIndex
+
+DEDUPE_ENABLED = os.environ.get("SEEDER_AUDIO_DEDUPE", "1").lower() in ("1", "true", "yes")
+# How much of the start of each file is fingerprinted and stored
+FINGERPRINT_SECONDS = int(os.environ.get("AUDIO_FINGERPRINT_SECONDS", "120"))
+# The probe slid across a candidate, taken from a little way in to get past idents
+PROBE_OFFSET_SECONDS = 30
+PROBE_SECONDS = 20
+SAMPLE_RATE = 8000
+FRAME_SIZE = 2048
+HOP_SIZE = 1000
+BAND_EDGES_HZ = (300, 2000)
+BANDS = 33
+# Bit error rate below which two probes are the same recording (unrelated audio sits near 0.5)
+MATCH_BIT_ERROR_RATE = 0.35
+# Re-uploads differ by intros and ad slots, so durations are only loosely compared
+DURATION_TOLERANCE_SECONDS = 180
+DURATION_TOLERANCE_RATIO = 0.1
+CANDIDATE_LIMIT = 50
+CLONE_PAGE_SIZE = 200
+
+FRAMES_PER_SECOND = SAMPLE_RATE / HOP_SIZE
+
+
+class AudioFingerprint:
+    """
+    Philips-style sub-fingerprints: one 32-bit code per 125ms frame, each bit the
+    sign of an energy difference between adjacent bands across adjacent frames.
+    Robust to re-encoding, bitrate and loudness changes; about 4KB for two minutes.
+    """
+
+    def __init__(self, codes, duration: float):
+        self.codes = codes
+        self.duration = duration
+
+    def encode(self) -> str:
+        return base64.b64encode(self.codes.astype("<u4").tobytes()).decode("ascii")
+
+    @classmethod
+    def decode(cls, payload: str, duration: float) -> "AudioFingerprint":
+        return cls(np.frombuffer(base64.b64decode(payload), dtype="<u4"), duration)
+
+    def probe_start(self) -> int:
+        start = int(PROBE_OFFSET_SECONDS * FRAMES_PER_SECOND)
+        length = int(PROBE_SECONDS * FRAMES_PER_SECOND)
+        if len(self.codes) < start + length:
+            start = max(0, len(self.codes) - length)
+        return start
+
+    def probe(self):
+        start = self.probe_start()
+        return self.codes[start:start + int(PROBE_SECONDS * FRAMES_PER_SECOND)]
+
+    def best_alignment(self, other: "AudioFingerprint") -> tuple[float, float]:
+        """
+        (BER, shift) for the best alignment of either probe against the other's
+        codes; shift is the seconds added to a time in other to reach the same
+        audio in self, e.g. 7.0 when self has 7s more intro.
+        """
+        rate, index = _slide(self.probe(), other.codes)
+        other_rate, other_index = _slide(other.probe(), self.codes)
+        if rate <= other_rate:
+            return rate, (self.probe_start() - index) / FRAMES_PER_SECOND
+        return other_rate, (other_index - other.probe_start()) / FRAMES_PER_SECOND
+
+    def best_bit_error_rate(self, other: "AudioFingerprint") -> float:
+        """Lowest BER over every alignment of either probe against the other's codes."""
+        return self.best_alignment(other)[0]
+
+
+def _slide(probe, codes) -> tuple[float, int]:
+    """(lowest BER, index into codes where it occurs) of probe slid across codes."""
+    if len(probe) == 0 or len(codes) < len(probe):
+        return 1.0, 0
+    windows = np.lib.stride_tricks.sliding_window_view(codes, len(probe))
+    diff = np.bitwise_xor(windows, probe[None, :])
+    errors = np.unpackbits(diff.view(np.uint8), axis=1).sum(axis=1)
+    index = int(errors.argmin())
+    return float(errors[index]) / (32 * len(probe)), index
+
+
+def _decode_pcm(path: str, seconds: int) -> bytes | None:
+    command = [
+        "ffmpeg", "-v", "error", "-t", str(seconds), "-i", path,
+        "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "-",
+    ]
+    result = subprocess.run(command, capture_output=True, timeout=120)
+    return result.stdout if result.returncode == 0 else None
+
+
+FFMPEG_DURATION_RE = re.compile(r"Duration: (\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+
+
+def _probe_duration(path: str) -> float | None:
+    if not shutil.which("ffprobe"):
+        # Slim ffmpeg builds ship without ffprobe; ffmpeg -i reports the same container duration
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-i", path], capture_output=True, text=True, timeout=30)
+        match = FFMPEG_DURATION_RE.search(result.stderr)
+        if not match:
+            return None
+        hours, minutes, seconds = match.groups()
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    command = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path]
+    result = subprocess.run(command, capture_output=True, text=True, timeout=30)
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        return None
+
+
+def _sub_fingerprints(pcm: bytes):
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+    if len(samples) < FRAME_SIZE * 2:
+        return None
+    frame_count = 1 + (len(samples) - FRAME_SIZE) // HOP_SIZE
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE][:frame_count]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SIZE), axis=1)) ** 2
+    freqs = np.fft.rfftfreq(FRAME_SIZE, 1 / SAMPLE_RATE)
+    edges = np.geomspace(BAND_EDGES_HZ[0], BAND_EDGES_HZ[1], BANDS + 1)
+    band_of_bin = np.digitize(freqs, edges) - 1
+    in_range = (band_of_bin >= 0) & (band_of_bin < BANDS)
+    energies = np.zeros((frame_count, BANDS), dtype=np.float64)
+    for band in range(BANDS):
+        energies[:, band] = spectrum[:, in_range & (band_of_bin == band)].sum(axis=1)
+    band_diff = energies[:, :-1] - energies[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    return np.packbits(bits, axis=1, bitorder="little").view("<u4").ravel()
+
+
+def fingerprint_file(path: str) -> AudioFingerprint | None:
+    """Fingerprint of the first FINGERPRINT_SECONDS of path; None when disabled or undecodable."""
+    if not DEDUPE_ENABLED or np is None or not shutil.which("ffmpeg"):
+        return None
+    try:
+        pcm = _decode_pcm(path, FINGERPRINT_SECONDS)
+        codes = _sub_fingerprints(pcm) if pcm else None
+        duration = _probe_duration(path)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"   ⚠️  Fingerprinting failed: {e}")
+        return None
+    if codes is None or duration is None:
+        return None
+    return AudioFingerprint(codes, duration)
+
+
+def _has_knowledge(supabase, document_id) -> bool:
+    response = supabase.table("provider_knowledge").select("id").eq("document_id", document_id).limit(1).execute()
+    return bool(response.data)
+
+
+def find_matching_document(supabase, fingerprint: AudioFingerprint | None, document_id=None) -> dict | None:
+    """
+    An already-seeded document with the same audio, or None. Only active
+    documents with knowledge rows count, and never document_id itself (the
+    document being seeded, which may hold a stale fingerprint from a re-seed).
+    The row's time_shift is the seconds its timestamps move by in the new audio.
+    """
+    if fingerprint is None:
+        return None
+    tolerance = max(DURATION_TOLERANCE_SECONDS, fingerprint.duration * DURATION_TOLERANCE_RATIO)
+    query = (
+        supabase.table("provider_documents")
+        .select("id, title, audio_fingerprint, audio_duration")
+        .eq("is_active", True)
+        .gte("audio_duration", fingerprint.duration - tolerance)
+        .lte("audio_duration", fingerprint.duration + tolerance)
+        .not_.is_("audio_fingerprint", "null")
+    )
+    if document_id is not None:
+        query = query.neq("id", document_id)
+    scored = []
+    for row in query.limit(CANDIDATE_LIMIT).execute().data or []:
+        candidate = AudioFingerprint.decode(row["audio_fingerprint"], row["audio_duration"])
+        rate, shift = fingerprint.best_alignment(candidate)
+        if rate < MATCH_BIT_ERROR_RATE:
+            scored.append((rate, {**row, "time_shift": shift}))
+    for rate, row in sorted(scored, key=lambda pair: pair[0]):
+        if _has_knowledge(supabase, row["id"]):
+            print(
+                f"   🔁 Audio matches document {row['id']} ('{row['title']}', "
+                f"BER {rate:.2f}, shifted {row['time_shift']:+.1f}s)."
+            )
+            return row
+    return None
+
+
+def save_fingerprint(supabase, document_id, fingerprint: AudioFingerprint | None) -> None:
+    """Stored last, once the document's knowledge is in place, so matches are always complete."""
+    if fingerprint is None:
+        return
+    supabase.table("provider_documents").update(
+        {"audio_fingerprint": fingerprint.encode(), "audio_duration": fingerprint.duration}
+    ).eq("id", document_id).execute()
+
+
+def _shift_metadata(metadata: dict, time_shift: float) -> dict:
+    shifted = dict(metadata)
+    for key in ("timestampStart", "timestampEnd"):
+        if key in shifted:
+            shifted[key] = max(0, int(round(shifted[key] + time_shift)))
+    return shifted
+
+
+def _shift_word_index(payload: dict, time_shift: float) -> dict | None:
+    """The word index with every time moved by time_shift, or None when it can't be read."""
+    index = WordIndex.decode(payload)
+    if not len(index):
+        return None
+    shift_ms = int(round(time_shift * 1000))
+    for i, time_ms in enumerate(index.times_ms):
+        index.times_ms[i] = max(0, time_ms + shift_ms)
+    return index.encode()
+
+
+def clone_document_knowledge(
+    supabase, source_document_id, document_id, provider_id, source_url, time_shift: float = 0.0
+) -> int:
+    """
+    Copies the matched document's chunks and embeddings (and word index) onto the
+    new document, so no transcription or embedding is repeated. Timestamps move
+    by time_shift (the match's), so a re-upload with a longer or shorter intro
+    still links each chunk to the right moment. Returns rows copied; raises
+    when there were none, so the new document isn't left empty.
+    """
+    copied = 0
+    start = 0
+    while True:
+        response = (
+            supabase.table("provider_knowledge")
+            .select("content, embedding, metadata")
+            .eq("document_id", source_document_id)
+            .order("id")
+            .range(start, start + CLONE_PAGE_SIZE - 1)
+            .execute()
+        )
+        rows = response.data or []
+        insert_knowledge_rows(supabase, [
+            {
+                "provider_id": provider_id,
+                "document_id": document_id,
+                "content": row["content"],
+                "embedding": row["embedding"],
+                "metadata": {**_shift_metadata(row.get("metadata") or {}, time_shift), "source": source_url},
+            }
+            for row in rows
+        ])
+        copied += len(rows)
+        if len(rows) < CLONE_PAGE_SIZE:
+            break
+        start += CLONE_PAGE_SIZE
+    if not copied:
+        raise ValueError(f"Document {source_document_id} has no chunks to reuse")
+    source = (
+        supabase.table("provider_documents")
+        .select("word_index")
+        .eq("id", source_document_id)
+        .maybe_single()
+        .execute()
+    )
+    word_index = (getattr(source, "data", None) or {}).get("word_index")
+    if word_index and time_shift:
+        word_index = _shift_word_index(word_index, time_shift)
+    if word_index:
+        supabase.table("provider_documents").update({"word_index": word_index}).eq("id", document_id).execute()
+    print(f"   ♻️  Reused {copied} chunks from document {source_document_id}.")
+    return copied
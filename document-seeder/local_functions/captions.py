@@ -0,0 +1,94 @@
+import json
+import re
+
+_TIMESTAMP_RE = re.compile(r"(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{1,3})")
+_CUE_TIMING_RE = re.compile(r"^\s*(\S+)\s+-->\s+(\S+)")
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def parse_timestamp(value: str) -> float | None:
+    """Seconds for a VTT (00:01.500, 01:02:03.500) or SRT (01:02:03,500) timestamp."""
+    match = _TIMESTAMP_RE.fullmatch(value.strip())
+    if not match:
+        return None
+    hours, minutes, seconds, fraction = match.groups()
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds) + int(fraction.ljust(3, "0")) / 1000
+
+
+def _clean_cue_text(lines: list[str]) -> str:
+    text = " ".join(_TAG_RE.sub("", line) for line in lines)
+    return _SPACE_RE.sub(" ", text).replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">").strip()
+
+
+def _parse_cues(text: str) -> list[dict]:
+    """
+    Shared cue walker for WebVTT and SRT: a timing line followed by text lines
+    up to a blank line. Headers, NOTE/STYLE blocks and cue ids are skipped.
+    """
+    segments = []
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    i = 0
+    while i < len(lines):
+        timing = _CUE_TIMING_RE.match(lines[i])
+        if not timing:
+            i += 1
+            continue
+        start, end = parse_timestamp(timing.group(1)), parse_timestamp(timing.group(2))
+        i += 1
+        body = []
+        while i < len(lines) and lines[i].strip():
+            body.append(lines[i])
+            i += 1
+        cue_text = _clean_cue_text(body)
+        if start is None or end is None or not cue_text:
+            continue
+        # Rolling auto-captions repeat the previous line; keep the text once
+        if segments and segments[-1]["text"] == cue_text:
+            segments[-1]["end"] = max(segments[-1]["end"], end)
+            continue
+        segments.append({"text": cue_text, "start": start, "end": end})
+    return segments
+
+
+def parse_webvtt(text: str) -> list[dict]:
+    """WebVTT cues as chunk_segments-compatible {"text", "start", "end"} dicts."""
+    return _parse_cues(text)
+
+
+def parse_srt(text: str) -> list[dict]:
+    return _parse_cues(text)
+
+
+def parse_transcript_json(payload) -> list[dict]:
+    """Podcasting 2.0 JSON transcripts: {"segments": [{"startTime", "endTime", "body"}]}."""
+    segments = []
+    for seg in (payload or {}).get("segments") or []:
+        text = (seg.get("body") or "").strip()
+        start, end = seg.get("startTime"), seg.get("endTime")
+        if not text or start is None:
+            continue
+        start = float(start)
+        segments.append({"text": text, "start": start, "end": float(end) if end is not None else start})
+    return segments
+
+
+# Formats that carry timings, best first; text/plain and text/html have none
+TIMED_TRANSCRIPT_TYPES = {
+    "application/json": "json",
+    "text/vtt": "vtt",
+    "application/x-subrip": "srt",
+    "application/srt": "srt",
+    "text/srt": "srt",
+}
+
+
+def parse_transcript(body, mime_type: str) -> list[dict]:
+    kind = TIMED_TRANSCRIPT_TYPES.get((mime_type or "").split(";")[0].strip().lower())
+    if kind == "json":
+        return parse_transcript_json(body if isinstance(body, dict) else json.loads(body))
+    if kind == "vtt":
+        return parse_webvtt(body)
+    if kind == "srt":
+        return parse_srt(body)
+    return []
@@ -0,0 +1,488 @@
+import math
+import os
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict
+
+import requests
+
+try:
+    from .clients import load_env, supabase
+    from .discovery_index import DiscoveryIndex
+    from .estimate import Estimate, estimate_requested
+    from .url_canonicalizer import normalize_url
+except ImportError:
+    from clients import load_env, supabase
+    from discovery_index import DiscoveryIndex
+    from estimate import Estimate, estimate_requested
+    from url_canonicalizer import normalize_url
+
+load_env()
+
+SUPABASE_URL = os.environ.get("SUPABASE_URL")
+SUPABASE_SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+VIMEO_ACCESS_TOKEN = os.environ.get("VIMEO_ACCESS_TOKEN") or os.environ.get("SEEDLEGALS_VIMEO_TOKEN")
+YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY")
+
+CHANNEL_WORKERS = int(os.environ.get("DISCOVERY_CHANNEL_WORKERS", "8"))
+DEFAULT_REQUESTS_PER_MINUTE = int(os.environ.get("DISCOVERY_REQUESTS_PER_MINUTE", "60"))
+UPSERT_BATCH_SIZE = 500
+# Workers of the seedvimeo run that seeds what discovery finds, for estimates
+SEED_WORKERS = int(os.environ.get("SEED_VIMEO_WORKERS", "1"))
+USER_AGENT = "DialogueVideoCollector/1.0"
+
+DEFAULT_PAGING = {
+    "per_page": int(os.environ.get("DISCOVERY_PER_PAGE", "100")),
+    "max_pages": int(os.environ.get("DISCOVERY_MAX_PAGES", "5")),
+    "backfill_max_pages": int(os.environ.get("DISCOVERY_BACKFILL_MAX_PAGES", "50")),
+    "workers": int(os.environ.get("DISCOVERY_PAGE_WORKERS", "4")),
+}
+
+# Built on first use
+SUPABASE_CLIENT = supabase if SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY else None
+
+
+class RateLimiter:
+    """Spaces out calls so one channel never exceeds its requests-per-minute budget."""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute and per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class PageFetcher:
+    """
+    Fetches numbered pages of one endpoint. Conditional requests reuse the ETags
+    from the channel's cursor; fresh ETags are collected for the caller to
+    persist once the run's results are stored.
+    """
+
+    def __init__(self, endpoint: str, headers: dict, per_page: int, etags: dict | None = None,
+                 limiter: RateLimiter | None = None, params: dict | None = None):
+        self.endpoint = endpoint
+        self.headers = headers
+        self.per_page = per_page
+        self.etags = etags or {}
+        self.limiter = limiter
+        self.params = params or {"sort": "date", "direction": "desc"}
+        self.fresh_etags: Dict[str, str] = {}
+
+    def __call__(self, page: int, conditional: bool = False):
+        """Returns (payload, unchanged)."""
+        params = {**self.params, "page": page, "per_page": self.per_page}
+        key = f"{self.endpoint}?page={page}&per_page={self.per_page}"
+        headers = dict(self.headers)
+        if conditional and self.etags.get(key):
+            headers["If-None-Match"] = self.etags[key]
+        if self.limiter:
+            self.limiter.wait()
+        response = requests.get(self.endpoint, headers=headers, params=params, timeout=15)
+        if response.status_code == 304:
+            return None, True
+        response.raise_for_status()
+        if response.headers.get("ETag"):
+            self.fresh_etags[key] = response.headers["ETag"]
+        return response.json(), False
+
+
+def walk_pages(fetch_page, parse_page, known_urls, label: str, max_pages: int, per_page: int) -> dict[str, dict]:
+    """
+    Walks newest-first pages until one is made up entirely of known URLs,
+    so a routine run that finds nothing new costs a single request.
+    """
+    videos: Dict[str, dict] = {}
+    for page in range(1, max_pages + 1):
+        payload, unchanged = fetch_page(page, known_urls is not None)
+        if unchanged:
+            print(f"  {label} page {page} unchanged since last run; stopping.")
+            break
+        entries = parse_page(payload)
+        if not entries:
+            break
+        videos.update(entries)
+        if known_urls is not None and all(normalize_url(url) in known_urls for url in entries):
+            print(f"  {label} page {page} contains only known videos; stopping.")
+            break
+        if len(entries) < per_page:
+            break
+    return videos
+
+
+def fetch_pages_concurrently(fetch_page, parse_page, total: int, paging: dict) -> dict[str, dict]:
+    """Backfill: every page up to the reported total, fetched in parallel."""
+    pages = min(paging["backfill_max_pages"], max(1, math.ceil(total / paging["per_page"])))
+    print(f"  Backfilling {total} videos across {pages} pages ({paging['workers']} concurrent)...")
+    videos: Dict[str, dict] = {}
+    with ThreadPoolExecutor(max_workers=paging["workers"]) as pool:
+        for payload, _ in pool.map(lambda page: fetch_page(page, False), range(1, pages + 1)):
+            videos.update(parse_page(payload) or {})
+    return videos
+
+
+def parse_vimeo_api_entries(data) -> dict[str, dict]:
+    videos: Dict[str, dict] = {}
+    for entry in data:
+        url = (entry.get("url") or entry.get("link") or "").strip()
+        if not url:
+            continue
+        title = entry.get("title") or entry.get("name") or "Untitled video"
+        cover = entry.get("thumbnail_large") or entry.get("thumbnail_medium") or entry.get("thumbnail_small")
+        videos[url] = {
+            "title": title,
+            "cover_image": cover,
+            "duration": entry.get("duration"),
+        }
+    return videos
+
+
+def parse_vimeo_authenticated_entries(data) -> dict[str, dict]:
+    videos: Dict[str, dict] = {}
+    for entry in data:
+        url = (entry.get("link") or "").strip()
+        if not url:
+            continue
+        title = entry.get("name") or entry.get("title") or "Untitled video"
+        pictures = entry.get("pictures", {})
+        cover = pictures.get("base_link") or pictures.get("sizes", [{}])[-1].get("link")
+        videos[url] = {
+            "title": title,
+            "cover_image": cover,
+            "duration": entry.get("duration"),
+        }
+    return videos
+
+
+def fetch_vimeo_public_videos(channel_id: str, known_urls=None, backfill: bool = False, etags: dict | None = None,
+                              limiter: RateLimiter | None = None, paging: dict = DEFAULT_PAGING):
+    """
+    Public v2 channel API. Returns (videos, fresh_etags); videos is None when the
+    API is unusable so callers can fall back, and {} when nothing new was found.
+    """
+    endpoint = f"https://vimeo.com/api/v2/channel/{channel_id}/videos.json"
+    headers = {"User-Agent": USER_AGENT}
+    fetch_page = PageFetcher(endpoint, headers, paging["per_page"], etags, limiter)
+
+    def parse_page(data):
+        return parse_vimeo_api_entries(data) if isinstance(data, list) else {}
+
+    try:
+        if backfill:
+            if limiter:
+                limiter.wait()
+            info = requests.get(f"https://vimeo.com/api/v2/channel/{channel_id}/info.json", headers=headers, timeout=15)
+            info.raise_for_status()
+            total = int(info.json().get("total_videos") or 0)
+            videos = fetch_pages_concurrently(fetch_page, parse_page, total, paging)
+        else:
+            videos = walk_pages(fetch_page, parse_page, known_urls, "API", paging["max_pages"], paging["per_page"])
+    except requests.exceptions.HTTPError as exc:
+        print(f"  API request failed (status={exc.response.status_code}): {exc}")
+        return None, {}
+    except requests.exceptions.RequestException as exc:
+        print(f"  API request failed: {exc}")
+        return None, {}
+    return videos, fetch_page.fresh_etags
+
+
+def fetch_vimeo_authenticated_videos(channel_id: str, token: str | None = VIMEO_ACCESS_TOKEN, known_urls=None,
+                                     backfill: bool = False, etags: dict | None = None,
+                                     limiter: RateLimiter | None = None, paging: dict = DEFAULT_PAGING):
+    """Authenticated v3 API; same contract as fetch_vimeo_public_videos. (None, {}) without a token."""
+    if not token:
+        return None, {}
+    endpoint = f"https://api.vimeo.com/channels/{channel_id}/videos"
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/vnd.vimeo.*+json;version=3.4",
+    }
+    fetch_page = PageFetcher(endpoint, headers, paging["per_page"], etags, limiter)
+
+    def parse_page(payload):
+        data = payload.get("data") if isinstance(payload, dict) else payload
+        return parse_vimeo_authenticated_entries(data) if isinstance(data, list) else {}
+
+    try:
+        if backfill:
+            first_page, _ = fetch_page(1, False)
+            total = first_page.get("total", 0) if isinstance(first_page, dict) else 0
+            videos = fetch_pages_concurrently(fetch_page, parse_page, total, paging)
+        else:
+            videos = walk_pages(fetch_page, parse_page, known_urls, "Auth API", paging["max_pages"], paging["per_page"])
+    except requests.exceptions.HTTPError as exc:
+        print(f"  Auth API request failed (status={exc.response.status_code}): {exc}")
+        return None, {}
+    except requests.exceptions.RequestException as exc:
+        print(f"  Auth API request failed: {exc}")
+        return None, {}
+    return videos, fetch_page.fresh_etags
+
+
+def _youtube_watch_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def fetch_youtube_feed_videos(channel_id: str, etags: dict | None = None, limiter: RateLimiter | None = None):
+    """Keyless fallback: the channel's Atom feed (latest ~15 uploads), fetched conditionally."""
+    endpoint = f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
+    headers = {"User-Agent": USER_AGENT}
+    if etags and etags.get(endpoint):
+        headers["If-None-Match"] = etags[endpoint]
+    if limiter:
+        limiter.wait()
+    try:
+        response = requests.get(endpoint, headers=headers, timeout=15)
+        if response.status_code == 304:
+            print("  YouTube feed unchanged since last run.")
+            return {}, {}
+        response.raise_for_status()
+    except requests.exceptions.RequestException as exc:
+        print(f"  YouTube feed request failed: {exc}")
+        return None, {}
+    ns = {
+        "atom": "http://www.w3.org/2005/Atom",
+        "yt": "http://www.youtube.com/xml/schemas/2015",
+        "media": "http://search.yahoo.com/mrss/",
+    }
+    videos: Dict[str, dict] = {}
+    for entry in ET.fromstring(response.content).findall("atom:entry", ns):
+        video_id = entry.findtext("yt:videoId", namespaces=ns)
+        if not video_id:
+            continue
+        thumbnail = entry.find("media:group/media:thumbnail", ns)
+        videos[_youtube_watch_url(video_id)] = {
+            "title": entry.findtext("atom:title", default="Untitled video", namespaces=ns),
+            "cover_image": thumbnail.get("url") if thumbnail is not None else None,
+        }
+    fresh = {endpoint: response.headers["ETag"]} if response.headers.get("ETag") else {}
+    return videos, fresh
+
+
+def fetch_youtube_channel_videos(channel_id: str, known_urls=None, backfill: bool = False,
+                                 etags: dict | None = None, limiter: RateLimiter | None = None,
+                                 paging: dict = DEFAULT_PAGING):
+    """
+    Data API walk of the channel's uploads playlist, newest first, stopping at the
+    first fully-known page unless backfilling. Uses the Atom feed without a key.
+    """
+    if not YOUTUBE_API_KEY:
+        return fetch_youtube_feed_videos(channel_id, etags, limiter)
+    base = "https://www.googleapis.com/youtube/v3"
+    try:
+        if limiter:
+            limiter.wait()
+        channel = requests.get(
+            f"{base}/channels",
+            params={"part": "contentDetails", "id": channel_id, "key": YOUTUBE_API_KEY},
+            timeout=15,
+        )
+        channel.raise_for_status()
+        items = channel.json().get("items") or []
+        if not items:
+            print(f"  YouTube channel {channel_id} not found.")
+            return None, {}
+        uploads = items[0]["contentDetails"]["relatedPlaylists"]["uploads"]
+
+        videos: Dict[str, dict] = {}
+        page_token = None
+        max_pages = paging["backfill_max_pages"] if backfill else paging["max_pages"]
+        for _ in range(max_pages):
+            if limiter:
+                limiter.wait()
+            params = {"part": "snippet", "playlistId": uploads, "maxResults": 50, "key": YOUTUBE_API_KEY}
+            if page_token:
+                params["pageToken"] = page_token
+            response = requests.get(f"{base}/playlistItems", params=params, timeout=15)
+            response.raise_for_status()
+            payload = response.json()
+            entries: Dict[str, dict] = {}
+            for item in payload.get("items") or []:
+                snippet = item.get("snippet") or {}
+                video_id = (snippet.get("resourceId") or {}).get("videoId")
+                if not video_id:
+                    continue
+                thumbnails = snippet.get("thumbnails") or {}
+                cover = (thumbnails.get("maxres") or thumbnails.get("high") or thumbnails.get("default") or {}).get("url")
+                entries[_youtube_watch_url(video_id)] = {"title": snippet.get("title") or "Untitled video", "cover_image": cover}
+            videos.update(entries)
+            if not backfill and known_urls is not None and entries and all(
+                normalize_url(url) in known_urls for url in entries
+            ):
+                print("  YouTube page contains only known videos; stopping.")
+                break
+            page_token = payload.get("nextPageToken")
+            if not page_token:
+                break
+    except requests.exceptions.RequestException as exc:
+        print(f"  YouTube API request failed: {exc}")
+        return None, {}
+    return videos, {}
+
+
+def fetch_channel_registry(provider_ids: list[int] | None = None) -> list[dict]:
+    if not SUPABASE_CLIENT:
+        raise RuntimeError("Supabase credentials are required to read discovery_channels")
+    query = (
+        SUPABASE_CLIENT.table("discovery_channels")
+        .select("id, provider_id, platform, channel_id, requests_per_minute, cursor")
+        .eq("is_active", True)
+    )
+    if provider_ids:
+        query = query.in_("provider_id", provider_ids)
+    response = query.order("id").execute()
+    error = getattr(response, "error", None)
+    if error:
+        raise error
+    return response.data or []
+
+
+def upsert_pending_documents(provider_id: int, entries: list[tuple[str, dict]]) -> None:
+    """Bulk-inserts discoveries as pending rows; rows that already exist are left untouched."""
+    rows = [
+        {
+            "provider_id": provider_id,
+            "title": payload["title"],
+            "source_url": normalized_url,
+            "media_type": "video",
+            "cover_image_url": payload.get("cover_image"),
+            "is_active": False,
+        }
+        for normalized_url, payload in entries
+    ]
+    for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+        (
+            SUPABASE_CLIENT.table("provider_documents")
+            .upsert(rows[i:i + UPSERT_BATCH_SIZE], on_conflict="provider_id,source_url", ignore_duplicates=True)
+            .execute()
+        )
+
+
+def estimate_discoveries(entries: list[tuple[str, dict]], estimate: Estimate) -> None:
+    """The seeding run new entries would need, projected from their listed durations."""
+    estimate.add_requests("supabase", math.ceil(len(entries) / UPSERT_BATCH_SIZE))
+    for _, payload in entries:
+        estimate.add_item()
+        estimate.add_media(payload.get("duration"))
+    estimate.note("Whisper minutes are an upper bound: videos with captions skip download and Whisper.")
+
+
+def scan_channel(channel: dict, index: DiscoveryIndex, backfill: bool = False, estimate: Estimate | None = None) -> dict:
+    label = f"{channel['platform']}:{channel['channel_id']} (provider {channel['provider_id']})"
+    limiter = RateLimiter(channel.get("requests_per_minute") or DEFAULT_REQUESTS_PER_MINUTE)
+    cursor = channel.get("cursor") or {}
+    etags = cursor.get("etags") or {}
+    started = time.monotonic()
+    try:
+        if channel["platform"] == "vimeo":
+            videos, fresh = fetch_vimeo_authenticated_videos(
+                channel["channel_id"], known_urls=index, backfill=backfill, etags=etags, limiter=limiter
+            )
+            if videos is None:
+                videos, fresh = fetch_vimeo_public_videos(
+                    channel["channel_id"], known_urls=index, backfill=backfill, etags=etags, limiter=limiter
+                )
+        elif channel["platform"] == "youtube":
+            videos, fresh = fetch_youtube_channel_videos(
+                channel["channel_id"], known_urls=index, backfill=backfill, etags=etags, limiter=limiter
+            )
+        else:
+            print(f"⚠️  {label}: unsupported platform, skipping.")
+            return {"channel": label, "new": 0, "error": "unsupported platform"}
+        if videos is None:
+            return {"channel": label, "new": 0, "error": "fetch failed"}
+
+        normalized = {normalize_url(url): payload for url, payload in videos.items()}
+        index.confirm_many(list(normalized))
+        new_entries = [(url, payload) for url, payload in normalized.items() if url and url not in index]
+        if estimate is not None:
+            # Nothing is stored and the cursor stays put, so the real run sees the same pages
+            estimate_discoveries(new_entries, estimate)
+            estimate.add_skipped(len(videos) - len(new_entries))
+            print(f"📐 {label}: {len(videos)} seen, {len(new_entries)} new", flush=True)
+            return {"channel": label, "new": len(new_entries), "error": None}
+        if new_entries:
+            upsert_pending_documents(channel["provider_id"], new_entries)
+            for url, _ in new_entries:
+                index.add(url)
+
+        cursor = {
+            "etags": {**etags, **fresh},
+            "last_scanned_at": datetime.now(timezone.utc).isoformat(),
+            "last_new_count": len(new_entries),
+        }
+        SUPABASE_CLIENT.table("discovery_channels").update({"cursor": cursor}).eq("id", channel["id"]).execute()
+        print(f"✅ {label}: {len(videos)} seen, {len(new_entries)} new ({time.monotonic() - started:.1f}s)", flush=True)
+        return {"channel": label, "new": len(new_entries), "error": None}
+    except Exception as exc:
+        print(f"❌ {label}: {exc}", flush=True)
+        return {"channel": label, "new": 0, "error": str(exc)}
+
+
+def run_discovery(provider_ids: list[int] | None = None, backfill: bool = False, estimate: Estimate | None = None) -> list[dict]:
+    """
+    Scans every registered channel concurrently, sharing one URL index per
+    provider. With an estimate, new videos are tallied into it instead of stored.
+    """
+    channels = fetch_channel_registry(provider_ids)
+    if not channels:
+        print("ℹ️  No active discovery channels registered.")
+        return []
+    print(f"🔭 Scanning {len(channels)} channels ({CHANNEL_WORKERS} concurrent)...", flush=True)
+    provider_list = sorted({channel["provider_id"] for channel in channels})
+    with ThreadPoolExecutor(max_workers=CHANNEL_WORKERS) as pool:
+        loaded = pool.map(
+            lambda pid: DiscoveryIndex(SUPABASE_CLIENT, pid, normalize_url).load(), provider_list
+        )
+        indexes = dict(zip(provider_list, loaded))
+        parts = [Estimate(estimate.label) if estimate is not None else None for _ in channels]
+        results = list(
+            pool.map(
+                lambda ch, part: scan_channel(ch, indexes[ch["provider_id"]], backfill, part), channels, parts
+            )
+        )
+    if estimate is not None:
+        for part in parts:
+            estimate.merge(part)
+    new_total = sum(result["new"] for result in results)
+    failed = [result["channel"] for result in results if result["error"]]
+    print(f"🎉 Discovery finished: {new_total} new documents across {len(channels)} channels.", flush=True)
+    if failed:
+        print(f"⚠️  {len(failed)} channels failed: {', '.join(failed)}", flush=True)
+    return results
+
+
+def main():
+    args = sys.argv[1:]
+    estimate = estimate_requested(args)
+    backfill = "--backfill" in args
+    provider_ids = []
+    if "--provider-id" in args:
+        idx = args.index("--provider-id")
+        if idx == len(args) - 1:
+            raise SystemExit("Usage: python channel_discovery.py [--provider-id <id>] [--backfill] [--estimate]")
+        try:
+            provider_ids.append(int(args[idx + 1]))
+        except ValueError:
+            raise SystemExit("provider_id must be an integer")
+    if estimate:
+        projected = Estimate(f"seeding new videos{' (backfill)' if backfill else ''}", concurrency=SEED_WORKERS)
+        run_discovery(provider_ids or None, backfill, projected)
+        projected.report()
+        return
+    run_discovery(provider_ids or None, backfill)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import os
+import threading
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+_lock = threading.RLock()
+_clients = {}
+_env_loaded = False
+
+
+class MissingConfig(RuntimeError):
+    pass
+
+
+def load_env() -> None:
+    """Loads .env once per process; cheap, and needed before module-level config reads."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _env_loaded = True
+
+
+def require_env(*names: str) -> list[str]:
+    load_env()
+    values = [os.environ.get(name) for name in names]
+    missing = [name for name, value in zip(names, values) if not value]
+    if missing:
+        raise MissingConfig(f"Missing environment variables: {', '.join(missing)}")
+    return values
+
+
+def _memoized(name: str, build):
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = build()
+    return client
+
+
+def get_supabase():
+    def build():
+        from supabase import create_client
+
+        return create_client(*require_env("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY"))
+
+    return _memoized("supabase", build)
+
+
+def get_openai():
+    def build():
+        from openai import OpenAI
+
+        return OpenAI(api_key=require_env("OPENAI_API_KEY")[0])
+
+    return _memoized("openai", build)
+
+
+def get_embed_model():
+    def build():
+        require_env("OPENAI_API_KEY")
+        from llama_index.embeddings.openai import OpenAIEmbedding
+
+        return OpenAIEmbedding(model=EMBEDDING_MODEL)
+
+    return _memoized("embed_model", build)
+
+
+def get_scraper():
+    def build():
+        import cloudscraper
+
+        # Pretends to be a real desktop Chrome browser
+        return cloudscraper.create_scraper(browser="chrome")
+
+    return _memoized("scraper", build)
+
+
+class LazyClient:
+    """
+    Module-level stand-in for a client: the real one is built (and its heavy
+    library imported) on first attribute access, then shared process-wide.
+    Importing a seeder for --help, or for a path that never embeds, costs nothing.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
+
+
+supabase = LazyClient(get_supabase)
+openai_client = LazyClient(get_openai)
+embed_model = LazyClient(get_embed_model)
+scraper = LazyClient(get_scraper)
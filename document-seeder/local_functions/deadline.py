@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+
+# First guess at one unit of work (a video, a page) until real ones have been timed
+DEFAULT_UNIT_SECONDS = float(os.environ.get("SEEDER_UNIT_ESTIMATE_SECONDS", "300"))
+# Kept free at the end for releasing claims and reporting
+SAFETY_MARGIN_SECONDS = float(os.environ.get("SEEDER_DEADLINE_MARGIN_SECONDS", "60"))
+# Weight of the newest unit in the moving estimate
+ESTIMATE_SMOOTHING = 0.3
+
+
+class DeadlineReached(Exception):
+    """Raised between checkpoints once there is no time left to continue."""
+
+
+class Deadline:
+    """
+    A wall-clock budget for one run. Units of work are only started when the
+    moving estimate of a unit's duration still fits before the deadline, and
+    long units check in between checkpoints so they stop cleanly instead of
+    being killed mid-write.
+    """
+
+    def __init__(self, at: float | None = None, unit_estimate: float = DEFAULT_UNIT_SECONDS):
+        self.at = at
+        self._estimate = unit_estimate
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        if self.at is None:
+            return float("inf")
+        return self.at - time.time() - SAFETY_MARGIN_SECONDS
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def estimate(self) -> float:
+        with self._lock:
+            return self._estimate
+
+    def record(self, seconds: float) -> None:
+        """Folds a finished unit's duration into the estimate."""
+        with self._lock:
+            self._estimate = ESTIMATE_SMOOTHING * seconds + (1 - ESTIMATE_SMOOTHING) * self._estimate
+
+    def can_start(self, estimate: float | None = None) -> bool:
+        return self.remaining() >= (self.estimate() if estimate is None else estimate)
+
+    def check(self) -> None:
+        if self.expired():
+            raise DeadlineReached(f"deadline reached ({max(0.0, self.at - time.time()):.0f}s left)")
+
+
+def _from_env() -> Deadline:
+    """SEEDER_DEADLINE (unix time) or SEEDER_TIME_BUDGET_SECONDS; unbounded when neither is set."""
+    if os.environ.get("SEEDER_DEADLINE"):
+        return Deadline(float(os.environ["SEEDER_DEADLINE"]))
+    if os.environ.get("SEEDER_TIME_BUDGET_SECONDS"):
+        return Deadline(time.time() + float(os.environ["SEEDER_TIME_BUDGET_SECONDS"]))
+    return Deadline()
+
+
+_current = _from_env()
+
+
+def current() -> Deadline:
+    return _current
+
+
+def start_run(budget_seconds: float | None) -> Deadline:
+    """Installs a fresh deadline for the run starting now; the job runtime calls this per job."""
+    global _current
+    _current = Deadline(time.time() + budget_seconds if budget_seconds else None)
+    return _current
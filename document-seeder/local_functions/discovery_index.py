@@ -0,0 +1,263 @@
+import base64
+import hashlib
+import math
+import os
+import re
+import zlib
+from urllib.parse import urlparse
+
+try:
+    from .seeder_cache import load_json, save_json
+    from .url_canonicalizer import NORMALIZER_VERSION
+except ImportError:
+    from seeder_cache import load_json, save_json
+    from url_canonicalizer import NORMALIZER_VERSION
+
+PAGE_SIZE = int(os.environ.get("DISCOVERY_INDEX_PAGE_SIZE", "1000"))
+BLOOM_THRESHOLD = int(os.environ.get("DISCOVERY_BLOOM_THRESHOLD", "200000"))
+BLOOM_FALSE_POSITIVE_RATE = float(os.environ.get("DISCOVERY_BLOOM_FP_RATE", "0.001"))
+CONFIRM_BATCH_SIZE = 100
+
+
+class BloomFilter:
+    """Fixed-size bit array with double hashing; sized for capacity at error_rate."""
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_FALSE_POSITIVE_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def to_dict(self) -> dict:
+        return {
+            "size": self.size,
+            "hashes": self.hashes,
+            "bits": base64.b64encode(zlib.compress(bytes(self.bits))).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "BloomFilter":
+        bloom = cls(1)
+        bloom.size = payload["size"]
+        bloom.hashes = payload["hashes"]
+        bloom.bits = bytearray(zlib.decompress(base64.b64decode(payload["bits"])))
+        return bloom
+
+
+def spellings_pattern(urls) -> str:
+    """
+    A Postgres regex (for PostgREST imatch) matching raw source URLs that may
+    normalize to one of urls: same host and path, any scheme, trailing
+    slashes, and at least the normalized query pairs. It over-matches; callers
+    compare the normalized rows exactly.
+    """
+    alternatives = []
+    for url in dict.fromkeys(urls):
+        parsed = urlparse(url)
+        pattern = re.escape(parsed.netloc + parsed.path.rstrip("/")) + "/*"
+        for pair in filter(None, parsed.query.split("&")):
+            pattern += f"(?=.*[?&]{re.escape(pair)}(&|#|$))"
+        alternatives.append(pattern)
+    return f"^[a-z][a-z0-9+.-]*://({'|'.join(alternatives)})([?#].*)?$"
+
+
+class DiscoveryIndex:
+    """
+    Normalized source URLs already stored for one provider.
+
+    Loads with keyset pagination on provider_documents.id and caches the URLs
+    plus the highest id seen, so later runs only fetch rows added since. The
+    cache is rebuilt from scratch when the normalizer changed, or when rows
+    were deleted since it was written. Past BLOOM_THRESHOLD URLs only a Bloom
+    filter is kept, and its positives are confirmed against the database in
+    batches.
+    """
+
+    def __init__(
+        self,
+        supabase,
+        provider_id: int,
+        normalize,
+        cache_name: str | None = None,
+        normalizer_version: int = NORMALIZER_VERSION,
+    ):
+        self.supabase = supabase
+        self.provider_id = provider_id
+        self.normalize = normalize
+        self.normalizer_version = normalizer_version
+        self.cache_name = cache_name or f"discovery-index-{provider_id}.json"
+        self.high_water_id = 0
+        self.count = 0
+        # provider_documents rows read, with or without a source_url
+        self.rows = 0
+        self.urls: set[str] | None = set()
+        self.bloom: BloomFilter | None = None
+        self._confirmed: dict[str, bool] = {}
+
+    def load(self, refresh: bool = False) -> "DiscoveryIndex":
+        cached = None if refresh else load_json(self.cache_name)
+        if not self._usable(cached):
+            cached = None
+        if cached:
+            self.high_water_id = cached.get("high_water_id", 0)
+            self.count = cached.get("count", 0)
+            self.rows = cached["rows"]
+            if cached.get("bloom"):
+                self.urls = None
+                self.bloom = BloomFilter.from_dict(cached["bloom"])
+            else:
+                self.urls = set(cached.get("urls", []))
+        fetched = self._fetch_since(self.high_water_id)
+        live_rows = self._live_rows()
+        if cached and self.rows > live_rows:
+            # Rows were deleted since the cache was written, so it may hold URLs that no longer exist
+            print(f"📇 Provider {self.provider_id} has {live_rows} documents, {self.rows} indexed; reloading.")
+            self._reset()
+            fetched = self._fetch_since(0)
+            cached = None
+        print(
+            f"📇 Discovery index for provider {self.provider_id}: {self.count} URLs "
+            f"({fetched} new since last run{', bloom mode' if self.bloom else ''})."
+        )
+        if fetched or cached is None:
+            self.save()
+        return self
+
+    def _usable(self, cached) -> bool:
+        return bool(
+            cached
+            and cached.get("provider_id") == self.provider_id
+            and cached.get("normalizer_version") == self.normalizer_version
+            and "rows" in cached
+        )
+
+    def _reset(self) -> None:
+        self.high_water_id = 0
+        self.count = 0
+        self.rows = 0
+        self.urls = set()
+        self.bloom = None
+        self._confirmed = {}
+
+    def _live_rows(self) -> int:
+        response = (
+            self.supabase.table("provider_documents")
+            .select("id", count="exact", head=True)
+            .eq("provider_id", self.provider_id)
+            .execute()
+        )
+        return response.count or 0
+
+    def _fetch_since(self, after_id: int) -> int:
+        fetched = 0
+        while True:
+            response = (
+                self.supabase.table("provider_documents")
+                .select("id, source_url")
+                .eq("provider_id", self.provider_id)
+                .gt("id", after_id)
+                .order("id")
+                .limit(PAGE_SIZE)
+                .execute()
+            )
+            error = getattr(response, "error", None)
+            if error:
+                raise error
+            rows = response.data or []
+            for row in rows:
+                if row.get("source_url"):
+                    self._remember(self.normalize(row["source_url"]))
+                after_id = max(after_id, row["id"])
+            fetched += len(rows)
+            self.rows += len(rows)
+            self.high_water_id = after_id
+            if len(rows) < PAGE_SIZE:
+                return fetched
+
+    def _remember(self, url: str) -> None:
+        if not url:
+            return
+        if self.urls is not None:
+            if url in self.urls:
+                return
+            self.urls.add(url)
+            self.count += 1
+            if self.count > BLOOM_THRESHOLD:
+                self._switch_to_bloom()
+        else:
+            self.bloom.add(url)
+            self.count += 1
+
+    def _switch_to_bloom(self) -> None:
+        self.bloom = BloomFilter(BLOOM_THRESHOLD * 4)
+        for url in self.urls:
+            self.bloom.add(url)
+        self.urls = None
+
+    def save(self) -> None:
+        payload = {
+            "provider_id": self.provider_id,
+            "normalizer_version": self.normalizer_version,
+            "high_water_id": self.high_water_id,
+            "count": self.count,
+            "rows": self.rows,
+        }
+        if self.bloom is not None:
+            payload["bloom"] = self.bloom.to_dict()
+        else:
+            payload["urls"] = sorted(self.urls)
+        save_json(self.cache_name, payload)
+
+    def confirm_many(self, urls) -> None:
+        """
+        Resolves Bloom positives for urls with batched lookups. Stored rows are
+        raw URLs, so each batch fetches every row whose host and path match
+        (any scheme or host case, trailing slashes, extra query or fragment)
+        and keeps those that normalize to a URL in the batch.
+        """
+        if self.bloom is None:
+            return
+        pending = [url for url in urls if url in self.bloom and url not in self._confirmed]
+        for i in range(0, len(pending), CONFIRM_BATCH_SIZE):
+            batch = pending[i:i + CONFIRM_BATCH_SIZE]
+            response = (
+                self.supabase.table("provider_documents")
+                .select("source_url")
+                .eq("provider_id", self.provider_id)
+                .filter("source_url", "imatch", spellings_pattern(batch))
+                .execute()
+            )
+            found = {self.normalize(row["source_url"]) for row in (response.data or []) if row.get("source_url")}
+            for url in batch:
+                self._confirmed[url] = url in found
+
+    def __contains__(self, url: str) -> bool:
+        if self.urls is not None:
+            return url in self.urls
+        if url not in self.bloom:
+            return False
+        if url not in self._confirmed:
+            self.confirm_many([url])
+        return self._confirmed[url]
+
+    def add(self, url: str) -> None:
+        """Records a URL this run inserted; the next load picks the row up via the high-water mark."""
+        if self.urls is not None:
+            self.urls.add(url)
+        else:
+            self.bloom.add(url)
+            self._confirmed[url] = True
@@ -0,0 +1,243 @@
+import json
+import math
+import os
+import random
+from collections import Counter
+
+try:
+    from .job_queue import JOB_TIMEOUT_SECONDS
+    from .knowledge_store import EMBED_BATCH_SIZE, INSERT_BATCH_SIZE
+    from .transcript_chunker import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, chunk_segments, count_tokens, tiktoken
+except ImportError:
+    from job_queue import JOB_TIMEOUT_SECONDS
+    from knowledge_store import EMBED_BATCH_SIZE, INSERT_BATCH_SIZE
+    from transcript_chunker import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, chunk_segments, count_tokens, tiktoken
+
+# USD list prices; override with e.g. SEEDER_ESTIMATE_PRICES='{"whisper_minute": 0.003}'
+PRICES = {
+    "embedding_1m_tokens": 0.02,  # text-embedding-3-small
+    "whisper_minute": 0.006,
+    "llamaparse_page": 0.003,
+    **json.loads(os.environ.get("SEEDER_ESTIMATE_PRICES", "{}") or "{}"),
+}
+# Seconds of work per unit at a concurrency of one, from past runs; same override style
+UNIT_SECONDS = {
+    "http": 0.8,  # page, feed or metadata fetch
+    "supabase": 0.15,
+    "embedding": 0.7,  # one embeddings request, whatever its batch size
+    "download_minute": 0.5,  # per minute of audio, including the ffmpeg re-encode
+    "whisper_minute": 4.0,
+    "llamaparse_page": 1.5,
+    **json.loads(os.environ.get("SEEDER_ESTIMATE_UNIT_SECONDS", "{}") or "{}"),
+}
+# Spoken English at ~150 words a minute, for media whose transcript doesn't exist yet
+SPOKEN_TOKENS_PER_MINUTE = float(os.environ.get("SEEDER_ESTIMATE_TOKENS_PER_MINUTE", "200"))
+# Assumed length of media whose metadata has no duration
+DEFAULT_MEDIA_MINUTES = float(os.environ.get("SEEDER_ESTIMATE_MEDIA_MINUTES", "30"))
+# Items fetched in full (page text, captions, durations) before extrapolating; 0 measures everything
+SAMPLE_SIZE = int(os.environ.get("SEEDER_ESTIMATE_SAMPLE", "25"))
+
+
+def estimate_requested(args: list[str]) -> bool:
+    """True when --estimate is among args; it is removed so positional parsing is unchanged."""
+    if "--estimate" not in args:
+        return False
+    args.remove("--estimate")
+    return True
+
+
+def sample(items: list, size: int = SAMPLE_SIZE) -> tuple[list, float]:
+    """Up to size items picked at random, and the factor that scales their totals to all items."""
+    items = list(items)
+    if not size or len(items) <= size:
+        return items, 1.0
+    return random.sample(items, size), len(items) / size
+
+
+def media_duration(url: str) -> float | None:
+    """Duration in seconds from yt-dlp's metadata; nothing is downloaded."""
+    import yt_dlp
+
+    try:
+        with yt_dlp.YoutubeDL({"quiet": True, "no_warnings": True, "skip_download": True}) as ydl:
+            return (ydl.extract_info(url, download=False) or {}).get("duration")
+    except Exception as e:
+        print(f"   ⚠️  No duration for {url}: {e}")
+        return None
+
+
+class Estimate:
+    """
+    Projected tokens, audio minutes, requests, cost and wall-clock time of a
+    seeding run, built up while a seeder enumerates its work without doing
+    any of it. Chunks are counted with the same tokenizer and chunk sizes the
+    seeder would use; stages are assumed not to overlap, so pipelined runs
+    come in somewhat under the projected time.
+    """
+
+    def __init__(self, label: str, concurrency: int = 1, stage_concurrency: dict | None = None):
+        self.label = label
+        self.concurrency = max(1, concurrency)
+        # Per request kind, where a seeder bounds a stage separately (e.g. Whisper slots)
+        self.stage_concurrency = stage_concurrency or {}
+        self.items = 0
+        self.skipped = 0
+        self.chunks = 0
+        self.tokens = 0
+        self.media_minutes = 0.0
+        self.whisper_minutes = 0.0
+        self.assumed_durations = 0
+        self.requests = Counter()
+        self.wait_seconds = 0.0
+        self.notes: list[str] = []
+
+    def add_item(self, count: int = 1) -> None:
+        self.items += count
+
+    def add_skipped(self, count: int = 1) -> None:
+        """Items the run would skip, e.g. already seeded."""
+        self.skipped += count
+
+    def add_requests(self, kind: str, count: float = 1) -> None:
+        self.requests[kind] += count
+
+    def add_wait(self, seconds: float) -> None:
+        """Deliberate sleeps between requests; they don't shrink with concurrency."""
+        self.wait_seconds += seconds
+
+    def note(self, message: str) -> None:
+        if message not in self.notes:
+            self.notes.append(message)
+
+    def _add_embeddings(self, chunks: int, tokens: int, embed_batch: int, insert_batch: int) -> None:
+        self.chunks += chunks
+        self.tokens += tokens
+        self.add_requests("embedding", math.ceil(chunks / max(1, embed_batch)))
+        self.add_requests("supabase", math.ceil(chunks / max(1, insert_batch)))
+
+    def add_chunks(self, texts, embed_batch: int = EMBED_BATCH_SIZE, insert_batch: int = INSERT_BATCH_SIZE) -> None:
+        """Chunks the seeder has already split locally, counted exactly."""
+        texts = [text for text in texts if text and text.strip()]
+        self._add_embeddings(len(texts), sum(count_tokens(text) for text in texts), embed_batch, insert_batch)
+
+    def add_segments(self, segments) -> None:
+        """A transcript (captions, a published transcript) chunked the way every transcript seeder does."""
+        self.add_chunks(chunk["content"] for chunk in chunk_segments(segments))
+
+    def add_tokens(
+        self,
+        tokens: float,
+        chunk_tokens: int = CHUNK_MAX_TOKENS,
+        overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+        embed_batch: int = EMBED_BATCH_SIZE,
+        insert_batch: int = INSERT_BATCH_SIZE,
+    ) -> None:
+        """Text that isn't split yet: chunk count from the chunk size, overlap embedded twice."""
+        if tokens <= 0:
+            return
+        stride = max(1, chunk_tokens - overlap_tokens)
+        chunks = max(1, math.ceil((tokens - overlap_tokens) / stride))
+        self._add_embeddings(chunks, int(tokens + (chunks - 1) * overlap_tokens), embed_batch, insert_batch)
+
+    def add_text(self, text: str, **chunking) -> None:
+        self.add_tokens(count_tokens(text) if text else 0, **chunking)
+
+    def add_media(self, seconds: float | None, transcribe: bool = True) -> None:
+        """
+        Audio or video known only by its duration. With transcribe it is
+        downloaded and sent to Whisper; either way its spoken transcript is embedded.
+        """
+        if not seconds:
+            seconds = DEFAULT_MEDIA_MINUTES * 60
+            self.assumed_durations += 1
+        minutes = seconds / 60
+        self.media_minutes += minutes
+        if transcribe:
+            self.whisper_minutes += minutes
+            self.add_requests("download")
+            self.add_requests("whisper")
+        self.add_tokens(minutes * SPOKEN_TOKENS_PER_MINUTE)
+
+    def add_parse_pages(self, pages: int) -> None:
+        self.add_requests("llamaparse_page", pages)
+
+    def merge(self, other: "Estimate", scale: float = 1.0) -> None:
+        """Adds a sample's totals, scaled up to the population it was drawn from."""
+        self.items += round(other.items * scale)
+        self.skipped += round(other.skipped * scale)
+        self.chunks += round(other.chunks * scale)
+        self.tokens += round(other.tokens * scale)
+        self.media_minutes += other.media_minutes * scale
+        self.whisper_minutes += other.whisper_minutes * scale
+        self.assumed_durations += round(other.assumed_durations * scale)
+        for kind, count in other.requests.items():
+            self.requests[kind] += count * scale
+        self.wait_seconds += other.wait_seconds * scale
+        for message in other.notes:
+            self.note(message)
+        if scale != 1.0:
+            self.note(f"Extrapolated from a sample of {other.items + other.skipped} (×{scale:.1f}).")
+
+    def costs(self) -> dict[str, float]:
+        return {
+            "embeddings": self.tokens / 1_000_000 * PRICES["embedding_1m_tokens"],
+            "whisper": self.whisper_minutes * PRICES["whisper_minute"],
+            "llamaparse": self.requests["llamaparse_page"] * PRICES["llamaparse_page"],
+        }
+
+    def stage_seconds(self) -> dict[str, float]:
+        """Wall-clock seconds per stage at the configured concurrency."""
+        work = {kind: count * UNIT_SECONDS.get(kind, UNIT_SECONDS["http"]) for kind, count in self.requests.items()}
+        work.pop("download", None)
+        work.pop("whisper", None)
+        work["download"] = self.whisper_minutes * UNIT_SECONDS["download_minute"]
+        work["whisper"] = self.whisper_minutes * UNIT_SECONDS["whisper_minute"]
+        stages = {
+            kind: seconds / max(1, self.stage_concurrency.get(kind, self.concurrency))
+            for kind, seconds in work.items()
+            if seconds
+        }
+        if self.wait_seconds:
+            stages["wait"] = self.wait_seconds / self.concurrency
+        return stages
+
+    def as_dict(self) -> dict:
+        stages = self.stage_seconds()
+        return {
+            "label": self.label,
+            "items": self.items,
+            "skipped": self.skipped,
+            "chunks": self.chunks,
+            "embedding_tokens": self.tokens,
+            "media_minutes": round(self.media_minutes, 1),
+            "whisper_minutes": round(self.whisper_minutes, 1),
+            "requests": {kind: math.ceil(count) for kind, count in self.requests.items()},
+            "cost_usd": round(sum(self.costs().values()), 4),
+            "wall_seconds": round(sum(stages.values())),
+            "concurrency": self.concurrency,
+        }
+
+    def report(self) -> None:
+        costs = self.costs()
+        stages = self.stage_seconds()
+        wall = sum(stages.values())
+        tokenizer = "tiktoken cl100k_base" if tiktoken else "~4 chars/token (tiktoken not installed)"
+        print(f"\n📐 Estimate for {self.label} (nothing was embedded, transcribed or written)")
+        print(f"   Items:       {self.items} to seed, {self.skipped} skipped")
+        print(f"   Chunks:      {self.chunks} ({self.tokens:,} embedding tokens, {tokenizer})")
+        if self.media_minutes:
+            print(f"   Media:       {self.media_minutes:,.1f} min, {self.whisper_minutes:,.1f} min through Whisper")
+        requests = ", ".join(f"{kind} {math.ceil(count):,}" for kind, count in sorted(self.requests.items()))
+        print(f"   Requests:    {requests or 'none'}")
+        print(
+            f"   Cost:        ${sum(costs.values()):,.2f} "
+            f"(embeddings ${costs['embeddings']:,.2f}, Whisper ${costs['whisper']:,.2f}, LlamaParse ${costs['llamaparse']:,.2f})"
+        )
+        breakdown = ", ".join(f"{kind} {seconds / 60:,.1f}m" for kind, seconds in sorted(stages.items(), key=lambda kv: -kv[1]))
+        print(f"   Wall clock:  {wall / 3600:,.2f}h at concurrency {self.concurrency} ({breakdown or 'no work'})")
+        if wall > JOB_TIMEOUT_SECONDS:
+            print(f"   Sharding:    ~{math.ceil(wall / JOB_TIMEOUT_SECONDS)} jobs of {JOB_TIMEOUT_SECONDS}s each")
+        if self.assumed_durations:
+            self.note(f"{self.assumed_durations} items had no duration; assumed {DEFAULT_MEDIA_MINUTES:g} min each.")
+        for message in self.notes:
+            print(f"   ℹ️  {message}")
@@ -0,0 +1,110 @@
+import json
+import os
+import threading
+import time
+
+DEFAULT_WEIGHT = int(os.environ.get("SEEDER_DEFAULT_PROVIDER_WEIGHT", "1"))
+# In-flight documents per provider across every worker and instance; unset means uncapped
+DEFAULT_MAX_CONCURRENCY = int(os.environ["SEEDER_DEFAULT_PROVIDER_CONCURRENCY"]) if os.environ.get(
+    "SEEDER_DEFAULT_PROVIDER_CONCURRENCY"
+) else None
+# Overrides without a table row, e.g. {"12": {"weight": 3, "max_concurrency": 2}}
+POLICY_OVERRIDES = json.loads(os.environ.get("SEEDER_PROVIDER_POLICY", "{}") or "{}")
+POLICY_TTL_SECONDS = 60
+
+
+class SmoothWeightedRoundRobin:
+    """
+    Smooth weighted round-robin (as in nginx upstreams): each pick adds every
+    candidate's weight to its running score, takes the highest, and charges it
+    the total. Weights 3:1 give A A B A rather than A A A B, so a heavy provider
+    gets its share without ever starving a light one for long.
+    """
+
+    def __init__(self):
+        self.scores: dict = {}
+        self._lock = threading.Lock()
+
+    def pick(self, weights: dict):
+        if not weights:
+            return None
+        with self._lock:
+            total = sum(weights.values())
+            for key, weight in weights.items():
+                self.scores[key] = self.scores.get(key, 0) + weight
+            chosen = max(weights, key=lambda key: self.scores[key])
+            self.scores[chosen] -= total
+            # Providers that drained keep no stale credit
+            for key in [key for key in self.scores if key not in weights]:
+                del self.scores[key]
+            return chosen
+
+
+class ProviderPolicies:
+    """Per-provider weight and concurrency cap from provider_seeding_policy, cached briefly."""
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self._policies: dict = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        response = self.supabase.table("provider_seeding_policy").select("provider_id, weight, max_concurrency").execute()
+        policies = {row["provider_id"]: row for row in response.data or []}
+        for provider_id, override in POLICY_OVERRIDES.items():
+            policies[int(provider_id)] = {**policies.get(int(provider_id), {}), **override}
+        return policies
+
+    def get(self, provider_id) -> tuple[int, int | None]:
+        with self._lock:
+            if time.monotonic() - self._loaded_at > POLICY_TTL_SECONDS:
+                self._policies = self._load()
+                self._loaded_at = time.monotonic()
+            policy = self._policies.get(provider_id) or {}
+        weight = policy.get("weight") or DEFAULT_WEIGHT
+        cap = policy.get("max_concurrency", DEFAULT_MAX_CONCURRENCY)
+        return max(1, int(weight)), cap
+
+
+class FairScheduler:
+    """
+    Decides which providers the next claims should come from. Expedited
+    documents (single-item re-seeds) are taken first; the rest are spread over
+    providers with pending work by smooth weighted round-robin, skipping any
+    provider already at its concurrency cap.
+    """
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self.policies = ProviderPolicies(supabase)
+        self.rotation = SmoothWeightedRoundRobin()
+
+    def pending_work(self) -> list[dict]:
+        """Rows of the provider_pending_work view: provider_id, claimable, in_flight, expedited."""
+        response = self.supabase.table("provider_pending_work").select("*").execute()
+        return response.data or []
+
+    def plan(self, slots: int, work: list[dict] | None = None) -> tuple[int, list]:
+        """
+        Returns (expedited, providers): how many of the slots go to the expedited
+        lane, and the provider to claim from for each remaining slot, in order.
+        """
+        work = self.pending_work() if work is None else work
+        expedited = min(slots, sum(row.get("expedited") or 0 for row in work))
+        claimable = {row["provider_id"]: row.get("claimable") or 0 for row in work}
+        in_flight = {row["provider_id"]: row.get("in_flight") or 0 for row in work}
+        providers = []
+        while len(providers) < slots - expedited:
+            eligible = {}
+            for provider_id, remaining in claimable.items():
+                weight, cap = self.policies.get(provider_id)
+                if remaining > 0 and (cap is None or in_flight[provider_id] < cap):
+                    eligible[provider_id] = weight
+            provider_id = self.rotation.pick(eligible)
+            if provider_id is None:
+                break
+            providers.append(provider_id)
+            claimable[provider_id] -= 1
+            in_flight[provider_id] += 1
+        return expedited, providers
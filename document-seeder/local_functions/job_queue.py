@@ -0,0 +1,236 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_DB_PATH = os.environ.get("SEEDER_JOB_DB", "/tmp/seeder-jobs.sqlite3")
+JOB_WORKERS = int(os.environ.get("SEEDER_JOB_WORKERS", "1"))
+# Jobs waiting for a worker beyond this are refused instead of queued
+JOB_QUEUE_LIMIT = int(os.environ.get("SEEDER_JOB_QUEUE_LIMIT", "20"))
+# 58 minutes leaves a buffer under Cloud Run's 60 minute limit
+JOB_TIMEOUT_SECONDS = int(os.environ.get("SEEDER_JOB_TIMEOUT_SECONDS", "3500"))
+LOG_TAIL_LINES = int(os.environ.get("SEEDER_JOB_TAIL_LINES", "200"))
+JOB_LOG_DIR = os.environ.get("SEEDER_JOB_LOG_DIR", "/tmp/seeder-job-logs")
+# Counters and tail are written back to the job row at most this often while running
+PROGRESS_FLUSH_SECONDS = 5
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+_SCHEMA = """
+create table if not exists jobs (
+    id text primary key,
+    type text not null,
+    args text not null,
+    status text not null,
+    created_at real not null,
+    started_at real,
+    finished_at real,
+    return_code integer,
+    progress text not null default '{}',
+    log_tail text not null default '',
+    error text
+)
+"""
+
+
+class QueueFull(Exception):
+    pass
+
+
+def count_progress(counters: dict, line: str) -> None:
+    """Tallies the seeders' ✅ / ❌ / ⚠️ log markers, which is all they report."""
+    text = line.lstrip()
+    counters["lines"] = counters.get("lines", 0) + 1
+    for marker, name in (("✅", "succeeded"), ("❌", "failed"), ("⚠️", "warnings")):
+        if text.startswith(marker):
+            counters[name] = counters.get(name, 0) + 1
+            break
+
+
+def job_log_path(job_id: str) -> str:
+    return os.path.join(JOB_LOG_DIR, f"{job_id}.log")
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    db = sqlite3.connect(db_path, timeout=30)
+    db.row_factory = sqlite3.Row
+    return db
+
+
+def update_job(db_path: str, job_id: str, **fields) -> None:
+    """Safe from the worker processes too: SQLite serializes the writers."""
+    columns = ", ".join(f"{name} = ?" for name in fields)
+    with _connect(db_path) as db:
+        db.execute(f"update jobs set {columns} where id = ?", (*fields.values(), job_id))
+
+
+class JobLog:
+    """
+    A text stream for one job's output. Lines go to the job's log file and a
+    bounded ring buffer (the tail), so memory stays flat however chatty a
+    backfill is; counters and tail are published to the job row as it runs.
+    """
+
+    def __init__(self, job_id: str, db_path: str = JOB_DB_PATH):
+        self.job_id = job_id
+        self.db_path = db_path
+        self.tail = deque(maxlen=LOG_TAIL_LINES)
+        self.counters = {"lines": 0, "succeeded": 0, "failed": 0, "warnings": 0}
+        self._partial = ""
+        self._lock = threading.Lock()
+        self._published_at = time.monotonic()
+        os.makedirs(JOB_LOG_DIR, exist_ok=True)
+        self._file = open(job_log_path(job_id), "w", encoding="utf-8")
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            *lines, self._partial = (self._partial + text).split("\n")
+            for line in lines:
+                self._add(line)
+            if lines:
+                self._file.flush()
+                if time.monotonic() - self._published_at >= PROGRESS_FLUSH_SECONDS:
+                    self._publish()
+        return len(text)
+
+    def _add(self, line: str) -> None:
+        self._file.write(line + "\n")
+        self.tail.append(line)
+        count_progress(self.counters, line)
+
+    def _publish(self) -> None:
+        update_job(self.db_path, self.job_id, progress=json.dumps(self.counters), log_tail="\n".join(self.tail))
+        self._published_at = time.monotonic()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+    def isatty(self) -> bool:
+        return False
+
+    def close(self) -> None:
+        with self._lock:
+            if self._partial:
+                self._add(self._partial)
+                self._partial = ""
+            self._file.close()
+
+    def summary(self) -> dict:
+        return {"progress": dict(self.counters), "log_tail": list(self.tail)}
+
+
+def summarize_log(job_id: str) -> dict:
+    """JobLog.summary() rebuilt from the log file, for a job whose worker was killed."""
+    counters = {"lines": 0, "succeeded": 0, "failed": 0, "warnings": 0}
+    tail = deque(maxlen=LOG_TAIL_LINES)
+    try:
+        with open(job_log_path(job_id), "r", encoding="utf-8", errors="replace") as log:
+            for line in log:
+                line = line.rstrip("\n")
+                tail.append(line)
+                count_progress(counters, line)
+    except FileNotFoundError:
+        pass
+    return {"progress": counters, "log_tail": list(tail)}
+
+
+class JobQueue:
+    """
+    Seeder runs as background jobs: submit() records a queued row in a local
+    SQLite table and hands it to a bounded pool of dispatcher threads, each
+    waiting on one job in the runtime; get() reads the row back with its
+    status, progress counters and log tail.
+    """
+
+    def __init__(self, runtime, db_path: str = JOB_DB_PATH, workers: int = JOB_WORKERS):
+        self.runtime = runtime
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="seeder-job")
+        with _connect(db_path) as db:
+            db.execute(_SCHEMA)
+            # Anything still open belonged to a process that is gone
+            db.execute(
+                "update jobs set status = ?, finished_at = ?, error = 'interrupted by restart' "
+                "where status in (?, ?)",
+                (FAILED, time.time(), QUEUED, RUNNING),
+            )
+
+    def submit(self, job_type: str, params: dict) -> str:
+        with self._lock, _connect(self.db_path) as db:
+            waiting = db.execute("select count(*) from jobs where status = ?", (QUEUED,)).fetchone()[0]
+            if waiting >= JOB_QUEUE_LIMIT:
+                raise QueueFull(f"{waiting} jobs already queued")
+            job_id = uuid.uuid4().hex
+            db.execute(
+                "insert into jobs (id, type, args, status, created_at) values (?, ?, ?, ?, ?)",
+                (job_id, job_type, json.dumps(params), QUEUED, time.time()),
+            )
+        self._pool.submit(self._run, job_id, job_type, params)
+        return job_id
+
+    def _run(self, job_id: str, job_type: str, params: dict) -> None:
+        update_job(self.db_path, job_id, status=RUNNING, started_at=time.time())
+        print(f"🚀 [{job_id}] Starting {job_type} job: {params}", flush=True)
+        fields = {}
+        try:
+            result = self.runtime.run(job_id, job_type, params, self.db_path)
+            error = result["error"]
+            fields = {"progress": json.dumps(result["progress"]), "log_tail": "\n".join(result["log_tail"])}
+        except Exception as e:
+            error = f"worker crash: {e}"
+        status = FAILED if error else SUCCEEDED
+        update_job(
+            self.db_path,
+            job_id,
+            status=status,
+            finished_at=time.time(),
+            return_code=1 if error else 0,
+            error=error,
+            **fields,
+        )
+        print(f"{'✅' if status == SUCCEEDED else '❌'} [{job_id}] {status}{f' ({error})' if error else ''}", flush=True)
+
+    def get(self, job_id: str) -> dict | None:
+        with _connect(self.db_path) as db:
+            row = db.execute("select * from jobs where id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["args"] = json.loads(job["args"])
+        job["progress"] = json.loads(job["progress"])
+        job["log_tail"] = job["log_tail"].splitlines()
+        return job
+
+    def follow_log(self, job_id: str, poll_seconds: float = 1.0):
+        """
+        Yields the job's log lines from the start, then new ones as they are
+        written, until the job finishes and the file is drained.
+        """
+        path = job_log_path(job_id)
+        while not os.path.exists(path):
+            job = self.get(job_id)
+            if job is None or job["status"] not in (QUEUED, RUNNING):
+                return
+            time.sleep(poll_seconds)
+        with open(path, "r", encoding="utf-8", errors="replace") as log:
+            pending = ""
+            while True:
+                chunk = log.readline()
+                if chunk:
+                    pending += chunk
+                    if pending.endswith("\n"):
+                        yield pending.rstrip("\n")
+                        pending = ""
+                    continue
+                job = self.get(job_id)
+                if job is None or job["status"] not in (QUEUED, RUNNING):
+                    # One more read picks up anything written before the status flipped
+                    yield from (pending + log.read()).splitlines()
+                    return
+                time.sleep(poll_seconds)
@@ -0,0 +1,111 @@
+import os
+
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "100"))
+INSERT_BATCH_SIZE = int(os.environ.get("KNOWLEDGE_INSERT_BATCH_SIZE", "20"))
+
+
+def embed_texts(embed_model, texts: list[str], batch_size: int = EMBED_BATCH_SIZE) -> list[list[float]]:
+    """Embeds texts with one API call per batch instead of one per chunk."""
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        vectors.extend(embed_model.get_text_embedding_batch(texts[i:i + batch_size]))
+    return vectors
+
+
+STORED_CHUNK_PAGE_SIZE = 1000
+
+
+def insert_knowledge_rows(supabase, rows: list[dict], batch_size: int = INSERT_BATCH_SIZE) -> None:
+    for i in range(0, len(rows), batch_size):
+        supabase.table("provider_knowledge").insert(rows[i:i + batch_size]).execute()
+
+
+def remove_document(supabase, document_id) -> None:
+    """
+    Drops a document whose knowledge rows didn't all go in. Left in place it
+    would look seeded to the next run's existence checks, with no chunks, and
+    never be retried.
+    """
+    try:
+        supabase.table("provider_knowledge").delete().eq("document_id", document_id).execute()
+        supabase.table("provider_documents").delete().eq("id", document_id).execute()
+    except Exception as e:
+        print(f"   ❌ Could not remove incomplete document {document_id}; delete it before the next run: {e}")
+
+
+def has_legacy_chunks(supabase, document_id) -> bool:
+    """True when the document has rows without a chunkIndex, from older non-resumable runs."""
+    response = (
+        supabase.table("provider_knowledge")
+        .select("id")
+        .eq("document_id", document_id)
+        .is_("metadata->chunkIndex", "null")
+        .limit(1)
+        .execute()
+    )
+    return bool(response.data)
+
+
+def stored_chunk_indexes(supabase, document_id, drop_legacy: bool = False) -> set[int]:
+    """
+    chunkIndex values already stored for a document, so an interrupted run can
+    resume after its last checkpoint. Rows without an index come from older,
+    non-resumable runs; they are only removed with drop_legacy, when the
+    caller is re-seeding this document.
+    """
+    if drop_legacy:
+        (
+            supabase.table("provider_knowledge")
+            .delete()
+            .eq("document_id", document_id)
+            .is_("metadata->chunkIndex", "null")
+            .execute()
+        )
+    indexes = set()
+    start = 0
+    while True:
+        response = (
+            supabase.table("provider_knowledge")
+            .select("chunk_index:metadata->chunkIndex")
+            .eq("document_id", document_id)
+            .range(start, start + STORED_CHUNK_PAGE_SIZE - 1)
+            .execute()
+        )
+        rows = response.data or []
+        indexes.update(int(row["chunk_index"]) for row in rows if row.get("chunk_index") is not None)
+        if len(rows) < STORED_CHUNK_PAGE_SIZE:
+            return indexes
+        start += STORED_CHUNK_PAGE_SIZE
+
+
+def build_transcript_rows(
+    chunks: list[dict],
+    vectors: list[list[float]],
+    provider_id,
+    document_id,
+    metadata: dict,
+    chunk_indexes: list[int] | None = None,
+) -> list[dict]:
+    """
+    Pairs chunk_segments output with its embeddings as provider_knowledge rows.
+    chunk_indexes (each chunk's position in the document) makes the rows resumable.
+    """
+    rows = [
+        {
+            "provider_id": provider_id,
+            "document_id": document_id,
+            "content": chunk["content"],
+            "embedding": vector,
+            "metadata": {
+                **metadata,
+                "timestampStart": chunk["timestampStart"],
+                "timestampEnd": chunk["timestampEnd"],
+                "charStart": chunk["charStart"],
+            },
+        }
+        for chunk, vector in zip(chunks, vectors)
+    ]
+    if chunk_indexes is not None:
+        for row, index in zip(rows, chunk_indexes):
+            row["metadata"]["chunkIndex"] = index
+    return rows
@@ -0,0 +1,171 @@
+import os
+import random
+import socket
+import threading
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+try:
+    from .clients import get_supabase
+except ImportError:
+    from clients import get_supabase
+
+LEASE_TTL_SECONDS = int(os.environ.get("SEEDER_LEASE_SECONDS", "300"))
+# Keys sent per claim round trip
+LEASE_BATCH_SIZE = int(os.environ.get("SEEDER_LEASE_BATCH_SIZE", "10"))
+# A Postgres DSN here (e.g. a local Postgres with sql/seeder_leases.sql applied) bypasses PostgREST
+LEASE_DSN = os.environ.get("SEEDER_LEASE_DSN")
+
+
+def default_owner() -> str:
+    return os.environ.get("SEEDER_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class SupabaseLeaseBackend:
+    """Calls the sql/seeder_leases.sql functions through PostgREST."""
+
+    def __init__(self, supabase=None):
+        self.supabase = supabase or get_supabase()
+
+    def claim(self, resource: str, keys: list[str], owner: str, ttl_seconds: int) -> list[str]:
+        response = self.supabase.rpc(
+            "claim_seeder_leases",
+            {"p_resource": resource, "p_keys": keys, "p_owner": owner, "p_ttl_seconds": ttl_seconds},
+        ).execute()
+        return [row["lease_key"] for row in response.data or []]
+
+    def heartbeat(self, owner: str, ttl_seconds: int) -> int:
+        response = self.supabase.rpc(
+            "heartbeat_seeder_leases", {"p_owner": owner, "p_ttl_seconds": ttl_seconds}
+        ).execute()
+        return response.data or 0
+
+    def release(self, resource: str, keys: list[str], owner: str) -> int:
+        response = self.supabase.rpc(
+            "release_seeder_leases", {"p_resource": resource, "p_keys": keys, "p_owner": owner}
+        ).execute()
+        return response.data or 0
+
+
+class PostgresLeaseBackend:
+    """The same functions over a direct psycopg connection, for a local Postgres or a pooler URL."""
+
+    def __init__(self, dsn: str):
+        if psycopg is None:
+            raise RuntimeError("psycopg is required for SEEDER_LEASE_DSN (pip install 'psycopg[binary]')")
+        self.conn = psycopg.connect(dsn, autocommit=True)
+        self._lock = threading.Lock()
+
+    def _call(self, sql: str, params: tuple) -> list[tuple]:
+        with self._lock, self.conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def claim(self, resource: str, keys: list[str], owner: str, ttl_seconds: int) -> list[str]:
+        rows = self._call("SELECT lease_key FROM claim_seeder_leases(%s, %s, %s, %s)", (resource, keys, owner, ttl_seconds))
+        return [row[0] for row in rows]
+
+    def heartbeat(self, owner: str, ttl_seconds: int) -> int:
+        return self._call("SELECT heartbeat_seeder_leases(%s, %s)", (owner, ttl_seconds))[0][0]
+
+    def release(self, resource: str, keys: list[str], owner: str) -> int:
+        return self._call("SELECT release_seeder_leases(%s, %s, %s)", (resource, keys, owner))[0][0]
+
+
+def default_backend(supabase=None):
+    """psycopg when SEEDER_LEASE_DSN is set, else PostgREST on the given (or shared) Supabase client."""
+    return PostgresLeaseBackend(LEASE_DSN) if LEASE_DSN else SupabaseLeaseBackend(supabase)
+
+
+class LeaseClient:
+    """
+    Claims units of work in the shared seeder_leases table so any number of
+    instances can run the same seeder without doing the same work twice.
+    Leases are renewed by a heartbeat thread while the client is open and
+    released on close; an instance that dies stops renewing, and its leases
+    become claimable again once they expire.
+
+        with LeaseClient() as leases:
+            for page in leases.claimed("sitemap_page", pages, key=lambda page: page["id"]):
+                process(page)
+    """
+
+    def __init__(self, backend=None, owner: str | None = None, ttl_seconds: int = LEASE_TTL_SECONDS):
+        self.backend = backend or default_backend()
+        self.owner = owner or default_owner()
+        self.ttl_seconds = ttl_seconds
+        self.held: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def claim(self, resource: str, keys) -> list[str]:
+        """The subset of keys now leased to this owner (free, expired, or already ours)."""
+        keys = list(dict.fromkeys(str(key) for key in keys))
+        if not keys:
+            return []
+        won = self.backend.claim(resource, keys, self.owner, self.ttl_seconds)
+        with self._lock:
+            self.held.setdefault(resource, set()).update(won)
+        return won
+
+    def release(self, resource: str, keys) -> None:
+        keys = [str(key) for key in keys]
+        if not keys:
+            return
+        self.backend.release(resource, keys, self.owner)
+        with self._lock:
+            self.held.get(resource, set()).difference_update(keys)
+
+    def release_all(self) -> None:
+        with self._lock:
+            held = {resource: list(keys) for resource, keys in self.held.items() if keys}
+        for resource, keys in held.items():
+            self.release(resource, keys)
+
+    def claimed(self, resource: str, items, key, batch_size: int = LEASE_BATCH_SIZE):
+        """
+        Yields the items this owner wins a lease for, claiming batch_size at a
+        time. Items are taken in a per-instance random order so instances
+        working through the same list mostly claim disjoint batches instead of
+        contending for the same head of the list. Leases stay held until close,
+        so another instance running the same list later in this run skips them.
+        """
+        pending = list(items)
+        random.shuffle(pending)
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start : start + batch_size]
+            won = set(self.claim(resource, [key(item) for item in batch]))
+            for item in batch:
+                if str(key(item)) in won:
+                    yield item
+
+    def _beat(self) -> None:
+        while not self._stop.wait(self.ttl_seconds / 3):
+            try:
+                self.backend.heartbeat(self.owner, self.ttl_seconds)
+            except Exception as e:
+                print(f"⚠️ Lease heartbeat failed for {self.owner}: {e}", flush=True)
+
+    def open(self) -> "LeaseClient":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._beat, name=f"lease-heartbeat-{self.owner}", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.release_all()
+
+    def __enter__(self) -> "LeaseClient":
+        return self.open()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,289 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+from difflib import SequenceMatcher
+
+import requests
+
+try:
+    from .captions import TIMED_TRANSCRIPT_TYPES, parse_transcript
+    from .seeder_cache import load_json, save_json
+except ImportError:
+    from captions import TIMED_TRANSCRIPT_TYPES, parse_transcript
+    from seeder_cache import load_json, save_json
+
+DIRECTORY_CACHE = "podcast-directory.json"
+DIRECTORY_TTL_SECONDS = int(os.environ.get("PODCAST_DIRECTORY_TTL_DAYS", "30")) * 86400
+# A feed revalidated this recently is trusted without even a conditional request
+FEED_FRESH_SECONDS = int(os.environ.get("PODCAST_FEED_FRESH_SECONDS", "900"))
+FEED_INDEX_VERSION = 3
+GRAM_SIZE = 3
+# Trigrams shared by most titles (the show name, "episode") say nothing about a match
+STOP_GRAM_RATIO = 0.5
+CANDIDATE_LIMIT = 5
+MATCH_THRESHOLD = 0.65
+
+_TITLE_PREFIX_RE = re.compile(r"^\s*(?:ep(?:isode)?\.?\s*\d+|#\d+|\d+\s*[.:)-])\s*[:.\-–—|]?\s*", re.I)
+_NON_WORD_RE = re.compile(r"[^\w\s]+")
+_SPACE_RE = re.compile(r"\s+")
+
+_lock = threading.Lock()
+_directory = None
+_feeds: dict[str, "FeedIndex"] = {}
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase, punctuation-free, episode-number-free form used as the lookup key."""
+    text = _TITLE_PREFIX_RE.sub("", (title or "").lower())
+    text = _NON_WORD_RE.sub(" ", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def _grams(key: str) -> set[str]:
+    padded = f" {key} "
+    return {padded[i:i + GRAM_SIZE] for i in range(max(1, len(padded) - GRAM_SIZE + 1))}
+
+
+def parse_duration(value) -> float | None:
+    """Seconds from an <itunes:duration> of "3600", "59:30" or "1:02:03"."""
+    if not value:
+        return None
+    try:
+        seconds = 0.0
+        for part in str(value).strip().split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds or None
+    except ValueError:
+        return None
+
+
+def get_mp3_link(entry):
+    for link in entry.get("links", []):
+        if link.get("type") == 'audio/mpeg' or link.get("href", "").endswith('.mp3'):
+            return link["href"]
+    return None
+
+
+_TRANSCRIPT_EXTENSIONS = {".json": "application/json", ".vtt": "text/vtt", ".srt": "application/x-subrip"}
+_TRANSCRIPT_PREFERENCE = list(TIMED_TRANSCRIPT_TYPES)
+
+
+def _transcript_type(track: dict) -> str | None:
+    mime_type = (track.get("type") or "").split(";")[0].strip().lower()
+    if mime_type in TIMED_TRANSCRIPT_TYPES:
+        return mime_type
+    path = (track.get("url") or "").split("?")[0].lower()
+    return next((guess for ext, guess in _TRANSCRIPT_EXTENSIONS.items() if path.endswith(ext)), None)
+
+
+def published_transcripts(raw_feed: bytes) -> dict[str, list[dict]]:
+    """
+    Maps each item's guid (or title) to its timed <podcast:transcript> links,
+    best format first. feedparser keeps only one such tag per entry, so the
+    raw XML is read directly.
+    """
+    try:
+        root = ET.fromstring(raw_feed)
+    except ET.ParseError:
+        return {}
+    found = {}
+    for item in root.iter("item"):
+        tracks = []
+        for child in item:
+            tag = child.tag if isinstance(child.tag, str) else ""
+            if tag.endswith("}transcript") and ("podcastindex" in tag or "podcast-namespace" in tag):
+                track = {"url": child.get("url"), "type": child.get("type"), "language": child.get("language")}
+                track["type"] = _transcript_type(track)
+                if track["url"] and track["type"]:
+                    tracks.append(track)
+        if tracks:
+            tracks.sort(key=lambda track: _TRANSCRIPT_PREFERENCE.index(track["type"]))
+            key = (item.findtext("guid") or item.findtext("title") or "").strip()
+            found[key] = tracks
+    return found
+
+
+def fetch_published_transcript(entry: dict):
+    """Segments from the episode's published transcript, or None to fall back to Whisper."""
+    for track in entry.get("transcripts") or []:
+        try:
+            response = requests.get(track["url"], timeout=30)
+            response.raise_for_status()
+            body = response.json() if track["type"] == "application/json" else response.text
+            segments = parse_transcript(body, track["type"])
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"      ⚠️ Published transcript unusable ({track['url']}): {e}")
+            continue
+        if segments:
+            print(f"   📜 Using published {track['type']} transcript ({len(segments)} segments).")
+            return segments
+    return None
+
+
+class FeedIndex:
+    """
+    A parsed feed reduced to its episodes plus a normalized-title index: an exact
+    key map and trigram postings, so matching an episode title inspects a few
+    candidates instead of fuzzy-comparing every entry.
+    """
+
+    def __init__(self, feed_url: str, entries: list[dict], etag=None, last_modified=None, fetched_at=0.0):
+        self.feed_url = feed_url
+        self.entries = entries
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.exact: dict[str, int] = {}
+        self.postings: dict[str, list[int]] = {}
+        self._build()
+
+    def _build(self) -> None:
+        postings: dict[str, list[int]] = {}
+        for idx, entry in enumerate(self.entries):
+            self.exact.setdefault(entry["key"], idx)
+            for gram in _grams(entry["key"]):
+                postings.setdefault(gram, []).append(idx)
+        limit = max(2, int(len(self.entries) * STOP_GRAM_RATIO))
+        self.postings = {gram: ids for gram, ids in postings.items() if len(ids) <= limit}
+
+    @classmethod
+    def from_parsed(cls, feed_url: str, parsed, etag=None, last_modified=None, raw_feed=None) -> "FeedIndex":
+        transcripts = published_transcripts(raw_feed) if raw_feed else {}
+        entries = []
+        for entry in parsed.entries:
+            title = entry.get("title") or ""
+            guid = entry.get("id") or entry.get("link")
+            entries.append({
+                "title": title,
+                "key": normalize_title(title),
+                "audio_url": get_mp3_link(entry),
+                "guid": guid,
+                "link": entry.get("link"),
+                "published": entry.get("published"),
+                "duration": parse_duration(entry.get("itunes_duration")),
+                "transcripts": transcripts.get(guid or "") or transcripts.get(title.strip()) or [],
+            })
+        return cls(feed_url, entries, etag, last_modified, time.time())
+
+    def find(self, target_title: str):
+        """Returns (entry, score) for the best-matching episode, or (None, 0)."""
+        key = normalize_title(target_title)
+        if not key:
+            return None, 0.0
+        if key in self.exact:
+            return self.entries[self.exact[key]], 1.0
+        shared = Counter()
+        for gram in _grams(key):
+            for idx in self.postings.get(gram, ()):
+                shared[idx] += 1
+        best_entry, best_score = None, 0.0
+        for idx, _ in shared.most_common(CANDIDATE_LIMIT):
+            entry = self.entries[idx]
+            if key in entry["key"] or entry["key"] in key:
+                return entry, 1.0
+            score = SequenceMatcher(None, key, entry["key"]).ratio()
+            if score > best_score:
+                best_entry, best_score = entry, score
+        if best_score > MATCH_THRESHOLD:
+            return best_entry, best_score
+        return None, best_score
+
+    def to_dict(self) -> dict:
+        return {
+            "v": FEED_INDEX_VERSION,
+            "feed_url": self.feed_url,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "fetched_at": self.fetched_at,
+            "entries": self.entries,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "FeedIndex | None":
+        if not payload or payload.get("v") != FEED_INDEX_VERSION:
+            return None
+        return cls(
+            payload["feed_url"],
+            payload["entries"],
+            payload.get("etag"),
+            payload.get("last_modified"),
+            payload.get("fetched_at", 0.0),
+        )
+
+
+def _feed_cache_name(feed_url: str) -> str:
+    return f"podcast-feed-{hashlib.sha1(feed_url.encode('utf-8')).hexdigest()[:16]}.json"
+
+
+def _load_directory() -> dict:
+    global _directory
+    if _directory is None:
+        _directory = load_json(DIRECTORY_CACHE, {})
+    return _directory
+
+
+def cached_feed_url(show_name: str) -> str | None:
+    with _lock:
+        hit = _load_directory().get(normalize_title(show_name))
+    if hit and time.time() - hit.get("resolved_at", 0) < DIRECTORY_TTL_SECONDS:
+        return hit["feed_url"]
+    return None
+
+
+def remember_feed_url(show_name: str, feed_url: str) -> None:
+    with _lock:
+        directory = _load_directory()
+        directory[normalize_title(show_name)] = {"feed_url": feed_url, "resolved_at": time.time()}
+        save_json(DIRECTORY_CACHE, directory)
+
+
+def load_feed(feed_url: str) -> FeedIndex | None:
+    """
+    The episode index for feed_url. Served from memory, then disk; a stale copy
+    is revalidated with ETag/Last-Modified so an unchanged feed is not re-downloaded.
+    """
+    with _lock:
+        cached = _feeds.get(feed_url)
+    if cached is None:
+        cached = FeedIndex.from_dict(load_json(_feed_cache_name(feed_url)))
+    if cached is not None and time.time() - cached.fetched_at < FEED_FRESH_SECONDS:
+        with _lock:
+            _feeds[feed_url] = cached
+        return cached
+
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+    import feedparser
+
+    try:
+        response = requests.get(feed_url, headers=headers, timeout=30)
+        if response.status_code == 304 and cached is not None:
+            print("      📦 Feed unchanged; using cached episode index.")
+            cached.fetched_at = time.time()
+            feed = cached
+        else:
+            response.raise_for_status()
+            feed = FeedIndex.from_parsed(
+                feed_url,
+                feedparser.parse(response.content),
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+                response.content,
+            )
+    except requests.exceptions.RequestException as e:
+        print(f"      ⚠️ Feed fetch failed: {e}")
+        if cached is None:
+            return None
+        feed = cached
+    save_json(_feed_cache_name(feed_url), feed.to_dict())
+    with _lock:
+        _feeds[feed_url] = feed
+    return feed
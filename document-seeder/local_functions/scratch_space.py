@@ -0,0 +1,147 @@
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+
+MB = 1024 * 1024
+
+SCRATCH_ROOT = os.environ.get("SEEDER_SCRATCH_DIR")
+TMPFS_ROOT = os.environ.get("SEEDER_TMPFS_DIR", "/dev/shm")
+TMPFS_MIN_FREE_BYTES = int(os.environ.get("SEEDER_TMPFS_MIN_FREE_MB", "512")) * MB
+SPOOL_MAX_BYTES = int(os.environ.get("SEEDER_SPOOL_MAX_MB", "16")) * MB
+
+DIR_PREFIX = "seeder-job-"
+
+_live_spaces = set()
+_live_lock = threading.Lock()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def sweep_orphaned_spaces(root: Path) -> None:
+    """Removes scratch dirs left behind by processes that crashed or were killed."""
+    try:
+        entries = list(root.iterdir())
+    except OSError:
+        return
+    for entry in entries:
+        if not entry.is_dir() or not entry.name.startswith(DIR_PREFIX):
+            continue
+        try:
+            pid = int(entry.name[len(DIR_PREFIX):].split("-", 1)[0])
+        except ValueError:
+            continue
+        if pid != os.getpid() and not _pid_alive(pid):
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def choose_scratch_root(expected_bytes: int = 0) -> Path:
+    """
+    Picks where job directories live: SEEDER_SCRATCH_DIR if set, otherwise a
+    tmpfs mount with enough headroom for the job, otherwise the system temp dir.
+    """
+    if SCRATCH_ROOT:
+        return Path(SCRATCH_ROOT)
+    tmpfs = Path(TMPFS_ROOT)
+    if tmpfs.is_dir() and os.access(tmpfs, os.W_OK):
+        try:
+            free = shutil.disk_usage(tmpfs).free
+        except OSError:
+            free = 0
+        if free - expected_bytes >= TMPFS_MIN_FREE_BYTES:
+            return tmpfs
+    return Path(tempfile.gettempdir())
+
+
+class ScratchSpace:
+    """
+    A unique, self-cleaning working directory for one seeding job.
+
+    Use it as a context manager; the directory is removed on completion or on
+    error, at interpreter exit, and, if the process was killed outright, by the
+    next job that starts on the same root.
+    """
+
+    def __init__(self, job_name: str, expected_bytes: int = 0, root: Path | None = None):
+        self.job_name = job_name
+        self.root = Path(root) if root else choose_scratch_root(expected_bytes)
+        self.root.mkdir(parents=True, exist_ok=True)
+        sweep_orphaned_spaces(self.root)
+        safe_name = "".join(c if c.isalnum() else "_" for c in job_name)[:40]
+        self.path = self.root / f"{DIR_PREFIX}{os.getpid()}-{safe_name}-{uuid.uuid4().hex[:8]}"
+        self.path.mkdir()
+        self.peak_bytes = 0
+        self._spools = []
+        self._closed = False
+        with _live_lock:
+            _live_spaces.add(self)
+
+    def file(self, name: str) -> Path:
+        return self.path / name
+
+    def spool(self, max_size: int = SPOOL_MAX_BYTES, suffix: str = ""):
+        """An in-memory file that rolls over into this directory past max_size bytes."""
+        spooled = tempfile.SpooledTemporaryFile(max_size=max_size, suffix=suffix, dir=self.path)
+        self._spools.append(spooled)
+        return spooled
+
+    def measure(self) -> int:
+        """Returns bytes currently held (on disk and in memory spools) and updates the peak."""
+        total = 0
+        for dirpath, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, filename))
+                except OSError:
+                    pass
+        # Spools that rolled over are unlinked temp files, so os.walk never sees them
+        for spooled in self._spools:
+            if spooled.closed:
+                continue
+            position = spooled.tell()
+            spooled.seek(0, os.SEEK_END)
+            total += spooled.tell()
+            spooled.seek(position)
+        self.peak_bytes = max(self.peak_bytes, total)
+        return total
+
+    def cleanup(self) -> None:
+        if self._closed:
+            return
+        self.measure()
+        self._closed = True
+        for spooled in self._spools:
+            try:
+                spooled.close()
+            except Exception:
+                pass
+        shutil.rmtree(self.path, ignore_errors=True)
+        with _live_lock:
+            _live_spaces.discard(self)
+        print(f"   🧹 Scratch '{self.job_name}' cleaned up (peak {self.peak_bytes / MB:.1f}MB in {self.root})")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
+
+
+@atexit.register
+def _cleanup_live_spaces() -> None:
+    with _live_lock:
+        spaces = list(_live_spaces)
+    for space in spaces:
+        space.cleanup()
@@ -1,33 +1,34 @@
 import os
+import re
 import sys
 import json
-import nest_asyncio
-from dotenv import load_dotenv
-from llama_parse import LlamaParse  # <--- NEW IMPORT
-from llama_index.core.node_parser import MarkdownNodeParser
-from llama_index.embeddings.openai import OpenAIEmbedding
-from supabase import create_client, Client
 
-# 0. Apply nest_asyncio (Required for LlamaParse in some envs)
-nest_asyncio.apply()
+try:
+    from .clients import embed_model, load_env, require_env, supabase
+    from .estimate import Estimate, estimate_requested
+except ImportError:
+    from clients import embed_model, load_env, require_env, supabase
+    from estimate import Estimate, estimate_requested
 
-# 1. Load Environment Variables
-load_dotenv()
+# 1. Load Environment Variables; clients are built on first use
+load_env()
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-LLAMA_CLOUD_API_KEY = os.getenv("LLAMA_CLOUD_API_KEY") # <--- NEW KEY
+# A text-dense page, for PDFs whose text can't be read locally
+TOKENS_PER_PAGE = int(os.getenv("PDF_ESTIMATE_TOKENS_PER_PAGE", "600"))
+# MarkdownNodeParser splits on headings; a typical section when the headings aren't known yet
+SECTION_TOKENS = int(os.getenv("PDF_ESTIMATE_SECTION_TOKENS", "400"))
+_PAGE_RE = re.compile(rb"/Type\s*/Page(?!s)")
 
-if not SUPABASE_URL or not SUPABASE_KEY or not LLAMA_CLOUD_API_KEY:
-    print("Error: Missing keys (Supabase or LlamaCloud) in .env")
-    sys.exit(1)
+def seed_pdf(file_path: str, provider_id: int):
+    # LlamaParse and llama_index are heavy, so they load only when a PDF is seeded
+    import nest_asyncio
+    from llama_parse import LlamaParse
+    from llama_index.core.node_parser import MarkdownNodeParser
 
-# 2. Initialize Clients
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-embed_model = OpenAIEmbedding(model="text-embedding-3-small")
+    # Apply nest_asyncio (Required for LlamaParse in some envs)
+    nest_asyncio.apply()
+    LLAMA_CLOUD_API_KEY = require_env("LLAMA_CLOUD_API_KEY")[0]
 
-def seed_pdf(file_path: str, provider_id: int):
     print(f"🔵 Starting LlamaParse Ingest for: {file_path}")
     
     if not os.path.exists(file_path):
@@ -110,8 +111,41 @@ def seed_pdf(file_path: str, provider_id: int):
 
     print(f"\n✅ Successfully ingested {file_name} using LlamaParse!")
 
+def estimate_pdf(file_path: str, provider_id: int):
+    """
+    LlamaParse pages and embedding tokens for a PDF, read locally: nothing is
+    uploaded. Text comes from pypdf when installed, else a per-page average.
+    """
+    estimate = Estimate(f"PDF {os.path.basename(file_path)}")
+    if not os.path.exists(file_path):
+        print(f"❌ File not found: {file_path}")
+        return estimate
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        PdfReader = None
+    if PdfReader is not None:
+        reader = PdfReader(file_path)
+        pages = len(reader.pages)
+        text = "\n".join(page.extract_text() or "" for page in reader.pages)
+        estimate.add_text(text, chunk_tokens=SECTION_TOKENS, overlap_tokens=0, embed_batch=1, insert_batch=10)
+    else:
+        with open(file_path, "rb") as handle:
+            pages = len(_PAGE_RE.findall(handle.read()))
+        estimate.add_tokens(pages * TOKENS_PER_PAGE, chunk_tokens=SECTION_TOKENS, overlap_tokens=0, embed_batch=1, insert_batch=10)
+        estimate.note(f"pypdf not installed; assumed {TOKENS_PER_PAGE} tokens per page.")
+    estimate.note("Chunk count is approximate: MarkdownNodeParser splits LlamaParse output on headings.")
+    estimate.add_parse_pages(pages)
+    estimate.add_requests("supabase")
+    estimate.add_item()
+    return estimate
+
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python pdf-seeder.py <path_to_pdf> <provider_id>")
+    args = sys.argv[1:]
+    estimate = estimate_requested(args)
+    if len(args) < 2:
+        print("Usage: python pdf-seeder.py <path_to_pdf> <provider_id> [--estimate]")
+    elif estimate:
+        estimate_pdf(args[0], int(args[1])).report()
     else:
-        seed_pdf(sys.argv[1], int(sys.argv[2]))
\ No newline at end of file
+        seed_pdf(args[0], int(args[1]))
\ No newline at end of file
@@ -1,30 +1,19 @@
 import os
 import sys
 import time
-import cloudscraper  # <--- The magic fix
-import trafilatura
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
-from dotenv import load_dotenv
-from llama_index.core.node_parser import SentenceSplitter
-from llama_index.embeddings.openai import OpenAIEmbedding
-from supabase import create_client, Client
 
-# 1. Setup
-load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+try:
+    from .clients import embed_model, load_env, scraper, supabase
+    from .estimate import Estimate, estimate_requested
+    from .url_canonicalizer import normalize_url
+except ImportError:
+    from clients import embed_model, load_env, scraper, supabase
+    from estimate import Estimate, estimate_requested
+    from url_canonicalizer import normalize_url
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("Error: Database keys missing.")
-    sys.exit(1)
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-embed_model = OpenAIEmbedding(model="text-embedding-3-small")
-
-# Initialize the Scraper (pretends to be a real Desktop Chrome browser)
-scraper = cloudscraper.create_scraper(browser='chrome')
+# 1. Setup: clients (including the Cloudscraper session) are built on first use
+load_env()
 
 VISITED_URLS = set()
 
@@ -32,6 +21,8 @@ def get_internal_links(base_url, current_url, html_content):
     if not html_content:
         return []
         
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html_content, 'html.parser')
     links = set()
     
@@ -41,35 +32,29 @@ def get_internal_links(base_url, current_url, html_content):
         if href.startswith(('mailto:', 'tel:', 'javascript:', '#')):
             continue
 
-        full_url = urljoin(current_url, href)
-        full_url = full_url.split('#')[0].split('?')[0]
-        
-        if full_url.endswith('/'):
-            full_url = full_url[:-1]
+        # The crawl follows paths only, so sort and filter variants can't multiply the queue
+        full_url = normalize_url(urljoin(current_url, href).split('?')[0])
 
         if full_url.startswith(base_url) and full_url not in VISITED_URLS:
             links.add(full_url)
             
     return links
 
-def ingest_url(url, provider_id):
-    clean_url_check = url[:-1] if url.endswith('/') else url
-    if clean_url_check in VISITED_URLS:
-        return []
-    
-    print(f"🕷️  Crawling: {url}")
-    VISITED_URLS.add(clean_url_check)
-
+def fetch_page(url):
+    """(html, main_text) for a page, or (None, None) when it can't be fetched."""
     # --- CHANGED: Use Cloudscraper instead of Requests ---
     try:
         response = scraper.get(url) # Handles the 403 logic automatically
         if response.status_code != 200:
             print(f"   ❌ Status {response.status_code}: Skipping.")
-            return []
+            return None, None
         html_content = response.text
     except Exception as e:
         print(f"   ❌ Network Error: {e}")
-        return []
+        return None, None
+
+    import trafilatura
+    from bs4 import BeautifulSoup
 
     # Extract Clean Text
     main_text = trafilatura.extract(html_content, include_comments=False, include_tables=True)
@@ -79,11 +64,48 @@ def ingest_url(url, provider_id):
         for script in soup(["script", "style", "nav", "footer"]):
             script.decompose()
         main_text = soup.get_text(separator=' ', strip=True)
+    return html_content, main_text
+
+def is_indexed(url, provider_id):
+    """True when the provider already has a document for this exact URL."""
+    res = (
+        supabase.table("provider_documents")
+        .select("id")
+        .eq("provider_id", provider_id)
+        .eq("source_url", url)
+        .limit(1)
+        .execute()
+    )
+    return bool(res.data)
+
+def ingest_url(url, provider_id):
+    clean_url_check = normalize_url(url)
+    if clean_url_check in VISITED_URLS:
+        return []
+    
+    print(f"🕷️  Crawling: {url}")
+    VISITED_URLS.add(clean_url_check)
+
+    html_content, main_text = fetch_page(url)
+    if html_content is None:
+        return []
 
     if not main_text or len(main_text) < 50:
         print("   ⚠️  Skipping: Not enough content text found.")
         return get_internal_links(url, url, html_content)
 
+    # provider_documents is unique on (provider_id, source_url), so a re-crawl
+    # skips stored pages but still follows their links to reach new ones
+    try:
+        if is_indexed(url, provider_id):
+            print("   ⏭️ Already indexed.")
+            return get_internal_links(url, url, html_content)
+    except Exception as e:
+        print(f"   ❌ DB Error: {e}")
+        return get_internal_links(url, url, html_content)
+
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html_content, 'html.parser')
     page_title = soup.title.string.strip() if soup.title else url
 
@@ -101,9 +123,11 @@ def ingest_url(url, provider_id):
         document_id = res.data[0]['id']
     except Exception as e:
         print(f"   ❌ DB Error: {e}")
-        return []
+        return get_internal_links(url, url, html_content)
 
     # Vectorise
+    from llama_index.core.node_parser import SentenceSplitter
+
     try:
         text_splitter = SentenceSplitter(chunk_size=1024, chunk_overlap=50)
         nodes = text_splitter.split_text(main_text)
@@ -133,29 +157,62 @@ def ingest_url(url, provider_id):
 
     return get_internal_links(url, url, html_content)
 
-def crawl_site(start_url, provider_id):
-    if start_url.endswith('/'):
-        start_url = start_url[:-1]
-        
+def estimate_url(url, estimate):
+    """ingest_url without the insert and embeddings: the page is fetched and its text measured."""
+    clean_url_check = normalize_url(url)
+    if clean_url_check in VISITED_URLS:
+        return []
+    print(f"🕷️  Crawling: {url}")
+    VISITED_URLS.add(clean_url_check)
+    estimate.add_requests("http")
+    estimate.add_wait(2.0)
+
+    html_content, main_text = fetch_page(url)
+    if html_content is None:
+        return []
+    if not main_text or len(main_text) < 50:
+        estimate.add_skipped()
+    else:
+        estimate.add_item()
+        estimate.add_requests("supabase")
+        # SentenceSplitter(1024, 50), one embedding call per chunk, inserts of 10
+        estimate.add_text(main_text, chunk_tokens=1024, overlap_tokens=50, embed_batch=1, insert_batch=10)
+    return get_internal_links(url, url, html_content)
+
+def estimate_site(start_url, provider_id):
+    """Crawls the site as crawl_site would, pausing the same 2s per page, but stores nothing."""
+    estimate = Estimate(f"site crawl {start_url}")
+    crawl_site(start_url, provider_id, estimate)
+    return estimate
+
+def crawl_site(start_url, provider_id, estimate=None):
+    start_url = normalize_url(start_url)
+    # A warm worker crawls many sites; visited pages are per crawl
+    VISITED_URLS.clear()
+
     print(f"🚀 Starting Cloudscraper Crawl for: {start_url}")
     
     queue = [start_url]
     
     while queue:
         current_url = queue.pop(0)
-        found_links = ingest_url(current_url, provider_id)
+        found_links = estimate_url(current_url, estimate) if estimate is not None else ingest_url(current_url, provider_id)
         
         for link in found_links:
-            check_link = link[:-1] if link.endswith('/') else link
-            if check_link not in VISITED_URLS and link not in queue:
+            if link not in VISITED_URLS and link not in queue:
                 queue.append(link)
         
         time.sleep(2.0) # increased sleep slightly to be safer
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python seed-site.py <start_url> <provider_id>")
+    args = sys.argv[1:]
+    estimate = estimate_requested(args)
+    if len(args) < 2:
+        print("Usage: python seed-site.py <start_url> <provider_id> [--estimate]")
     else:
-        start_arg = sys.argv[1]
-        id_arg = int(sys.argv[2])
-        crawl_site(start_arg, id_arg)
\ No newline at end of file
+        start_arg = args[0]
+        id_arg = int(args[1])
+        if estimate:
+            estimate_site(start_arg, id_arg).report()
+        else:
+            crawl_site(start_arg, id_arg)
\ No newline at end of file
@@ -1,30 +1,44 @@
+import contextlib
 import os
 import sys
+import threading
+import time
 import requests
-import feedparser
-import cloudscraper
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from difflib import SequenceMatcher
-from dotenv import load_dotenv
-from openai import OpenAI
-from pydub import AudioSegment
-from llama_index.embeddings.openai import OpenAIEmbedding
-from supabase import create_client, Client
-
-# 1. Setup
-load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-if not SUPABASE_URL or not SUPABASE_KEY or not OPENAI_API_KEY:
-    print("Error: Database or OpenAI keys missing.")
-    sys.exit(1)
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-embed_model = OpenAIEmbedding(model="text-embedding-3-small")
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-scraper = cloudscraper.create_scraper(browser='chrome')
+
+try:
+    from .clients import embed_model, load_env, openai_client, scraper, supabase
+    from .estimate import Estimate, estimate_requested, sample
+    from .audio_fingerprint import clone_document_knowledge, find_matching_document, fingerprint_file, save_fingerprint
+    from .knowledge_store import build_transcript_rows, embed_texts, insert_knowledge_rows, remove_document
+    from .podcast_feeds import cached_feed_url, fetch_published_transcript, load_feed, remember_feed_url
+    from .scratch_space import ScratchSpace
+    from .transcript_chunker import chunk_segments
+    from .url_canonicalizer import canonical_url, resolve_many
+    from .word_index import build_word_index, save_word_index, whisper_granularities
+except ImportError:
+    from clients import embed_model, load_env, openai_client, scraper, supabase
+    from estimate import Estimate, estimate_requested, sample
+    from audio_fingerprint import clone_document_knowledge, find_matching_document, fingerprint_file, save_fingerprint
+    from knowledge_store import build_transcript_rows, embed_texts, insert_knowledge_rows, remove_document
+    from podcast_feeds import cached_feed_url, fetch_published_transcript, load_feed, remember_feed_url
+    from scratch_space import ScratchSpace
+    from transcript_chunker import chunk_segments
+    from url_canonicalizer import canonical_url, resolve_many
+    from word_index import build_word_index, save_word_index, whisper_granularities
+
+# 1. Setup: clients are built on first use
+load_env()
+
+METADATA_WORKERS = int(os.getenv("SPOTIFY_METADATA_WORKERS", "8"))
+DOWNLOAD_WORKERS = int(os.getenv("SPOTIFY_DOWNLOAD_WORKERS", "3"))
+TRANSCRIBE_WORKERS = int(os.getenv("SPOTIFY_TRANSCRIBE_WORKERS", "4"))
+EXISTING_LOOKUP_BATCH_SIZE = 100
+# (connect, read) seconds; for downloads the read timeout is per chunk, so a stalled CDN frees its slot
+HTTP_TIMEOUT = (10, 30)
+DOWNLOAD_TIMEOUT = (10, 60)
 
 def clean_text(text):
     if not text: return ""
@@ -33,7 +47,7 @@ def clean_text(text):
 def get_spotify_metadata(url):
     print(f"   🔎 Scraping Spotify Metadata...")
     try:
-        response = scraper.get(url)
+        response = scraper.get(url, timeout=HTTP_TIMEOUT)
         if response.status_code != 200:
             return None, None
         
@@ -66,78 +80,75 @@ def get_spotify_metadata(url):
         return None, None
 
 def find_rss_feed(show_name):
+    feed_url = cached_feed_url(show_name)
+    if feed_url:
+        print(f"   📡 Using cached feed for '{show_name}'")
+        return feed_url
     print(f"   📡 Searching Directory for '{show_name}'...")
     clean_name = show_name.split(':')[0].strip()
     try:
         search_url = f"https://itunes.apple.com/search?term={clean_name}&media=podcast&limit=5"
-        res = requests.get(search_url).json()
+        res = requests.get(search_url, timeout=HTTP_TIMEOUT).json()
         if res['resultCount'] == 0: return None
             
         best_feed = None
         best_ratio = 0
         for result in res['results']:
             ratio = SequenceMatcher(None, show_name.lower(), result['collectionName'].lower()).ratio()
-            if ratio > 0.8: return result['feedUrl']
+            if ratio > 0.8:
+                best_feed = result['feedUrl']
+                break
             if ratio > best_ratio:
                 best_ratio = ratio
                 best_feed = result['feedUrl']
+        if best_feed:
+            remember_feed_url(show_name, best_feed)
         return best_feed
     except Exception as e:
         return None
 
-def find_audio_url(feed_url, target_title):
-    print(f"   📖 Parsing RSS Feed...")
-    feed = feedparser.parse(feed_url)
-    target_lower = target_title.lower()
-    
-    best_entry = None
-    best_score = 0
-    
-    for entry in feed.entries:
-        rss_title_lower = entry.title.lower()
-        if target_lower in rss_title_lower or rss_title_lower in target_lower:
-            return get_mp3_link(entry), entry.title
-        ratio = SequenceMatcher(None, target_lower, rss_title_lower).ratio()
-        if ratio > best_score:
-            best_score = ratio
-            best_entry = entry
-
-    if best_entry and best_score > 0.65:
-        return get_mp3_link(best_entry), best_entry.title
-    return None, None
-
-def get_mp3_link(entry):
-    for link in entry.links:
-        if link.type == 'audio/mpeg' or link.href.endswith('.mp3'):
-            return link.href
-    return None
-
-def download_and_compress(mp3_url):
+def find_episode(feed_url, target_title):
+    print(f"   📖 Loading RSS Feed...")
+    feed = load_feed(feed_url)
+    if feed is None:
+        return None
+    entry, _ = feed.find(target_title)
+    return entry
+
+def download_and_compress(mp3_url, scratch):
+    """
+    Downloads the episode into the job's scratch space (an in-memory spool for
+    small files) and writes a mono 32k copy next to it for Whisper.
+    """
+    from pydub import AudioSegment
+
     print(f"   ⬇️  Downloading Audio...")
-    raw_filename = "temp_raw.mp3"
-    compressed_filename = "temp_compressed.mp3"
+    compressed_filename = str(scratch.file("compressed.mp3"))
     try:
-        with requests.get(mp3_url, stream=True) as r:
+        with requests.get(mp3_url, stream=True, timeout=DOWNLOAD_TIMEOUT) as r:
             r.raise_for_status()
-            with open(raw_filename, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
-        
-        file_size_mb = os.path.getsize(raw_filename) / (1024 * 1024)
+            # Large episodes roll over from memory onto the scratch dir automatically
+            raw = scratch.spool(suffix=".mp3")
+            for chunk in r.iter_content(chunk_size=65536):
+                raw.write(chunk)
+            file_size_mb = raw.tell() / (1024 * 1024)
+            raw.seek(0)
+        scratch.measure()
         print(f"      📦 Compressing {file_size_mb:.1f}MB file...")
         
-        audio = AudioSegment.from_file(raw_filename)
+        audio = AudioSegment.from_file(raw)
         audio = audio.set_channels(1)
         audio.export(compressed_filename, format="mp3", bitrate="32k")
-        
-        os.remove(raw_filename)
+        scratch.measure()
+        raw.close()
         return compressed_filename
     except Exception as e:
-        if os.path.exists(raw_filename): os.remove(raw_filename)
+        print(f"      ❌ Download Error: {e}")
         return None
 
 # --- UPDATED: Use verbose_json to get timestamps ---
 def transcribe_with_timestamps(file_path):
+    """Returns (segments, words); words is None unless SEEDER_WORD_TIMESTAMPS is set."""
     print(f"   🎙️  Transcribing (Verbose)...")
     try:
         with open(file_path, "rb") as audio_file:
@@ -145,26 +156,45 @@ def transcribe_with_timestamps(file_path):
                 model="whisper-1", 
                 file=audio_file,
                 response_format="verbose_json", # <--- CRITICAL CHANGE
-                timestamp_granularities=["segment"]
+                timestamp_granularities=whisper_granularities()
             )
-        return transcript.segments # Returns list of objects with start, end, text
+        return transcript.segments, getattr(transcript, "words", None)
     except Exception as e:
         print(f"      ❌ Transcription Error: {e}")
-        return None
+        return None, None
+
+def get_episode_segments(episode, download_slots=None, transcribe_slots=None):
+    """
+    Returns (segments, words, fingerprint, match). A <podcast:transcript>
+    published in the feed is used as-is; otherwise the episode is downloaded,
+    and only sent to Whisper when its audio matches no seeded document.
+    """
+    segments = fetch_published_transcript(episode)
+    if segments:
+        return segments, None, None, None
+    if not episode.get("audio_url"):
+        return None, None, None, None
+    download_slots = download_slots or contextlib.nullcontext()
+    transcribe_slots = transcribe_slots or contextlib.nullcontext()
+    # Separate slots bound each stage, so downloads keep flowing while Whisper is busy
+    with ScratchSpace("spotify") as scratch:
+        with download_slots:
+            local_file = download_and_compress(episode["audio_url"], scratch)
+        if not local_file:
+            return None, None, None, None
+        fingerprint = fingerprint_file(local_file)
+        match = find_matching_document(supabase, fingerprint)
+        if match:
+            return None, None, fingerprint, match
+        with transcribe_slots:
+            segments, words = transcribe_with_timestamps(local_file)
+        return segments, words, fingerprint, None
 
 def get_canonical_url(url):
     """
-    Follows redirects to find the real Spotify URL.
+    Follows redirects to find the real Spotify URL (cached, with strict timeouts).
     """
-    try:
-        response = requests.head(url, allow_redirects=True)
-        final_url = response.url
-        # Clean specific Spotify tracking params
-        if "spotify.com" in final_url and "?" in final_url:
-            return final_url.split('?')[0]
-        return final_url
-    except:
-        return url
+    return canonical_url(url)
 
 def seed_spotify_universal(url, provider_id):
     # 0. Resolve the true URL immediately
@@ -179,19 +209,19 @@ def seed_spotify_universal(url, provider_id):
     feed_url = find_rss_feed(show_name)
     if not feed_url: return
 
-    # 3. Audio Link
-    mp3_url, rss_title = find_audio_url(feed_url, ep_title)
-    if not mp3_url: return
+    # 3. Episode (audio link and any published transcript)
+    episode = find_episode(feed_url, ep_title)
+    if not episode: return
+    rss_title = episode["title"]
 
-    # 4. Download & Compress
-    local_file = download_and_compress(mp3_url)
-    if not local_file: return
+    # 4. Published transcript, else Download & Compress, 5. Transcribe (Get Segments)
+    segments, words, fingerprint, match = get_episode_segments(episode)
+    if not segments and not match: return
 
-    # 5. Transcribe (Get Segments)
-    segments = transcribe_with_timestamps(local_file)
-    if os.path.exists(local_file): os.remove(local_file)
-    if not segments: return
+    store_episode(final_url, provider_id, rss_title, segments, words, fingerprint, match)
 
+def store_episode(final_url, provider_id, rss_title, segments, words=None, fingerprint=None, match=None):
+    """Creates the document and its timestamped chunks. Returns True on success."""
     # 6. Database
     print(f"   💾 Saving Document...")
     try:
@@ -199,7 +229,7 @@ def seed_spotify_universal(url, provider_id):
         existing = supabase.table("provider_documents").select("id").eq("source_url", final_url).execute()
         if existing.data:
             print("      ⚠️ Document already exists. Skipping.")
-            return
+            return False
 
         res = supabase.table("provider_documents").insert({
             "provider_id": provider_id,
@@ -211,64 +241,206 @@ def seed_spotify_universal(url, provider_id):
         doc_id = res.data[0]['id'] if res.data else None
     except Exception as e:
         print(f"   ❌ DB Error: {e}")
-        return
-# 7. CHUNKING WITH TIMESTAMPS
+        return False
+    if doc_id is None:
+        print("   ❌ DB Error: No ID returned.")
+        return False
+    # From here on a failure removes the document, so the next batch run retries the episode
+    # Same audio already seeded from another source: copy its chunks instead
+    if match:
+        try:
+            clone_document_knowledge(supabase, match["id"], doc_id, provider_id, final_url, match["time_shift"])
+            save_fingerprint(supabase, doc_id, fingerprint)
+        except Exception as e:
+            print(f"   ❌ Reuse Error: {e}")
+            remove_document(supabase, doc_id)
+            return False
+        return True
+    # 7. CHUNKING WITH TIMESTAMPS
     print(f"   ⚡ Processing {len(segments)} segments...")
-    
-    rows = []
-    
-    current_chunk_text = ""
-    chunk_start_time = 0
-    
-    # We aggregate small Whisper segments into larger chunks (~1000 chars)
-    for i, seg in enumerate(segments):
-        # FIX: Use dot notation for OpenAI objects
-        text = seg.text  # was seg['text']
-        start = seg.start # was seg['start']
-        end = seg.end     # was seg['end']
-        
-        # If starting a new chunk, set the start time
-        if current_chunk_text == "":
-            chunk_start_time = start
-            
-        current_chunk_text += text + " "
-        
-        # If chunk is big enough OR it's the last segment
-        if len(current_chunk_text) > 1000 or i == len(segments) - 1:
-            
-            # Embed
-            vec = embed_model.get_text_embedding(current_chunk_text)
-            
-            # Save
-            rows.append({
-                "provider_id": provider_id,
-                "document_id": doc_id,
-                "content": current_chunk_text.strip(),
-                "embedding": vec,
-                "metadata": {
-                    "source": final_url,
-                    "timestampStart": int(chunk_start_time), # Save as integer seconds
-                    "timestampEnd": int(end)
-                }
-            })
-            
-            # Reset
-            current_chunk_text = ""
-    
+    chunks = list(chunk_segments(segments))
+    try:
+        vectors = embed_texts(embed_model, [chunk["content"] for chunk in chunks])
+    except Exception as e:
+        print(f"   ❌ Embedding Error: {e}")
+        remove_document(supabase, doc_id)
+        return False
+    rows = build_transcript_rows(chunks, vectors, provider_id, doc_id, {"source": final_url})
+    if not rows:
+        print("   ❌ No chunks to store.")
+        remove_document(supabase, doc_id)
+        return False
+
     # Batch Insert
-    if rows:
-        batch_size = 20
-        print(f"   💾 Inserting {len(rows)} chunks with timestamps...")
-        for i in range(0, len(rows), batch_size):
+    print(f"   💾 Inserting {len(rows)} chunks with timestamps...")
+    try:
+        insert_knowledge_rows(supabase, rows)
+        if words:
+            save_word_index(supabase, doc_id, build_word_index(segments, words))
+        save_fingerprint(supabase, doc_id, fingerprint)
+    except Exception as e:
+        print(f"Error inserting batch: {e}")
+        remove_document(supabase, doc_id)
+        return False
+
+    print(f"   ✅ Success! Saved {len(rows)} timestamped chunks.")
+    return True
+
+def _read_batch_urls(source):
+    if os.path.isfile(source):
+        with open(source, "r", encoding="utf-8") as handle:
+            return [line.strip() for line in handle if line.strip() and not line.startswith("#")]
+    return [item.strip() for item in source.split(",") if item.strip()]
+
+def fetch_existing_source_urls(urls):
+    """One batched lookup per EXISTING_LOOKUP_BATCH_SIZE URLs instead of a query per episode."""
+    existing = set()
+    for i in range(0, len(urls), EXISTING_LOOKUP_BATCH_SIZE):
+        res = (
+            supabase.table("provider_documents")
+            .select("source_url")
+            .in_("source_url", urls[i:i + EXISTING_LOOKUP_BATCH_SIZE])
+            .execute()
+        )
+        existing.update(row["source_url"] for row in (res.data or []))
+    return existing
+
+def _resolve_show(show_name, episode_titles):
+    """Finds the feed once for a show and matches all of its episodes against it."""
+    feed_url = find_rss_feed(show_name)
+    if not feed_url:
+        return {}
+    return {title: find_episode(feed_url, title) for title in episode_titles}
+
+def seed_spotify_batch(urls, provider_id):
+    """
+    Seeds many episode URLs in one run: URLs are resolved concurrently, each
+    show's feed is loaded once, existing documents are skipped with bulk
+    lookups, and downloads/transcriptions run in bounded pools.
+    """
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=METADATA_WORKERS) as pool:
+        final_urls = list(dict.fromkeys(resolve_many(urls).values()))
+        existing = fetch_existing_source_urls(final_urls)
+        pending = [url for url in final_urls if url not in existing]
+        print(f"🎧 {len(final_urls)} episodes, {len(final_urls) - len(pending)} already seeded, {len(pending)} to process.")
+        metadata = dict(zip(pending, pool.map(get_spotify_metadata, pending)))
+
+        shows = {}
+        for url, (show_name, ep_title) in metadata.items():
+            if show_name and ep_title:
+                shows.setdefault(show_name, []).append(ep_title)
+        print(f"   📚 {len(shows)} distinct shows; loading each feed once...")
+        matches = dict(zip(shows, pool.map(lambda show: _resolve_show(show, shows[show]), shows)))
+
+    jobs = []
+    for url, (show_name, ep_title) in metadata.items():
+        episode = matches.get(show_name, {}).get(ep_title)
+        if episode and (episode["audio_url"] or episode["transcripts"]):
+            jobs.append((url, episode))
+        else:
+            print(f"   ⚠️ No audio found for {url}")
+
+    download_slots = threading.BoundedSemaphore(DOWNLOAD_WORKERS)
+    transcribe_slots = threading.BoundedSemaphore(TRANSCRIBE_WORKERS)
+    stored = 0
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS + TRANSCRIBE_WORKERS) as pool:
+        futures = {
+            pool.submit(get_episode_segments, episode, download_slots, transcribe_slots): (url, episode["title"])
+            for url, episode in jobs
+        }
+        for index, future in enumerate(as_completed(futures), start=1):
+            url, rss_title = futures[future]
+            print(f"[{index}/{len(jobs)}] {rss_title}")
             try:
-                supabase.table("provider_knowledge").insert(rows[i:i+batch_size]).execute()
+                segments, words, fingerprint, match = future.result()
             except Exception as e:
-                print(f"Error inserting batch: {e}")
-                
-        print(f"   ✅ Success! Saved {len(rows)} timestamped chunks.")
+                # One episode's download or Supabase failure shouldn't cost the rest of the batch
+                print(f"   ❌ {url}: {e}")
+                continue
+            if (segments or match) and store_episode(url, provider_id, rss_title, segments, words, fingerprint, match):
+                stored += 1
+    print(f"🎉 Batch finished: {stored}/{len(pending)} episodes seeded in {time.time() - started:.1f}s.")
+
+def estimate_episode(episode, estimate):
+    """get_episode_segments and store_episode's work: a published transcript is fetched, audio is projected from <itunes:duration>."""
+    segments = fetch_published_transcript(episode)
+    if segments:
+        estimate.add_requests("http")
+        estimate.add_segments(segments)
+    elif episode.get("audio_url"):
+        estimate.add_media(episode.get("duration"))
+    else:
+        estimate.add_skipped()
+        return
+    # Fingerprint lookup, document insert, fingerprint save
+    estimate.add_requests("supabase", 3)
+    estimate.add_item()
+
+
+def estimate_spotify_universal(url, provider_id):
+    estimate = Estimate(f"Spotify episode {url}")
+    final_url = get_canonical_url(url)
+    show_name, ep_title = get_spotify_metadata(final_url)
+    feed_url = find_rss_feed(show_name) if show_name and ep_title else None
+    episode = find_episode(feed_url, ep_title) if feed_url else None
+    # Redirects, episode page, directory search, feed
+    estimate.add_requests("http", 4)
+    if episode:
+        estimate_episode(episode, estimate)
+    else:
+        estimate.add_skipped()
+    return estimate
+
+
+def estimate_spotify_batch(urls, provider_id):
+    """seed_spotify_batch's work, with metadata scraped for a sample of the pending episodes."""
+    estimate = Estimate(
+        f"Spotify batch of {len(urls)} URLs",
+        concurrency=METADATA_WORKERS,
+        stage_concurrency={"download": DOWNLOAD_WORKERS, "whisper": TRANSCRIBE_WORKERS, "embedding": 1, "supabase": 1},
+    )
+    with ThreadPoolExecutor(max_workers=METADATA_WORKERS) as pool:
+        final_urls = list(dict.fromkeys(resolve_many(urls).values()))
+        existing = fetch_existing_source_urls(final_urls)
+        pending = [url for url in final_urls if url not in existing]
+        estimate.add_skipped(len(final_urls) - len(pending))
+        estimate.add_requests("http", len(urls))
+        estimate.add_requests("supabase", len(final_urls) // EXISTING_LOOKUP_BATCH_SIZE + 1)
+        picked, scale = sample(pending)
+        print(f"🎧 {len(final_urls)} episodes, {len(pending)} to process; measuring {len(picked)}...")
+        metadata = dict(zip(picked, pool.map(get_spotify_metadata, picked)))
+        shows = {}
+        for show_name, ep_title in metadata.values():
+            if show_name and ep_title:
+                shows.setdefault(show_name, []).append(ep_title)
+        matches = dict(zip(shows, pool.map(lambda show: _resolve_show(show, shows[show]), shows)))
+
+    measured = Estimate(estimate.label)
+    # Episode page each; directory search and feed once per show
+    measured.add_requests("http", len(picked) + 2 * len(shows))
+    for show_name, ep_title in metadata.values():
+        episode = matches.get(show_name, {}).get(ep_title)
+        if episode:
+            estimate_episode(episode, measured)
+        else:
+            measured.add_skipped()
+    estimate.merge(measured, scale)
+    return estimate
+
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python seed-spotify-universal.py \"<url>\" <provider_id>")
+    args = sys.argv[1:]
+    estimate = estimate_requested(args)
+    if len(args) >= 3 and args[0] == "--batch":
+        if estimate:
+            estimate_spotify_batch(_read_batch_urls(args[1]), int(args[2])).report()
+        else:
+            seed_spotify_batch(_read_batch_urls(args[1]), int(args[2]))
+    elif len(args) < 2:
+        print("Usage: python seed-spotify-universal.py \"<url>\" <provider_id> [--estimate]")
+        print("       python seed-spotify-universal.py --batch \"<url,url,... | urls.txt>\" <provider_id> [--estimate]")
+    elif estimate:
+        estimate_spotify_universal(args[0], int(args[1])).report()
     else:
-        seed_spotify_universal(sys.argv[1], int(sys.argv[2]))
\ No newline at end of file
+        seed_spotify_universal(args[0], int(args[1]))
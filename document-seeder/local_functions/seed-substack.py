@@ -1,27 +1,32 @@
+import hashlib
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import feedparser
-import cloudscraper
 from bs4 import BeautifulSoup
-from dotenv import load_dotenv
-from llama_index.core.node_parser import SentenceSplitter
-from llama_index.embeddings.openai import OpenAIEmbedding
-from supabase import create_client, Client
 
-# 1. Setup
-load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+try:
+    from .clients import embed_model, load_env, scraper, supabase
+    from .discovery_index import DiscoveryIndex
+    from .estimate import Estimate, estimate_requested, sample
+    from .knowledge_store import embed_texts, insert_knowledge_rows, remove_document
+    from .seeder_cache import load_json, save_json
+    from .url_canonicalizer import normalize_url
+except ImportError:
+    from clients import embed_model, load_env, scraper, supabase
+    from discovery_index import DiscoveryIndex
+    from estimate import Estimate, estimate_requested, sample
+    from knowledge_store import embed_texts, insert_knowledge_rows, remove_document
+    from seeder_cache import load_json, save_json
+    from url_canonicalizer import normalize_url
 
-if not SUPABASE_URL or not SUPABASE_KEY or not OPENAI_API_KEY:
-    print("Error: Database or OpenAI keys missing.")
-    sys.exit(1)
+# 1. Setup: clients are built on first use
+load_env()
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-embed_model = OpenAIEmbedding(model="text-embedding-3-small")
-scraper = cloudscraper.create_scraper(browser='chrome')
+ARCHIVE_PAGE_SIZE = 50
+ARCHIVE_WORKERS = int(os.getenv("SUBSTACK_ARCHIVE_WORKERS", "4"))
+ARTICLE_BATCH_SIZE = int(os.getenv("SUBSTACK_ARTICLE_BATCH_SIZE", "25"))
 
 def get_feed_url(base_url):
     """
@@ -82,98 +87,289 @@ def clean_html_content(html_content):
     # Compress whitespace
     return " ".join(text.split())
 
-def seed_substack(url, provider_id):
-    feed_url = get_feed_url(url)
-    print(f"📰 Processing Substack: {url}")
-    print(f"   📡 Fetching Feed: {feed_url}...")
-    
+def _entry_html(entry):
+    # Get content (Substack usually puts full HTML in 'content', summary in 'description')
+    if 'content' in entry:
+        return entry.content[0].value
+    if 'summary_detail' in entry:
+        return entry.summary_detail.value
+    return ""
+
+def _feed_article(entry):
+    return {
+        "guid": entry.get("id") or entry.link,
+        "title": entry.title,
+        "link": entry.link,
+        "html": _entry_html(entry),
+        "cover_image": extract_image(entry),
+        "author": entry.get('author', 'Substack'),
+    }
+
+def load_feed_state(feed_url):
+    return load_json(_state_name(feed_url), {"etag": None, "last_modified": None, "guids": []})
+
+def _state_name(feed_url):
+    return f"substack-{hashlib.sha1(feed_url.encode('utf-8')).hexdigest()[:16]}.json"
+
+def fetch_feed_articles(feed_url, state):
+    """
+    Conditional feed fetch. Returns (articles, response_headers), with articles
+    None on failure and [] when the feed is unchanged since the last run.
+    """
+    headers = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
     try:
         # We use cloudscraper to fetch the XML because standard requests might get 403
-        xml_response = scraper.get(feed_url).text
-        feed = feedparser.parse(xml_response)
+        response = scraper.get(feed_url, headers=headers, timeout=30)
+        if response.status_code == 304:
+            print("   ✅ Feed unchanged since last run.")
+            return [], {}
+        response.raise_for_status()
+        feed = feedparser.parse(response.content)
     except Exception as e:
         print(f"   ❌ Failed to fetch feed: {e}")
-        return
+        return None, {}
+    return [_feed_article(entry) for entry in feed.entries], response.headers
 
-    if not feed.entries:
-        print("   ❌ No entries found. Is this a valid Substack URL?")
-        return
+def _fetch_archive_page(base_url, offset):
+    response = scraper.get(
+        f"{base_url}/api/v1/archive",
+        params={"sort": "new", "offset": offset, "limit": ARCHIVE_PAGE_SIZE},
+        timeout=30,
+    )
+    response.raise_for_status()
+    return response.json() or []
 
-    print(f"   ✅ Found {len(feed.entries)} articles. Processing...")
+def _fetch_archive_post(base_url, post):
+    try:
+        response = scraper.get(f"{base_url}/api/v1/posts/{post['slug']}", timeout=30)
+        response.raise_for_status()
+        html = response.json().get("body_html") or ""
+    except Exception as e:
+        print(f"      ⚠️  Could not fetch '{post.get('title')}': {e}")
+        # None, not "": a failed download is retried, an empty body is paywalled
+        html = None
+    bylines = post.get("publishedBylines") or []
+    return {
+        "guid": str(post.get("id") or post["canonical_url"]),
+        "title": post.get("title") or post["slug"],
+        "link": post["canonical_url"],
+        "html": html,
+        "cover_image": post.get("cover_image"),
+        "author": bylines[0].get("name", "Substack") if bylines else "Substack",
+    }
 
-    count = 0
-    for entry in feed.entries:
-        # Limit to recent 20 to avoid blasting the DB (optional)
-        if count >= 20: break 
-        
-        title = entry.title
-        link = entry.link
-        
-        # Get content (Substack usually puts full HTML in 'content', summary in 'description')
-        if 'content' in entry:
-            raw_html = entry.content[0].value
-        elif 'summary_detail' in entry:
-            raw_html = entry.summary_detail.value
-        else:
-            raw_html = ""
-
-        clean_text = clean_html_content(raw_html)
-        
+def list_archive_posts(base_url):
+    """
+    Backfill: lists the whole publication archive, fetching ARCHIVE_WORKERS
+    pages concurrently per wave until a short page marks the end.
+    """
+    posts = []
+    offset = 0
+    with ThreadPoolExecutor(max_workers=ARCHIVE_WORKERS) as pool:
+        while True:
+            offsets = [offset + i * ARCHIVE_PAGE_SIZE for i in range(ARCHIVE_WORKERS)]
+            pages = list(pool.map(lambda o: _fetch_archive_page(base_url, o), offsets))
+            for page in pages:
+                posts.extend(post for post in page if post.get("slug") and post.get("canonical_url"))
+            print(f"   📚 Archive: {len(posts)} posts listed...")
+            if any(len(page) < ARCHIVE_PAGE_SIZE for page in pages):
+                return posts
+            offset += ARCHIVE_WORKERS * ARCHIVE_PAGE_SIZE
+
+def fetch_archive_articles(base_url, posts):
+    with ThreadPoolExecutor(max_workers=ARCHIVE_WORKERS) as pool:
+        return list(pool.map(lambda post: _fetch_archive_post(base_url, post), posts))
+
+def prepare_articles(articles):
+    """
+    [(article, chunks)] for every article with enough text; paywalled stubs
+    and articles whose body could not be fetched are dropped.
+    """
+    from llama_index.core.node_parser import SentenceSplitter
+
+    prepared = []
+    for article in articles:
+        if article["html"] is None:
+            continue
+        clean_text = clean_html_content(article["html"])
         if len(clean_text) < 200:
-            print(f"      ⚠️  Skipping '{title}' (Content too short/Paywalled)")
+            print(f"      ⚠️  Skipping '{article['title']}' (Content too short/Paywalled)")
             continue
+        nodes = SentenceSplitter(chunk_size=1024, chunk_overlap=50).split_text(clean_text)
+        prepared.append((article, nodes))
+    return prepared
 
-        cover_image = extract_image(entry)
-        
-        print(f"      📄 Seeding: {title[:50]}...")
+def seed_articles(articles, provider_id):
+    """
+    Cleans and chunks every article first, embeds all chunks together in
+    shared batches, then writes each document with its knowledge rows.
+    Returns (seeded, failed) article lists; paywalled stubs are neither,
+    articles whose body could not be fetched count as failed.
+    """
+    unfetched = [article for article in articles if article["html"] is None]
+    prepared = prepare_articles(articles)
+    texts = [node for _, nodes in prepared for node in nodes]
+    if not texts:
+        return [], unfetched
+    print(f"   ⚡ Embedding {len(texts)} chunks from {len(prepared)} articles...")
+    try:
+        vectors = iter(embed_texts(embed_model, texts))
+    except Exception as e:
+        print(f"   ❌ Embedding Error: {e}")
+        return [], unfetched + [article for article, _ in prepared]
+
+    seeded, failed = [], list(unfetched)
+    for article, nodes in prepared:
+        article_vectors = [next(vectors) for _ in nodes]
+        print(f"      📄 Seeding: {article['title'][:50]}...")
 
         # 1. DB Insert
         doc_payload = {
             "provider_id": provider_id,
-            "title": title,
-            "source_url": link,
-            "cover_image_url": cover_image,
+            "title": article["title"],
+            "source_url": article["link"],
+            "cover_image_url": article["cover_image"],
             "media_type": "document" # Use 'document' so it triggers text highlighting
         }
-
+        doc_id = None
         try:
             res = supabase.table("provider_documents").insert(doc_payload).execute()
             doc_id = res.data[0]['id'] if res.data else None
-            
-            # If doc_id is None, it might be a duplicate or error
-            if not doc_id: 
-                # Optional: Handle duplicate logic here
+            if not doc_id:
+                failed.append(article)
                 continue
 
+            # 2. Knowledge rows
+            rows = [
+                {
+                    "provider_id": provider_id,
+                    "document_id": doc_id,
+                    "content": node,
+                    "embedding": vec,
+                    "metadata": {"source": article["link"], "author": article["author"]}
+                }
+                for node, vec in zip(nodes, article_vectors)
+            ]
+            insert_knowledge_rows(supabase, rows)
+            seeded.append(article)
         except Exception as e:
-            # Often fails on unique constraint if you run it twice. Just skip.
-            # print(f"      ⚠️  DB Insert/Skip: {e}") 
-            continue
+            print(f"      ⚠️  DB Insert failed for '{article['title']}': {e}")
+            failed.append(article)
+            if doc_id:
+                remove_document(supabase, doc_id)
+    return seeded, failed
 
-        # 2. Vectorise
-        nodes = SentenceSplitter(chunk_size=1024, chunk_overlap=50).split_text(clean_text)
-        
-        rows = []
-        for node in nodes:
-            vec = embed_model.get_text_embedding(node)
-            rows.append({
-                "provider_id": provider_id,
-                "document_id": doc_id,
-                "content": node,
-                "embedding": vec,
-                "metadata": {"source": link, "author": entry.get('author', 'Substack')}
-            })
-
-        if rows:
-            batch_size = 20
-            for i in range(0, len(rows), batch_size):
-                supabase.table("provider_knowledge").insert(rows[i:i+batch_size]).execute()
-            count += 1
-            
-    print(f"   ✅ Successfully seeded {count} articles!")
+def seed_substack(url, provider_id, backfill=False):
+    feed_url = get_feed_url(url)
+    base_url = feed_url[:-len("/feed")] if feed_url.endswith("/feed") else url.rstrip('/')
+    print(f"📰 Processing Substack: {url}")
+
+    index = DiscoveryIndex(supabase, provider_id, normalize_url).load()
+    state = load_feed_state(feed_url)
+    known_guids = set(state.get("guids") or [])
+
+    def is_new(guid, link):
+        return not (guid and guid in known_guids) and normalize_url(link) not in index
+
+    headers = {}
+    if backfill:
+        print(f"   📚 Backfilling archive: {base_url}...")
+        try:
+            posts = list_archive_posts(base_url)
+        except Exception as e:
+            print(f"   ❌ Failed to walk archive: {e}")
+            return
+        index.confirm_many([normalize_url(post["canonical_url"]) for post in posts])
+        candidates = [post for post in posts if is_new(str(post.get("id") or ""), post["canonical_url"])]
+    else:
+        print(f"   📡 Fetching Feed: {feed_url}...")
+        articles, headers = fetch_feed_articles(feed_url, state)
+        if articles is None:
+            return
+        index.confirm_many([normalize_url(article["link"]) for article in articles])
+        known_guids.update(article["guid"] for article in articles if not is_new(article["guid"], article["link"]))
+        candidates = [article for article in articles if is_new(article["guid"], article["link"])]
+    print(f"   ✅ {len(candidates)} new articles. Processing...")
+
+    seeded_count = 0
+    failures = 0
+    # Groups bound memory: one group's bodies and vectors are held at a time
+    for i in range(0, len(candidates), ARTICLE_BATCH_SIZE):
+        group = candidates[i:i + ARTICLE_BATCH_SIZE]
+        articles = fetch_archive_articles(base_url, group) if backfill else group
+        seeded, failed = seed_articles(articles, provider_id)
+        seeded_count += len(seeded)
+        failures += len(failed)
+        failed_guids = {article["guid"] for article in failed}
+        for article in articles:
+            if article["guid"] not in failed_guids:
+                known_guids.add(article["guid"])
+        for article in seeded:
+            index.add(normalize_url(article["link"]))
+
+    state["guids"] = sorted(known_guids)
+    # A 304 next run skips the feed entirely, so only advance once everything is stored
+    if headers and not failures:
+        state["etag"] = headers.get("ETag")
+        state["last_modified"] = headers.get("Last-Modified")
+    save_json(_state_name(feed_url), state)
+    print(f"   ✅ Successfully seeded {seeded_count} articles!")
+
+def estimate_substack(url, provider_id, backfill=False):
+    """
+    seed_substack's work without storing anything or advancing the feed state.
+    New articles are chunked exactly; a backfill fetches a sample of post bodies.
+    """
+    feed_url = get_feed_url(url)
+    base_url = feed_url[:-len("/feed")] if feed_url.endswith("/feed") else url.rstrip('/')
+    estimate = Estimate(f"Substack {base_url}{' backfill' if backfill else ''}")
+    index = DiscoveryIndex(supabase, provider_id, normalize_url).load()
+    known_guids = set(load_feed_state(feed_url).get("guids") or [])
+
+    def is_new(guid, link):
+        return not (guid and guid in known_guids) and normalize_url(link) not in index
+
+    if backfill:
+        try:
+            posts = list_archive_posts(base_url)
+        except Exception as e:
+            print(f"   ❌ Failed to walk archive: {e}")
+            return estimate
+        estimate.add_requests("http", len(posts) // ARCHIVE_PAGE_SIZE + 1)
+        candidates = [post for post in posts if is_new(str(post.get("id") or ""), post["canonical_url"])]
+    else:
+        # Unconditional, so the estimate sees the articles a 304 would hide
+        articles, _ = fetch_feed_articles(feed_url, {})
+        estimate.add_requests("http")
+        candidates = [article for article in articles or [] if is_new(article["guid"], article["link"])]
+        posts = articles or []
+    estimate.add_skipped(len(posts) - len(candidates))
+
+    picked, scale = sample(candidates)
+    print(f"   ✅ {len(candidates)} new articles; measuring {len(picked)}...")
+    measured = Estimate(estimate.label)
+    if backfill:
+        measured.add_requests("http", len(picked))
+        picked = fetch_archive_articles(base_url, picked)
+    prepared = prepare_articles(picked)
+    measured.add_skipped(len(picked) - len(prepared))
+    # Chunks are embedded in shared batches across articles, like seed_articles
+    measured.add_chunks(node for _, nodes in prepared for node in nodes)
+    measured.add_item(len(prepared))
+    measured.add_requests("supabase", len(prepared))
+    estimate.merge(measured, scale)
+    return estimate
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python seed-substack.py \"<substack_url>\" <provider_id>")
+    args = sys.argv[1:]
+    estimate = estimate_requested(args)
+    if len(args) < 2:
+        print("Usage: python seed-substack.py \"<substack_url>\" <provider_id> [--backfill] [--estimate]")
+    elif estimate:
+        estimate_substack(args[0], int(args[1]), backfill="--backfill" in args[2:]).report()
     else:
-        seed_substack(sys.argv[1], int(sys.argv[2]))
\ No newline at end of file
+        seed_substack(args[0], int(args[1]), backfill="--backfill" in args[2:])
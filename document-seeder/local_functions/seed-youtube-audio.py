@@ -1,116 +1,49 @@
 import os
 import sys
-import glob
-from dotenv import load_dotenv
-import yt_dlp
-from openai import OpenAI
-from llama_index.embeddings.openai import OpenAIEmbedding
-from supabase import create_client, Client
 
-# 1. Setup
-load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-if not SUPABASE_URL or not SUPABASE_KEY or not OPENAI_API_KEY:
-    print("Error: Database or OpenAI keys missing.")
-    sys.exit(1)
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-embed_model = OpenAIEmbedding(model="text-embedding-3-small")
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-
-def download_audio(url):
-    """
-    Downloads audio using yt-dlp.
-    We try to get m4a or mp3 at the lowest quality to keep file size < 25MB (OpenAI limit).
-    """
-    print(f"   ⏳ Downloading audio stream...")
-    
-    # Configuration to get smallest audio file possible
-    ydl_opts = {
-        'format': 'bestaudio/best',
-        'outtmpl': 'temp_audio.%(ext)s',
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '32', # Low bitrate to save size
-        }],
-        'quiet': True,
-        'no_warnings': True,
-    }
-
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            # Get metadata first
-            info = ydl.extract_info(url, download=True)
-            title = info.get('title', 'Unknown YouTube Video')
-            video_id = info.get('id', 'unknown')
-            thumbnail = info.get('thumbnail', None)
-            
-            # Find the file we just downloaded
-            files = glob.glob("temp_audio.mp3")
-            if files:
-                return files[0], title, video_id, thumbnail
-            
-            # Fallback if mp3 conversion failed (maybe no ffmpeg)
-            files = glob.glob("temp_audio.*")
-            if files:
-                return files[0], title, video_id, thumbnail
-
-    except Exception as e:
-        print(f"   ❌ Download Error: {e}")
-        return None, None, None, None
-
-    return None, None, None, None
-
-def transcribe_audio_with_timestamps(file_path):
-    """
-    Sends audio file to OpenAI Whisper asking for verbose JSON 
-    to get timestamp segments.
-    """
-    file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
-    print(f"   🎙️  Transcribing with Whisper ({file_size_mb:.2f} MB)...")
-
-    if file_size_mb > 25:
-        print("   ❌ Error: File is larger than OpenAI's 25MB limit.")
-        return None
-
-    try:
-        audio_file = open(file_path, "rb")
-        transcript = openai_client.audio.transcriptions.create(
-            model="whisper-1", 
-            file=audio_file,
-            response_format="verbose_json", # <--- CRITICAL CHANGE FOR TIMESTAMPS
-            timestamp_granularities=["segment"]
-        )
-        return transcript.segments # Returns list of objects (text, start, end)
-    except Exception as e:
-        print(f"   ❌ Whisper Error: {e}")
-        return None
+try:
+    from .clients import embed_model, load_env, openai_client, supabase
+    from .estimate import Estimate, estimate_requested, media_duration
+    from .audio_fingerprint import clone_document_knowledge, find_matching_document, fingerprint_file, save_fingerprint
+    from .knowledge_store import build_transcript_rows, embed_texts, insert_knowledge_rows, remove_document
+    from .scratch_space import ScratchSpace
+    from .transcript_chunker import chunk_segments
+    from .word_index import build_word_index, save_word_index
+    from .youtube_audio import download_audio, transcribe_audio_with_timestamps
+except ImportError:
+    from clients import embed_model, load_env, openai_client, supabase
+    from estimate import Estimate, estimate_requested, media_duration
+    from audio_fingerprint import clone_document_knowledge, find_matching_document, fingerprint_file, save_fingerprint
+    from knowledge_store import build_transcript_rows, embed_texts, insert_knowledge_rows, remove_document
+    from scratch_space import ScratchSpace
+    from transcript_chunker import chunk_segments
+    from word_index import build_word_index, save_word_index
+    from youtube_audio import download_audio, transcribe_audio_with_timestamps
+
+# 1. Setup: clients are built on first use
+load_env()
 
 def seed_youtube_audio(url, provider_id):
     print(f"📺 Processing YouTube URL: {url}")
     
-    # 1. Download Audio & Metadata
-    audio_path, title, video_id, cover_image = download_audio(url)
-    
-    if not audio_path:
-        print("   ❌ Failed to download audio. (Do you have ffmpeg installed?)")
-        return
-
-    # 2. Transcribe (Get Segments)
-    segments = transcribe_audio_with_timestamps(audio_path)
-    
-    # Clean up file immediately
-    if os.path.exists(audio_path):
-        os.remove(audio_path)
+    with ScratchSpace("youtube-audio") as scratch:
+        # 1. Download Audio & Metadata
+        audio_path, title, video_id, cover_image = download_audio(url, scratch)
+        
+        if not audio_path:
+            print("   ❌ Failed to download audio. (Do you have ffmpeg installed?)")
+            return
+
+        # 2. Reuse a matching recording, else Transcribe (Get Segments); the scratch dir is removed on exit
+        fingerprint = fingerprint_file(audio_path)
+        match = find_matching_document(supabase, fingerprint)
+        segments, words = (None, None) if match else transcribe_audio_with_timestamps(openai_client, audio_path)
     
-    if not segments:
+    if not segments and not match:
         return
 
-    print(f"   📄 Transcript Segments: {len(segments)}")
+    if segments:
+        print(f"   📄 Transcript Segments: {len(segments)}")
     print(f"   📄 Title: {title}")
 
     # 3. Create Document in DB
@@ -132,60 +65,60 @@ def seed_youtube_audio(url, provider_id):
         print(f"   ❌ DB Error: {e}")
         return
 
+    # From here on a failure removes the document, so a re-run isn't skipped as already seeded
+    if match:
+        try:
+            clone_document_knowledge(supabase, match["id"], document_id, provider_id, url, match["time_shift"])
+            save_fingerprint(supabase, document_id, fingerprint)
+        except Exception as e:
+            print(f"   ❌ Reuse Error: {e}")
+            remove_document(supabase, document_id)
+        return
+
     # 4. Custom Chunking & Vectorising
     print(f"   ⚡ Chunking & Vectorising...")
-    
-    knowledge_rows = []
-    current_chunk_text = ""
-    chunk_start_time = 0
-    
-    # Aggregate segments into ~1000 char chunks
-    for i, seg in enumerate(segments):
-        # Handle Object vs Dict access (OpenAI SDK returns objects)
-        text = seg.text if hasattr(seg, 'text') else seg['text']
-        start = seg.start if hasattr(seg, 'start') else seg['start']
-        end = seg.end if hasattr(seg, 'end') else seg['end']
-        
-        # Start new chunk timer
-        if current_chunk_text == "":
-            chunk_start_time = start
-            
-        current_chunk_text += text + " "
-        
-        # If chunk is large enough OR last segment
-        if len(current_chunk_text) > 1000 or i == len(segments) - 1:
-            
-            vector = embed_model.get_text_embedding(current_chunk_text)
-            
-            row = {
-                "provider_id": provider_id,
-                "document_id": document_id,
-                "content": current_chunk_text.strip(),
-                "embedding": vector,
-                "metadata": {
-                    "source": url, 
-                    "video_id": video_id,
-                    "timestampStart": int(chunk_start_time), # Saved as integer seconds
-                    "timestampEnd": int(end)
-                }
-            }
-            knowledge_rows.append(row)
-            
-            # Reset
-            current_chunk_text = ""
+    chunks = list(chunk_segments(segments))
+    try:
+        vectors = embed_texts(embed_model, [chunk["content"] for chunk in chunks])
+    except Exception as e:
+        print(f"   ❌ Embedding Error: {e}")
+        remove_document(supabase, document_id)
+        return
+    knowledge_rows = build_transcript_rows(
+        chunks, vectors, provider_id, document_id, {"source": url, "video_id": video_id}
+    )
+    if not knowledge_rows:
+        print("   ❌ No chunks to store.")
+        remove_document(supabase, document_id)
+        return
+
+    try:
+        insert_knowledge_rows(supabase, knowledge_rows)
+        if words:
+            save_word_index(supabase, document_id, build_word_index(segments, words))
+        save_fingerprint(supabase, document_id, fingerprint)
+        print(f"   ✅ Successfully saved {len(knowledge_rows)} chunks with timestamps!")
+    except Exception as e:
+        print(f"   ❌ DB Insert Error: {e}")
+        remove_document(supabase, document_id)
+
+def estimate_youtube_audio(url, provider_id):
+    """Download and Whisper projected from the video's duration; a fingerprint match would skip both."""
+    estimate = Estimate(f"YouTube audio {url}")
+    estimate.add_requests("http")
+    estimate.add_media(media_duration(url))
+    # Fingerprint lookup, document insert, fingerprint save
+    estimate.add_requests("supabase", 3)
+    estimate.add_item()
+    return estimate
 
-    if knowledge_rows:
-        try:
-            batch_size = 20
-            for i in range(0, len(knowledge_rows), batch_size):
-                batch = knowledge_rows[i:i + batch_size]
-                supabase.table("provider_knowledge").insert(batch).execute()
-            print(f"   ✅ Successfully saved {len(knowledge_rows)} chunks with timestamps!")
-        except Exception as e:
-             print(f"   ❌ DB Insert Error: {e}")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python seed-youtube-audio.py \"<youtube_url>\" <provider_id>")
+    args = sys.argv[1:]
+    estimate = estimate_requested(args)
+    if len(args) < 2:
+        print("Usage: python seed-youtube-audio.py \"<youtube_url>\" <provider_id> [--estimate]")
+    elif estimate:
+        estimate_youtube_audio(args[0], int(args[1])).report()
     else:
-        seed_youtube_audio(sys.argv[1], int(sys.argv[2]))
\ No newline at end of file
+        seed_youtube_audio(args[0], int(args[1]))
\ No newline at end of file
@@ -1,29 +1,50 @@
 import os
 import sys
 import re
-import cloudscraper
-# --- CHANGED: Standard Import Style ---
-from youtube_transcript_api import YouTubeTranscriptApi
-# --------------------------------------
-from bs4 import BeautifulSoup
-from dotenv import load_dotenv
-from llama_index.core.node_parser import SentenceSplitter
-from llama_index.embeddings.openai import OpenAIEmbedding
-from supabase import create_client, Client
-
-# 1. Setup
-load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+try:
+    from .clients import embed_model, load_env, openai_client as _openai_client, supabase
+    from .estimate import Estimate, estimate_requested, media_duration, sample
+    from .knowledge_store import build_transcript_rows, embed_texts, insert_knowledge_rows, remove_document
+    from .scratch_space import ScratchSpace
+    from .seeder_cache import load_json, save_json
+    from .transcript_chunker import chunk_segments, transcript_text
+    from .url_canonicalizer import normalize_url
+    from .word_index import build_word_index, save_word_index
+    from .youtube_audio import download_audio, transcribe_audio_with_timestamps
+except ImportError:
+    from clients import embed_model, load_env, openai_client as _openai_client, supabase
+    from estimate import Estimate, estimate_requested, media_duration, sample
+    from knowledge_store import build_transcript_rows, embed_texts, insert_knowledge_rows, remove_document
+    from scratch_space import ScratchSpace
+    from seeder_cache import load_json, save_json
+    from transcript_chunker import chunk_segments, transcript_text
+    from url_canonicalizer import normalize_url
+    from word_index import build_word_index, save_word_index
+    from youtube_audio import download_audio, transcribe_audio_with_timestamps
+
+# 1. Setup: clients are built on first use
+load_env()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+openai_client = _openai_client if OPENAI_API_KEY else None
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("Error: Database keys missing.")
-    sys.exit(1)
+TRANSCRIPT_WORKERS = int(os.getenv("YOUTUBE_TRANSCRIPT_WORKERS", "8"))
+METADATA_CACHE = "youtube-metadata.json"
+EXISTING_LOOKUP_BATCH_SIZE = 100
+# Whisper is the fallback when a video has no usable captions
+AUDIO_FALLBACK = os.getenv("YOUTUBE_AUDIO_FALLBACK", "1").lower() in ("1", "true", "yes")
+AUDIO_FALLBACK_WORKERS = int(os.getenv("YOUTUBE_AUDIO_FALLBACK_WORKERS", "2"))
+MIN_TRANSCRIPT_CHARS = 50
+
+_audio_slots = threading.BoundedSemaphore(max(1, AUDIO_FALLBACK_WORKERS))
+
+_metadata_cache = load_json(METADATA_CACHE, {})
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-embed_model = OpenAIEmbedding(model="text-embedding-3-small")
-scraper = cloudscraper.create_scraper(browser='chrome')
 
 def get_video_id(url):
     """
@@ -34,60 +55,99 @@ def get_video_id(url):
         return video_id_match.group(1)
     return None
 
+
+def watch_url(video_id):
+    """The source_url a video is stored under, whichever URL it was seeded from."""
+    return normalize_url(f"https://www.youtube.com/watch?v={video_id}")
+
+
 def get_video_metadata(video_id):
     """
-    Fetches Title and Thumbnail URL.
+    Fetches Title and Thumbnail URL via oEmbed, cached on disk by video ID.
     """
-    url = f"https://www.youtube.com/watch?v={video_id}"
+    cached = _metadata_cache.get(video_id)
+    if cached:
+        return cached["title"], cached["thumbnail"]
     try:
-        response = scraper.get(url)
+        response = requests.get(
+            "https://www.youtube.com/oembed",
+            params={"url": watch_url(video_id), "format": "json"},
+            timeout=10,
+        )
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            title_tag = soup.find("meta", property="og:title")
-            title = title_tag["content"] if title_tag else soup.title.string.replace(" - YouTube", "")
-            
+            data = response.json()
+            title = data.get("title") or f"YouTube Video {video_id}"
             thumbnail = f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg"
-            
+            _metadata_cache[video_id] = {"title": title, "thumbnail": thumbnail}
             return title, thumbnail
     except Exception as e:
-        print(f"   ⚠️ Could not scrape metadata: {e}")
-    
+        print(f"   ⚠️ Could not fetch metadata: {e}")
+
     return f"YouTube Video {video_id}", None
 
-def seed_youtube(url, provider_id):
-    print(f"📺 Processing YouTube URL: {url}")
-    
-    video_id = get_video_id(url)
-    if not video_id:
-        print("   ❌ Invalid YouTube URL")
-        return
 
-    # 2. Fetch Transcript
-    print(f"   ⏳ Fetching transcript for ID: {video_id}...")
-    full_text = ""
+def fetch_transcript(video_id):
+    """
+    Returns the caption entries for video_id, or None. Cached per video so a
+    re-run of a large batch only re-fetches what failed last time.
+    """
+    cache_name = f"youtube-transcript-{video_id}.json"
+    cached = load_json(cache_name)
+    if cached is not None:
+        return cached
+    from youtube_transcript_api import YouTubeTranscriptApi
+
     try:
         # Using the imported class directly
         transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-        full_text = " ".join([item['text'] for item in transcript_list])
     except Exception as e:
         # Use simple string matching to handle specific error types without importing them
         err_msg = str(e)
         if "TranscriptsDisabled" in err_msg:
-            print("   ❌ Subtitles are disabled for this video.")
+            print(f"   ❌ [{video_id}] Subtitles are disabled for this video.")
         elif "NoTranscriptFound" in err_msg:
-            print("   ❌ No English subtitles found.")
+            print(f"   ❌ [{video_id}] No English subtitles found.")
         else:
-            print(f"   ❌ Transcript Error: {e}")
-        return
+            print(f"   ❌ [{video_id}] Transcript Error: {e}")
+        return None
+    entries = [{"text": item["text"], "start": item["start"], "duration": item["duration"]} for item in transcript_list]
+    save_json(cache_name, entries)
+    return entries
 
-    if not full_text or len(full_text) < 50:
-        print("   ❌ Transcript is too short or empty.")
-        return
 
-    # 3. Get Metadata
-    title, cover_image = get_video_metadata(video_id)
-    print(f"   📄 Found: '{title}'")
+def caption_segments(transcript):
+    """Caption entries (start, duration) as chunk_segments-compatible segments."""
+    return [
+        {"text": item["text"], "start": item["start"], "end": item["start"] + item["duration"]}
+        for item in transcript or []
+    ]
+
+
+def transcribe_from_audio(video_id):
+    """Fallback for videos without usable captions. Returns (segments, words)."""
+    if not AUDIO_FALLBACK or openai_client is None:
+        return None, None
+    print(f"   🎙️  [{video_id}] No usable captions; falling back to audio + Whisper...")
+    with _audio_slots, ScratchSpace("youtube-audio") as scratch:
+        audio_path, _, _, _ = download_audio(watch_url(video_id), scratch)
+        if not audio_path:
+            return None, None
+        return transcribe_audio_with_timestamps(openai_client, audio_path)
+
+
+def get_video_segments(video_id):
+    """Captions first (seconds, no download); audio + Whisper only when they are missing or empty."""
+    segments = caption_segments(fetch_transcript(video_id))
+    if len(transcript_text(segments)) >= MIN_TRANSCRIPT_CHARS:
+        return segments, None
+    return transcribe_from_audio(video_id)
+
+
+def store_video(video_id, url, provider_id, segments, title, cover_image, words=None):
+    """Creates the document and its timestamped chunks. Returns True on success."""
+    if not segments or len(transcript_text(segments)) < MIN_TRANSCRIPT_CHARS:
+        print(f"   ❌ [{video_id}] Transcript is too short or empty.")
+        return False
 
     # 4. Create Document in DB
     doc_payload = {
@@ -105,43 +165,230 @@ def seed_youtube(url, provider_id):
             document_id = res.data[0]['id']
         else:
             print(f"   ❌ DB Error: No ID returned. Response: {res}")
-            return
-            
+            return False
+
     except Exception as e:
         print(f"   ❌ DB Insert Error: {e}")
+        return False
+
+    # 5. Chunk (keeping caption timestamps) and Vectorise
+    print(f"   ⚡ Chunking {len(segments)} segments...")
+    chunks = list(chunk_segments(segments))
+
+    try:
+        vectors = embed_texts(embed_model, [chunk["content"] for chunk in chunks])
+        knowledge_rows = build_transcript_rows(
+            chunks, vectors, provider_id, document_id, {"source": url, "video_id": video_id}
+        )
+        insert_knowledge_rows(supabase, knowledge_rows)
+        if words:
+            save_word_index(supabase, document_id, build_word_index(segments, words))
+        print(f"   ✅ Successfully saved {len(knowledge_rows)} timestamped chunks!")
+        return True
+    except Exception as e:
+        print(f"   ❌ DB Vector Insert Error: {e}")
+        remove_document(supabase, document_id)
+        return False
+
+
+def seed_youtube(url, provider_id):
+    print(f"📺 Processing YouTube URL: {url}")
+
+    video_id = get_video_id(url)
+    if not video_id:
+        print("   ❌ Invalid YouTube URL")
+        return
+    if fetch_existing_video_ids(provider_id, [video_id]):
+        print(f"   ⏭️ Already seeded: {watch_url(video_id)}")
         return
 
-    # 5. Chunk and Vectorise
-    print(f"   ⚡ Chunking {len(full_text)} characters...")
-    
-    text_splitter = SentenceSplitter(chunk_size=1024, chunk_overlap=50)
-    nodes = text_splitter.split_text(full_text)
-    
-    knowledge_rows = []
-    for node in nodes:
-        vector = embed_model.get_text_embedding(node)
-        
-        row = {
-            "provider_id": provider_id,
-            "document_id": document_id,
-            "content": node,
-            "embedding": vector,
-            "metadata": {"source": url, "video_id": video_id}
-        }
-        knowledge_rows.append(row)
-
-    if knowledge_rows:
-        try:
-            batch_size = 20
-            for i in range(0, len(knowledge_rows), batch_size):
-                batch = knowledge_rows[i:i + batch_size]
-                supabase.table("provider_knowledge").insert(batch).execute()
-            print(f"   ✅ Successfully saved {len(knowledge_rows)} chunks!")
-        except Exception as e:
-             print(f"   ❌ DB Vector Insert Error: {e}")
+    # 2. Fetch Transcript (captions first, Whisper fallback)
+    print(f"   ⏳ Fetching transcript for ID: {video_id}...")
+    segments, words = get_video_segments(video_id)
+    if not segments:
+        return
+
+    # 3. Get Metadata
+    title, cover_image = get_video_metadata(video_id)
+    save_json(METADATA_CACHE, _metadata_cache)
+    print(f"   📄 Found: '{title}'")
+
+    store_video(video_id, watch_url(video_id), provider_id, segments, title, cover_image, words)
+
+
+def _flatten_entries(info):
+    for entry in info.get("entries") or []:
+        if not entry:
+            continue
+        if entry.get("entries") is not None or entry.get("_type") == "playlist":
+            yield from _flatten_entries(entry)
+        elif entry.get("id"):
+            yield entry
+
+
+def list_batch_videos(source):
+    """
+    Expands a batch source into [(video_id, title_or_None)]. A source is a channel
+    or playlist URL, a file with one URL/ID per line, or comma-separated URLs/IDs.
+    """
+    if os.path.isfile(source):
+        with open(source, "r", encoding="utf-8") as handle:
+            items = [line.strip() for line in handle if line.strip() and not line.startswith("#")]
+    elif "youtube.com/" in source and ("list=" in source or "/@" in source or "/channel/" in source or "/c/" in source):
+        # Bare channel URLs list their tabs, so point at the uploads tab directly
+        if "list=" not in source and not re.search(r"/(videos|streams|shorts)/?$", source):
+            source = source.rstrip("/") + "/videos"
+        import yt_dlp
+
+        with yt_dlp.YoutubeDL({"quiet": True, "extract_flat": True, "skip_download": True}) as ydl:
+            info = ydl.extract_info(source, download=False)
+        return [(entry["id"], entry.get("title")) for entry in _flatten_entries(info)]
+    else:
+        items = [item.strip() for item in source.split(",") if item.strip()]
+
+    videos = []
+    for item in items:
+        video_id = item if re.fullmatch(r"[0-9A-Za-z_-]{11}", item) else get_video_id(item)
+        if video_id:
+            videos.append((video_id, None))
+        else:
+            print(f"   ⚠️ Skipping unrecognised entry: {item}")
+    return videos
+
+
+def fetch_existing_video_ids(provider_id, video_ids):
+    """
+    The video_ids already stored for provider_id, with one batched lookup per
+    EXISTING_LOOKUP_BATCH_SIZE ids instead of a query per video. Matching on
+    the id also finds rows stored under other spellings by older runs.
+    """
+    existing = set()
+    for i in range(0, len(video_ids), EXISTING_LOOKUP_BATCH_SIZE):
+        batch = video_ids[i:i + EXISTING_LOOKUP_BATCH_SIZE]
+        res = (
+            supabase.table("provider_documents")
+            .select("source_url")
+            .eq("provider_id", provider_id)
+            .or_(",".join(f"source_url.like.*{video_id}*" for video_id in batch))
+            .execute()
+        )
+        existing.update(get_video_id(row["source_url"]) for row in (res.data or []) if row.get("source_url"))
+    return existing & set(video_ids)
+
+
+def _prepare_video(video_id, listed_title):
+    segments, words = get_video_segments(video_id)
+    if not segments:
+        return video_id, None, None, None, None
+    if listed_title:
+        title, cover_image = listed_title, f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg"
+    else:
+        title, cover_image = get_video_metadata(video_id)
+    return video_id, segments, words, title, cover_image
+
+
+def seed_youtube_batch(source, provider_id):
+    """
+    Seeds a whole channel, playlist or ID list in one process. Transcripts and
+    metadata are fetched by a bounded pool; documents are stored as they arrive.
+    """
+    started = time.time()
+    print(f"📺 Expanding batch source: {source}")
+    videos = list(dict(list_batch_videos(source)).items())
+    if not videos:
+        print("   ❌ No videos found.")
+        return
+    existing = fetch_existing_video_ids(provider_id, [video_id for video_id, _ in videos])
+    pending = [(video_id, title) for video_id, title in videos if video_id not in existing]
+    print(f"   📋 {len(videos)} videos, {len(videos) - len(pending)} already seeded, {len(pending)} to process.")
+
+    stored = 0
+    with ThreadPoolExecutor(max_workers=TRANSCRIPT_WORKERS) as pool:
+        futures = [pool.submit(_prepare_video, video_id, title) for video_id, title in pending]
+        for index, future in enumerate(as_completed(futures), start=1):
+            video_id, segments, words, title, cover_image = future.result()
+            if not segments:
+                continue
+            print(f"[{index}/{len(pending)}] 📄 '{title}'")
+            if store_video(video_id, watch_url(video_id), provider_id, segments, title, cover_image, words):
+                stored += 1
+    save_json(METADATA_CACHE, _metadata_cache)
+    print(f"🎉 Batch finished: {stored}/{len(pending)} videos seeded in {time.time() - started:.1f}s.")
+
+
+def estimate_video(video_id, listed_title, estimate):
+    """
+    What _prepare_video and store_video would cost. Captions are fetched (and
+    cached, so the real run reuses them); Whisper is projected from the duration.
+    """
+    estimate.add_requests("http")
+    segments = caption_segments(fetch_transcript(video_id))
+    if len(transcript_text(segments)) >= MIN_TRANSCRIPT_CHARS:
+        estimate.add_segments(segments)
+    elif AUDIO_FALLBACK and openai_client is not None:
+        estimate.add_requests("http")
+        estimate.add_media(media_duration(watch_url(video_id)))
+    else:
+        estimate.add_skipped()
+        return
+    if not listed_title:
+        estimate.add_requests("http")
+    estimate.add_requests("supabase")
+    estimate.add_item()
+
+
+def estimate_youtube(url, provider_id):
+    estimate = Estimate(f"YouTube video {url}")
+    video_id = get_video_id(url)
+    if not video_id:
+        print("   ❌ Invalid YouTube URL")
+    elif fetch_existing_video_ids(provider_id, [video_id]):
+        estimate.add_skipped()
+    else:
+        estimate_video(video_id, None, estimate)
+    return estimate
+
+
+def estimate_youtube_batch(source, provider_id):
+    """seed_youtube_batch's work, measured on a sample of the videos not yet seeded."""
+    estimate = Estimate(
+        f"YouTube batch {source}",
+        concurrency=TRANSCRIPT_WORKERS,
+        # Audio goes through its own slots; documents are stored one at a time
+        stage_concurrency={"download": AUDIO_FALLBACK_WORKERS, "whisper": AUDIO_FALLBACK_WORKERS, "embedding": 1, "supabase": 1},
+    )
+    videos = list(dict(list_batch_videos(source)).items())
+    existing = fetch_existing_video_ids(provider_id, [video_id for video_id, _ in videos])
+    pending = [(video_id, title) for video_id, title in videos if video_id not in existing]
+    estimate.add_skipped(len(videos) - len(pending))
+    estimate.add_requests("supabase", len(videos) // EXISTING_LOOKUP_BATCH_SIZE + 1)
+    picked, scale = sample(pending)
+    print(f"   📋 {len(videos)} videos, {len(pending)} to process; measuring {len(picked)}...")
+    def measure(video):
+        part = Estimate(estimate.label)
+        estimate_video(video[0], video[1], part)
+        return part
+
+    measured = Estimate(estimate.label)
+    with ThreadPoolExecutor(max_workers=TRANSCRIPT_WORKERS) as pool:
+        for part in pool.map(measure, picked):
+            measured.merge(part)
+    estimate.merge(measured, scale)
+    return estimate
+
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python seed-youtube.py \"<youtube_url>\" <provider_id>")
+    args = sys.argv[1:]
+    estimate = estimate_requested(args)
+    if len(args) >= 3 and args[0] == "--batch":
+        if estimate:
+            estimate_youtube_batch(args[1], int(args[2])).report()
+        else:
+            seed_youtube_batch(args[1], int(args[2]))
+    elif len(args) < 2:
+        print("Usage: python seed-youtube.py \"<youtube_url>\" <provider_id> [--estimate]")
+        print("       python seed-youtube.py --batch \"<channel|playlist url | id,id,... | ids.txt>\" <provider_id> [--estimate]")
+    elif estimate:
+        estimate_youtube(args[0], int(args[1])).report()
     else:
-        seed_youtube(sys.argv[1], int(sys.argv[2]))
\ No newline at end of file
+        seed_youtube(args[0], int(args[1]))
@@ -0,0 +1,37 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+CACHE_DIR = Path(os.environ.get("SEEDER_CACHE_DIR") or Path(__file__).resolve().parent / ".cache")
+
+
+def cache_path(name: str) -> Path:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    return CACHE_DIR / name
+
+
+def load_json(name: str, default=None):
+    path = cache_path(name)
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as exc:
+        print(f"⚠️  Ignoring unreadable cache {path.name}: {exc}")
+        return default
+
+
+def save_json(name: str, data) -> None:
+    """Writes atomically so a crash mid-write never leaves a truncated cache."""
+    path = cache_path(name)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(data, handle)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -1,19 +1,29 @@
+import importlib.util
 import os
 import re
+import sys
 from typing import Dict
-from urllib.parse import urljoin, urlparse, urlunparse
+from urllib.parse import urljoin
 
 import requests
 from bs4 import BeautifulSoup
-from dotenv import load_dotenv
-from supabase import Client, create_client
 
 try:
-    from playwright.sync_api import sync_playwright
+    from .clients import load_env, supabase
+    from .channel_discovery import SEED_WORKERS, estimate_discoveries, fetch_vimeo_authenticated_videos, fetch_vimeo_public_videos
+    from .estimate import Estimate, estimate_requested
+    from .discovery_index import DiscoveryIndex
+    from .seeder_cache import load_json, save_json
+    from .url_canonicalizer import normalize_url
 except ImportError:
-    sync_playwright = None
+    from clients import load_env, supabase
+    from channel_discovery import SEED_WORKERS, estimate_discoveries, fetch_vimeo_authenticated_videos, fetch_vimeo_public_videos
+    from estimate import Estimate, estimate_requested
+    from discovery_index import DiscoveryIndex
+    from seeder_cache import load_json, save_json
+    from url_canonicalizer import normalize_url
 
-load_dotenv()
+load_env()
 
 VIMEO_ROOT = "https://vimeo.com/seedlegals"
 VIDEO_ID_RE = re.compile(
@@ -28,13 +38,24 @@ API_MAX_PAGES = int(os.environ.get("SEEDLEGALS_API_MAX_PAGES", "5"))
 API_CHANNEL = os.environ.get("SEEDLEGALS_CHANNEL", "seedlegals")
 LOAD_MORE_CLICKS = int(os.environ.get("SEEDLEGALS_LOAD_MORE_CLICKS", "5"))
 VIMEO_ACCESS_TOKEN = os.environ.get("SEEDLEGALS_VIMEO_TOKEN")
+API_BACKFILL_MAX_PAGES = int(os.environ.get("SEEDLEGALS_BACKFILL_MAX_PAGES", "50"))
+PAGE_WORKERS = int(os.environ.get("SEEDLEGALS_PAGE_WORKERS", "4"))
+SEEDLEGALS_PAGING = {
+    "per_page": API_PER_PAGE,
+    "max_pages": API_MAX_PAGES,
+    "backfill_max_pages": API_BACKFILL_MAX_PAGES,
+    "workers": PAGE_WORKERS,
+}
+
+ETAG_CACHE = "vimeo-page-etags.json"
+_PAGE_ETAGS: Dict[str, str] = load_json(ETAG_CACHE, {})
+_PENDING_ETAGS: Dict[str, str] = {}
 
 PROVIDER_ID = 12
-SUPABASE_CLIENT = (
-    create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-    if SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY
-    else None
-)
+# Built on first use
+SUPABASE_CLIENT = supabase if SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY else None
+# Playwright is only imported when the rendered page is actually needed
+PLAYWRIGHT_AVAILABLE = importlib.util.find_spec("playwright") is not None
 
 
 def _extract_cover_image(anchor):
@@ -76,14 +97,15 @@ def _extract_videos_from_html(html):
     return videos
 
 
-def fetch_seedlegals_video_links():
-    auth_videos = fetch_seedlegals_authenticated_videos()
-    if auth_videos:
+def fetch_seedlegals_video_links(known_urls=None, backfill: bool = False):
+    # The APIs return {} when they worked but found nothing new; only None falls back
+    auth_videos = fetch_seedlegals_authenticated_videos(known_urls, backfill)
+    if auth_videos is not None:
         return auth_videos
-    api_videos = fetch_seedlegals_api_videos()
-    if api_videos:
+    api_videos = fetch_seedlegals_api_videos(known_urls, backfill)
+    if api_videos is not None:
         return api_videos
-    if sync_playwright:
+    if PLAYWRIGHT_AVAILABLE:
         html = _fetch_with_playwright()
         if html:
             videos = _extract_videos_from_html(html)
@@ -94,6 +116,8 @@ def fetch_seedlegals_video_links():
 
 
 def _fetch_with_playwright():
+    from playwright.sync_api import sync_playwright
+
     print("Fetching Vimeo channel page via Playwright rendering...")
     with sync_playwright() as playwright:
         browser = playwright.chromium.launch()
@@ -141,120 +165,54 @@ def _fetch_with_requests():
     return videos
 
 
-def fetch_seedlegals_api_videos() -> dict[str, dict]:
+def fetch_seedlegals_api_videos(known_urls=None, backfill: bool = False) -> dict[str, dict] | None:
+    """Public v2 channel API. Returns None when the API is unusable so callers fall back."""
     print("Fetching Vimeo video metadata from API...")
-    videos: Dict[str, dict] = {}
-    API_BASE = f"https://vimeo.com/api/v2/channel/{API_CHANNEL}/videos.json"
-    headers = {"User-Agent": "SeedLegalsVideoCollector/1.0"}
-    for page in range(1, API_MAX_PAGES + 1):
-        params = {"page": page, "per_page": API_PER_PAGE, "sort": "date", "direction": "desc"}
-        try:
-            response = requests.get(API_BASE, headers=headers, params=params, timeout=15)
-            response.raise_for_status()
-        except requests.exceptions.HTTPError as exc:
-            print(f"  API request failed (status={response.status_code}): {exc}")
-            return {}
-        except requests.exceptions.RequestException as exc:
-            print(f"  API request failed: {exc}")
-            return {}
-        data = response.json()
-        if not isinstance(data, list) or not data:
-            break
-        for entry in data:
-            url = (entry.get("url") or entry.get("link") or "").strip()
-            if not url:
-                continue
-            title = entry.get("title") or entry.get("name") or "Untitled video"
-            cover = entry.get("thumbnail_large") or entry.get("thumbnail_medium") or entry.get("thumbnail_small")
-            videos[url] = {
-                "title": title,
-                "cover_image": cover,
-            }
-        if len(data) < API_PER_PAGE:
-            break
+    videos, fresh_etags = fetch_vimeo_public_videos(
+        API_CHANNEL, known_urls=known_urls, backfill=backfill, etags=_PAGE_ETAGS, paging=SEEDLEGALS_PAGING
+    )
+    _PENDING_ETAGS.update(fresh_etags)
     if videos:
         print(f"Found {len(videos)} video links via Vimeo API.")
     return videos
 
 
-def fetch_seedlegals_authenticated_videos() -> dict[str, dict]:
+def fetch_seedlegals_authenticated_videos(known_urls=None, backfill: bool = False) -> dict[str, dict] | None:
+    """Authenticated v3 API. Returns None without a token or on failure so callers fall back."""
     if not VIMEO_ACCESS_TOKEN:
-        return {}
+        return None
     print("Fetching Vimeo video metadata via authenticated API...")
-    videos: Dict[str, dict] = {}
-    endpoint = f"https://api.vimeo.com/channels/{API_CHANNEL}/videos"
-    headers = {
-        "Authorization": f"Bearer {VIMEO_ACCESS_TOKEN}",
-        "Accept": "application/vnd.vimeo.*+json;version=3.4",
-    }
-    for page in range(1, API_MAX_PAGES + 1):
-        params = {"page": page, "per_page": API_PER_PAGE, "sort": "date", "direction": "desc"}
-        try:
-            response = requests.get(endpoint, headers=headers, params=params, timeout=15)
-            response.raise_for_status()
-        except requests.exceptions.HTTPError as exc:
-            print(f"  Auth API request failed (status={response.status_code}): {exc}")
-            break
-        except requests.exceptions.RequestException as exc:
-            print(f"  Auth API request failed: {exc}")
-            break
-        payload = response.json()
-        data = payload.get("data") if isinstance(payload, dict) else payload
-        if not isinstance(data, list) or not data:
-            break
-        for entry in data:
-            url = (entry.get("link") or "").strip()
-            if not url:
-                continue
-            title = entry.get("name") or entry.get("title") or "Untitled video"
-            pictures = entry.get("pictures", {})
-            cover = pictures.get("base_link") or pictures.get("sizes", [{}])[-1].get("link")
-            videos[url] = {
-                "title": title,
-                "cover_image": cover,
-            }
-        if len(data) < API_PER_PAGE:
-            break
+    videos, fresh_etags = fetch_vimeo_authenticated_videos(
+        API_CHANNEL, VIMEO_ACCESS_TOKEN, known_urls=known_urls, backfill=backfill,
+        etags=_PAGE_ETAGS, paging=SEEDLEGALS_PAGING,
+    )
+    _PENDING_ETAGS.update(fresh_etags)
     if videos:
         print(f"Found {len(videos)} video links via authenticated Vimeo API.")
     return videos
 
 
-def normalize_source_url(raw_url: str) -> str:
-    if not raw_url:
-        return ""
-    try:
-        parsed = urlparse(raw_url)
-        scheme = parsed.scheme or "https"
-        path = parsed.path.rstrip("/")
-        if path == "":
-            path = "/"
-        normalized = parsed._replace(scheme=scheme, path=path, query="", fragment="")
-        return urlunparse(normalized)
-    except Exception:
-        return raw_url
-
-
-def fetch_existing_source_urls() -> set[str]:
+def commit_page_etags() -> None:
+    """Persists ETags from this run once its discoveries are safely inserted."""
+    if _PENDING_ETAGS:
+        _PAGE_ETAGS.update(_PENDING_ETAGS)
+        save_json(ETAG_CACHE, _PAGE_ETAGS)
+        _PENDING_ETAGS.clear()
+
+
+def fetch_existing_source_urls(refresh: bool = False) -> DiscoveryIndex:
+    """This provider's normalized URLs, loaded incrementally from the local index cache."""
     if not SUPABASE_CLIENT:
         raise RuntimeError("Supabase credentials are required to fetch existing documents")
-    response = SUPABASE_CLIENT.table("provider_documents").select("source_url").execute()
-    data = getattr(response, "data", None)
-    error = getattr(response, "error", None)
-    if error:
-        raise error
-    urls = {
-        normalize_source_url(row.get("source_url") or "")
-        for row in (data or [])
-        if row.get("source_url")
-    }
-    return urls
-
-
-def find_new_videos(videos: dict[str, dict], seen_urls: set[str]) -> list[tuple[str, dict]]:
+    return DiscoveryIndex(SUPABASE_CLIENT, PROVIDER_ID, normalize_url).load(refresh=refresh)
+
+
+def find_new_videos(videos: dict[str, dict], seen_urls) -> list[tuple[str, dict]]:
+    if isinstance(seen_urls, DiscoveryIndex):
+        seen_urls.confirm_many([normalize_url(url) for url in videos])
     results = []
     for url, payload in videos.items():
-        normalized = normalize_source_url(url)
+        normalized = normalize_url(url)
         if normalized and normalized not in seen_urls:
             payload["source_url"] = normalized
             results.append((normalized, payload))
@@ -262,10 +220,12 @@ def find_new_videos(videos: dict[str, dict], seen_urls: set[str]) -> list[tuple[
     return results
 
 
-def insert_new_provider_documents(entries: list[tuple[str, dict]]):
+def insert_new_provider_documents(entries: list[tuple[str, dict]]) -> int:
+    """Inserts pending documents and returns how many inserts failed."""
     if not SUPABASE_CLIENT:
         print("⚠️  Supabase credentials missing; skipping document insert.")
-        return
+        return len(entries)
+    failures = 0
     for normalized_url, payload in entries:
         response = SUPABASE_CLIENT.table("provider_documents").insert(
             {
@@ -280,18 +240,32 @@ def insert_new_provider_documents(entries: list[tuple[str, dict]]):
         error = getattr(response, "error", None)
         if error:
             print(f"⚠️  Failed to insert {payload['title']} ({normalized_url}): {error}")
+            failures += 1
         else:
             print(f"✅ Inserted {payload['title']} into provider_documents.")
+    return failures
 
 
 def main():
+    args = sys.argv[1:]
+    estimate = estimate_requested(args)
     existing_urls = set()
     try:
-        existing_urls = fetch_existing_source_urls()
+        existing_urls = fetch_existing_source_urls(refresh="--refresh-index" in args)
     except Exception as error:
         print(f"⚠️  Unable to load existing documents: {error}")
-    videos = fetch_seedlegals_video_links()
+    backfill = "--backfill" in args
+    # Without a loaded index every page looks new, so early termination is off
+    known_urls = existing_urls if isinstance(existing_urls, DiscoveryIndex) else None
+    videos = fetch_seedlegals_video_links(known_urls, backfill)
     new_videos = find_new_videos(videos, existing_urls)
+    if estimate:
+        # Nothing is inserted and the page ETags aren't committed, so the real run sees the same pages
+        projected = Estimate("seeding new SeedLegals videos", concurrency=SEED_WORKERS)
+        estimate_discoveries(new_videos, projected)
+        projected.add_skipped(len(videos) - len(new_videos))
+        projected.report()
+        return
     if new_videos:
         print(f"✅ Found {len(new_videos)} new SeedLegals videos:")
         for idx, (url, payload) in enumerate(new_videos, start=1):
@@ -303,9 +277,13 @@ def main():
                 print(f"    Cover: {cover}")
             else:
                 print("    Cover: (none found)")
-        insert_new_provider_documents(new_videos)
+        failures = insert_new_provider_documents(new_videos)
     else:
         print("ℹ️  All discovered SeedLegals videos already exist in provider_documents.")
+        failures = 0
+    # A 304 next run skips these pages entirely, so only remember them once stored
+    if not failures:
+        commit_page_etags()
 
 
 if __name__ == "__main__":
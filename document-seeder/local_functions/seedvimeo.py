@@ -1,212 +1,847 @@
 import os
+import queue
+import re
+import socket
 import sys
-import yt_dlp
-from pathlib import Path
-from dotenv import load_dotenv
-from openai import OpenAI
-from supabase import create_client, Client
-from llama_index.embeddings.openai import OpenAIEmbedding
+import threading
+import time
+import requests
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+try:
+    from .clients import embed_model, load_env, openai_client, supabase
+    from .audio_fingerprint import clone_document_knowledge, find_matching_document, fingerprint_file, save_fingerprint
+    from .captions import parse_webvtt
+    from .deadline import DeadlineReached, current as current_deadline
+    from .estimate import Estimate, estimate_requested, media_duration, sample
+    from .fair_scheduler import FairScheduler
+    from .knowledge_store import EMBED_BATCH_SIZE, build_transcript_rows, embed_texts, has_legacy_chunks, insert_knowledge_rows, stored_chunk_indexes
+    from .scratch_space import ScratchSpace
+    from .transcript_chunker import chunk_segments, segment_fields
+    from .word_index import build_word_index, save_word_index, whisper_granularities
+except ImportError:
+    from clients import embed_model, load_env, openai_client, supabase
+    from audio_fingerprint import clone_document_knowledge, find_matching_document, fingerprint_file, save_fingerprint
+    from captions import parse_webvtt
+    from deadline import DeadlineReached, current as current_deadline
+    from estimate import Estimate, estimate_requested, media_duration, sample
+    from fair_scheduler import FairScheduler
+    from knowledge_store import EMBED_BATCH_SIZE, build_transcript_rows, embed_texts, has_legacy_chunks, insert_knowledge_rows, stored_chunk_indexes
+    from scratch_space import ScratchSpace
+    from transcript_chunker import chunk_segments, segment_fields
+    from word_index import build_word_index, save_word_index, whisper_granularities
 
 # --- CONFIGURATION ---
-load_dotenv()
-PROJECT_ROOT = Path(__file__).resolve().parent
-OUTPUT_DIR = PROJECT_ROOT / "audio_output"
+# Clients are built on first use
+load_env()
+
+# Worker pool / claiming
+WORKER_ID = os.environ.get("SEED_VIMEO_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+WORKER_COUNT = int(os.environ.get("SEED_VIMEO_WORKERS", "1"))
+CLAIM_BATCH_SIZE = int(os.environ.get("SEED_VIMEO_CLAIM_BATCH", "2"))
+CLAIM_LEASE_SECONDS = int(os.environ.get("SEED_VIMEO_LEASE_SECONDS", "1800"))
+
+# Pipeline mode: per-stage concurrency and bounded hand-off queues
+PIPELINE_ENABLED = os.environ.get("SEED_VIMEO_PIPELINE", "").lower() in ("1", "true", "yes")
+DOWNLOAD_WORKERS = int(os.environ.get("SEED_VIMEO_DOWNLOAD_WORKERS", "2"))
+TRANSCRIBE_WORKERS = int(os.environ.get("SEED_VIMEO_TRANSCRIBE_WORKERS", "2"))
+EMBED_WORKERS = int(os.environ.get("SEED_VIMEO_EMBED_WORKERS", "1"))
+PIPELINE_QUEUE_SIZE = int(os.environ.get("SEED_VIMEO_QUEUE_SIZE", "2"))
+
+# Captions-first: Vimeo text tracks replace download + Whisper when present
+VIMEO_ACCESS_TOKEN = os.environ.get("SEEDLEGALS_VIMEO_TOKEN")
+CAPTION_LANGUAGES = [lang.strip() for lang in os.environ.get("SEED_VIMEO_CAPTION_LANGS", "en").split(",") if lang.strip()]
+VIMEO_VIDEO_ID_RE = re.compile(r"vimeo\.com/(?:.*/)?(\d+)")
+
+YDL_OPTS = {
+    'format': 'bestaudio/best',
+    'postprocessors': [{
+        'key': 'FFmpegExtractAudio',
+        'preferredcodec': 'mp3',
+        'preferredquality': '32',
+    }],
+    'postprocessor_args': ['-ac', '1'], # Mono
+    'quiet': True,
+    'no_warnings': True,
+    'cookiesfrombrowser': ('chrome',),
+}
+
+
+def download_audio(video_url, scratch):
+    """Downloads mono 32k audio into the job's scratch dir. Returns (audio_path, detected_title)."""
+    import yt_dlp
+
+    print("   ⬇️  Downloading audio (using Chrome cookies)...")
+    ydl_opts = {**YDL_OPTS, 'outtmpl': str(scratch.file('%(id)s.%(ext)s'))}
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(video_url, download=True)
+        detected_title = info.get('title', 'Unknown Title')
+        video_id = info.get('id')
+        audio_path = str(scratch.file(f"{video_id}.mp3"))
+        print(f"   ✅ Downloaded: {detected_title}")
+    scratch.measure()
+    return audio_path, detected_title
+
+
+def transcribe_audio(audio_path):
+    """Returns (segments, words); words is None unless SEEDER_WORD_TIMESTAMPS is set."""
+    print("   🎙️  Transcribing (Verbose Mode)...")
+    with open(audio_path, "rb") as audio_file:
+        transcript = openai_client.audio.transcriptions.create(
+            model="whisper-1", 
+            file=audio_file,
+            response_format="verbose_json",
+            timestamp_granularities=whisper_granularities()
+        )
+    segments = transcript.segments
+    print(f"   ✅ Transcription complete ({len(segments)} segments).")
+    return segments, getattr(transcript, "words", None)
+
+
+def _vimeo_api_get(path, **params):
+    response = requests.get(
+        f"https://api.vimeo.com{path}",
+        headers={
+            "Authorization": f"Bearer {VIMEO_ACCESS_TOKEN}",
+            "Accept": "application/vnd.vimeo.*+json;version=3.4",
+        },
+        params=params,
+        timeout=15,
+    )
+    response.raise_for_status()
+    return response.json()
+
 
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
-openai_client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-supabase: Client = create_client(url, key)
-embed_model = OpenAIEmbedding(model="text-embedding-3-small")
+def _pick_text_track(tracks):
+    """Prefers the configured languages, then captions over subtitles, then the active track."""
+    usable = [track for track in tracks if track.get("link")]
+
+    def rank(track):
+        language = (track.get("language") or "").lower()
+        lang_rank = next(
+            (i for i, wanted in enumerate(CAPTION_LANGUAGES) if language.startswith(wanted.lower())),
+            len(CAPTION_LANGUAGES),
+        )
+        return (lang_rank, track.get("type") != "captions", not track.get("active"))
+
+    return min(usable, key=rank) if usable else None
+
+
+def fetch_caption_segments(video_url, want_title=False):
+    """
+    Returns (segments, title) from the video's Vimeo text track, or (None, None)
+    when there is no token, no track, or the track is unusable.
+    """
+    match = VIMEO_VIDEO_ID_RE.search(video_url or "")
+    if not VIMEO_ACCESS_TOKEN or not match:
+        return None, None
+    video_id = match.group(1)
+    try:
+        track = _pick_text_track(_vimeo_api_get(f"/videos/{video_id}/texttracks").get("data") or [])
+        if not track:
+            return None, None
+        vtt = requests.get(track["link"], timeout=15)
+        vtt.raise_for_status()
+        segments = parse_webvtt(vtt.text)
+        if not segments:
+            return None, None
+        title = _vimeo_api_get(f"/videos/{video_id}", fields="name").get("name") if want_title else None
+    except requests.exceptions.RequestException as e:
+        print(f"   ⚠️  Text track lookup failed, falling back to audio: {e}")
+        return None, None
+    print(f"   💬 Using {track.get('language') or 'unknown'} {track.get('type') or 'text'} track ({len(segments)} cues).")
+    return segments, title
+
+
+def resolve_document_id(video_url, provider_id, final_title, existing_doc=None):
+    print("   💾 Saving to Supabase...")
+    if existing_doc:
+        return existing_doc.get("id")
+    # Fallback for manual runs (not used in current flow)
+    existing = supabase.table('provider_documents').select("id").eq("source_url", video_url).execute()
+    if existing.data:
+        return existing.data[0]['id']
+    data, count = supabase.table('provider_documents').insert({
+        "provider_id": provider_id, # Use the dynamic ID
+        "title": final_title,
+        "source_url": video_url,
+        "media_type": "video" 
+    }).execute()
+
+    # Handle different supabase-py return shapes
+    if hasattr(data, 'data') and len(data.data) > 0:
+        return data.data[0]['id']
+    return data[1][0]['id']
+
+
+def save_transcript_checkpoint(doc_id, final_title, segments, words=None):
+    """
+    Stores the transcript on the pending document (and its word index), so a
+    run cut off by the deadline resumes without downloading or transcribing again.
+    """
+    if words:
+        save_word_index(supabase, doc_id, build_word_index(segments, words))
+    checkpoint = {
+        "title": final_title,
+        "segments": [dict(zip(("text", "start", "end"), segment_fields(seg))) for seg in segments],
+    }
+    supabase.table("provider_documents").update({"seed_checkpoint": checkpoint}).eq("id", doc_id).execute()
+
+
+def embed_and_insert_segments(segments, video_url, provider_id, doc_id, final_title, reseed=False):
+    """
+    Chunks are embedded and inserted one embedding batch at a time, each row
+    carrying its chunkIndex. Chunking is deterministic, so a resumed run skips
+    the indexes already stored and never duplicates rows. Rows from older,
+    non-resumable runs are replaced only when reseed (a claimed pending
+    document); a manual run leaves such a document as it is.
+    """
+    # CHUNK WITH TIMESTAMPS
+    print("   ⚡ Processing segments...")
+    if not reseed and has_legacy_chunks(supabase, doc_id):
+        print(f"   ⏭️  Document {doc_id} already has chunks from an older run; requeue it to re-seed.")
+        return
+    chunks = list(chunk_segments(segments))
+    stored = stored_chunk_indexes(supabase, doc_id, drop_legacy=reseed)
+    todo = [index for index in range(len(chunks)) if index not in stored]
+    if stored:
+        print(f"   ↩️  Resuming: {len(chunks) - len(todo)}/{len(chunks)} chunks already stored.")
+
+    deadline = current_deadline()
+    for start in range(0, len(todo), EMBED_BATCH_SIZE):
+        deadline.check()
+        indexes = todo[start:start + EMBED_BATCH_SIZE]
+        batch = [chunks[index] for index in indexes]
+        vectors = embed_texts(embed_model, [chunk["content"] for chunk in batch])
+        rows = build_transcript_rows(batch, vectors, provider_id, doc_id, {"source": video_url}, indexes)
+        print(f"   💾 Inserting chunks {start + 1}-{start + len(rows)} of {len(todo)} for Provider {provider_id}...")
+        insert_knowledge_rows(supabase, rows)
+    if chunks:
+        print(f"   ✨ SUCCESS! '{final_title}' ingested.")
+
+
+def store_knowledge(segments, video_url, provider_id, doc_id, final_title, fingerprint=None, match=None, reseed=False):
+    """Embeds the transcript, or copies a fingerprint-matched document's chunks instead."""
+    if match and match["id"] == doc_id:
+        # Only a manual run can get here: claimed documents are excluded from their own match
+        print(f"   ⏭️  Document {doc_id} already holds this recording's chunks.")
+        return
+    if match:
+        # A cloned copy is all-or-nothing; clear any partial one from an interrupted run
+        supabase.table("provider_knowledge").delete().eq("document_id", doc_id).execute()
+        clone_document_knowledge(supabase, match["id"], doc_id, provider_id, video_url, match["time_shift"])
+    else:
+        embed_and_insert_segments(segments, video_url, provider_id, doc_id, final_title, reseed)
+    save_fingerprint(supabase, doc_id, fingerprint)
 
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
 
 # Updated signature to accept provider_id
 def process_video(video_url, provider_id, manual_title=None, existing_doc=None):
     print(f"\n🚀 Starting processing for: {video_url} (Provider: {provider_id})")
-    
-    audio_path = ""
-    detected_title = ""
-    doc_id = None
-
-    # yt-dlp Configuration
-    ydl_opts = {
-        'format': 'bestaudio/best',
-        'outtmpl': str(OUTPUT_DIR / '%(id)s.%(ext)s'),
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '32',
-        }],
-        'postprocessor_args': ['-ac', '1'], # Mono
-        'quiet': True,
-        'no_warnings': True,
-        'cookiesfrombrowser': ('chrome',), 
-    }
 
+    doc_id = None
     success = False
+    scratch = ScratchSpace(f"vimeo-{provider_id}")
     try:
-        # A. DOWNLOAD
-        print("   ⬇️  Downloading audio (using Chrome cookies)...")
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=True)
-            detected_title = info.get('title', 'Unknown Title')
-            video_id = info.get('id')
-            audio_path = str(OUTPUT_DIR / f"{video_id}.mp3")
-            print(f"   ✅ Downloaded: {detected_title}")
+        checkpoint = (existing_doc or {}).get("seed_checkpoint")
+        words = fingerprint = match = None
+        if checkpoint:
+            # A. RESUME FROM THE TRANSCRIPT SAVED BY AN INTERRUPTED RUN
+            print("   ↩️  Resuming from saved transcript.")
+            segments, detected_title = checkpoint["segments"], checkpoint.get("title")
+        else:
+            # A. CAPTIONS FIRST, ELSE DOWNLOAD + TRANSCRIBE
+            segments, detected_title = fetch_caption_segments(video_url, want_title=not manual_title)
+            if not segments:
+                audio_path, detected_title = download_audio(video_url, scratch)
+                # The same talk may already be seeded from another source
+                fingerprint = fingerprint_file(audio_path)
+                match = find_matching_document(supabase, fingerprint, (existing_doc or {}).get("id"))
+                if not match:
+                    segments, words = transcribe_audio(audio_path)
 
         # USE MANUAL TITLE IF PROVIDED
-        final_title = manual_title if manual_title else detected_title
+        final_title = manual_title or detected_title or "Untitled video"
         print(f"   📝 Using Title: {final_title}")
 
-        # B. TRANSCRIBE
-        print("   🎙️  Transcribing (Verbose Mode)...")
-        with open(audio_path, "rb") as audio_file:
-            transcript = openai_client.audio.transcriptions.create(
-                model="whisper-1", 
-                file=audio_file,
-                response_format="verbose_json",
-                timestamp_granularities=["segment"]
-            )
-        
-        segments = transcript.segments
-        print(f"   ✅ Transcription complete ({len(segments)} segments).")
-
-        # C. SAVE/UPDATE PARENT DOC
-        print("   💾 Saving to Supabase...")
-        if existing_doc:
-            doc_id = existing_doc.get("id")
-            # We don't need to update title here necessarily, but we could
-        else:
-            # Fallback for manual runs (not used in current flow)
-            existing = supabase.table('provider_documents').select("id").eq("source_url", video_url).execute()
-            if existing.data:
-                doc_id = existing.data[0]['id']
-            else:
-                data, count = supabase.table('provider_documents').insert({
-                    "provider_id": provider_id, # Use the dynamic ID
-                    "title": final_title,
-                    "source_url": video_url,
-                    "media_type": "video" 
-                }).execute()
-                
-                # Handle different supabase-py return shapes
-                if hasattr(data, 'data') and len(data.data) > 0:
-                     doc_id = data.data[0]['id']
-                else:
-                     doc_id = data[1][0]['id']
-
-        # D. CHUNK WITH TIMESTAMPS
-        print("   ⚡ Processing segments...")
-        
-        rows = []
-        current_chunk_text = ""
-        chunk_start_time = 0
-        
-        for i, seg in enumerate(segments):
-            text = seg.text if hasattr(seg, 'text') else seg['text']
-            start = seg.start if hasattr(seg, 'start') else seg['start']
-            end = seg.end if hasattr(seg, 'end') else seg['end']
-            
-            if current_chunk_text == "":
-                chunk_start_time = start
-                
-            current_chunk_text += text + " "
-            
-            # Aggregate into ~1000 char chunks
-            if len(current_chunk_text) > 1000 or i == len(segments) - 1:
-                
-                vec = embed_model.get_text_embedding(current_chunk_text)
-                
-                rows.append({
-                    "provider_id": provider_id, # <--- IMPORTANT: Uses correct provider
-                    "document_id": doc_id,
-                    "content": current_chunk_text.strip(),
-                    "embedding": vec,
-                    "metadata": {
-                        "source": video_url,
-                        "timestampStart": int(chunk_start_time),
-                        "timestampEnd": int(end)
-                    }
-                })
-                current_chunk_text = ""
-
-        # Batch Insert
-        if rows:
-            print(f"   💾 Inserting {len(rows)} chunks for Provider {provider_id}...")
-            batch_size = 20
-            for i in range(0, len(rows), batch_size):
-                supabase.table('provider_knowledge').insert(rows[i:i+batch_size]).execute()
-            print(f"   ✨ SUCCESS! '{final_title}' ingested.")
+        # C. SAVE/UPDATE PARENT DOC, CHECKPOINTING THE TRANSCRIPT
+        doc_id = resolve_document_id(video_url, provider_id, final_title, existing_doc)
+        if segments and not checkpoint:
+            save_transcript_checkpoint(doc_id, final_title, segments, words)
+
+        # D. CHUNK, EMBED, INSERT (or reuse a matching recording's chunks)
+        store_knowledge(segments, video_url, provider_id, doc_id, final_title, fingerprint, match, reseed=bool(existing_doc))
         success = True
 
+    except DeadlineReached:
+        raise
     except Exception as e:
         print(f"\n❌ Error: {e}")
     finally:
-        if audio_path and os.path.exists(audio_path):
-            try:
-                os.remove(audio_path)
-            except:
-                pass
+        scratch.cleanup()
     return success, doc_id
 
-def fetch_next_pending_document():
-    # Fetch provider_id along with other fields
+def _utc_timestamp(moment: datetime) -> str:
+    # Avoid "+00:00" offsets: a bare "+" in a PostgREST filter reads as a space.
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _unclaimed_filter(now: datetime) -> str:
+    return f"claim_expires_at.is.null,claim_expires_at.lt.{_utc_timestamp(now)}"
+
+
+_scheduler = FairScheduler(supabase)
+
+
+def _candidate_ids(now: datetime, limit: int, provider_id=None, expedited: bool = False, exclude=()) -> list:
+    query = (
+        supabase.table("provider_documents")
+        .select("id")
+        .eq("is_active", False)
+        .or_(_unclaimed_filter(now))
+    )
+    if exclude:
+        query = query.not_.in_("id", sorted(exclude))
+    if provider_id is not None:
+        query = query.eq("provider_id", provider_id)
+    if expedited:
+        query = query.gt("seed_priority", 0)
+    return [row["id"] for row in query.order("id").limit(limit).execute().data or []]
+
+
+def _claim(document_id, lease: dict, now: datetime) -> dict | None:
     response = (
         supabase.table("provider_documents")
-        .select("id, title, source_url, provider_id") 
+        .update(lease)
+        .eq("id", document_id)
         .eq("is_active", False)
-        .limit(1)
-        .maybe_single()
+        .or_(_unclaimed_filter(now))
         .execute()
     )
-    data = getattr(response, "data", None)
-    error = getattr(response, "error", None)
-    if error:
-        raise error
-    return data
+    return response.data[0] if response.data else None
+
+
+def _lease(worker_id: str, now: datetime) -> dict:
+    return {
+        "claimed_by": worker_id,
+        "claimed_at": _utc_timestamp(now),
+        "claim_expires_at": _utc_timestamp(now + timedelta(seconds=CLAIM_LEASE_SECONDS)),
+    }
+
+
+def claim_pending_documents(worker_id: str, batch_size: int, skip_ids: set | None = None) -> list[dict]:
+    """
+    Atomically claims up to batch_size pending documents for worker_id.
+
+    Expedited documents come first; the remaining slots are shared between
+    providers by the fair scheduler, so one provider's large upload cannot
+    starve the others. Each claim is a conditional UPDATE that only matches
+    while the row is still pending and unleased (or its lease has expired), so
+    concurrent workers on any number of instances never receive the same row.
+    """
+    skip_ids = set(skip_ids or ())  # excluded in the query, so long runs don't over-fetch
+    now = datetime.now(timezone.utc)
+    lease = _lease(worker_id, now)
+    expedited, providers = _scheduler.plan(batch_size)
+
+    def take(candidate_ids, wanted) -> list[dict]:
+        taken = []
+        for document_id in candidate_ids:
+            if len(taken) >= wanted:
+                break
+            row = _claim(document_id, lease, now)
+            if row:
+                skip_ids.add(document_id)
+                taken.append(row)
+        return taken
+
+    claimed = []
+    if expedited:
+        claimed = take(_candidate_ids(now, expedited + WORKER_COUNT, expedited=True, exclude=skip_ids), expedited)
+    wanted = defaultdict(int)
+    for provider_id in providers:
+        wanted[provider_id] += 1
+    by_provider = {
+        provider_id: take(_candidate_ids(now, count + WORKER_COUNT, provider_id=provider_id, exclude=skip_ids), count)
+        for provider_id, count in wanted.items()
+    }
+    # Keep the scheduler's interleaving so providers alternate within the batch too
+    for provider_id in providers:
+        if by_provider[provider_id]:
+            claimed.append(by_provider[provider_id].pop(0))
+    return claimed
+
+
+def renew_claim(document_id, worker_id: str) -> None:
+    now = datetime.now(timezone.utc)
+    (
+        supabase.table("provider_documents")
+        .update({"claim_expires_at": _utc_timestamp(now + timedelta(seconds=CLAIM_LEASE_SECONDS))})
+        .eq("id", document_id)
+        .eq("claimed_by", worker_id)
+        .execute()
+    )
+
 
 def mark_document_active(document_id):
-    supabase.table("provider_documents").update({"is_active": True}).eq("id", document_id).execute()
+    supabase.table("provider_documents").update(
+        {
+            "is_active": True,
+            "claimed_by": None,
+            "claimed_at": None,
+            "claim_expires_at": None,
+            "seed_checkpoint": None,
+            "seed_priority": 0,
+        }
+    ).eq("id", document_id).execute()
 
-def main():
-    # Print for debugging in Cloud Run
-    print("🔎 Checking for pending documents...", flush=True)
-    
-    pending = fetch_next_pending_document()
+
+def requeue_document(document_id, expedite: bool = True) -> None:
+    """
+    Puts a seeded document back to pending with its knowledge cleared, in the
+    expedited lane by default. Its fingerprint and word index go too: they
+    describe the old recording, and a stale fingerprint would let the re-seed
+    (or another upload) clone chunks that no longer exist.
+    """
+    supabase.table("provider_knowledge").delete().eq("document_id", document_id).execute()
+    supabase.table("provider_documents").update(
+        {
+            "is_active": False,
+            "seed_checkpoint": None,
+            "audio_fingerprint": None,
+            "audio_duration": None,
+            "word_index": None,
+            "seed_priority": 1 if expedite else 0,
+            "claimed_by": None,
+            "claimed_at": None,
+            "claim_expires_at": None,
+        }
+    ).eq("id", document_id).execute()
+
+
+def reseed_document(document_id) -> bool:
+    """
+    Single-item re-seed: requeued in the expedited lane and processed right
+    away. If a running worker's expedited lane gets to it first, that is fine too.
+    """
+    worker_id = f"{WORKER_ID}-reseed"
+    requeue_document(document_id)
+    now = datetime.now(timezone.utc)
+    pending = _claim(document_id, _lease(worker_id, now), now)
     if not pending:
-        print("🎉 Nothing pending.", flush=True)
-        return
+        print(f"📬 Document {document_id} was picked up by another worker.", flush=True)
+        return False
+    try:
+        return process_pending_document(pending, worker_id)
+    except DeadlineReached as e:
+        print(f"⏳ [{worker_id}] Document {document_id} paused at its last checkpoint: {e}", flush=True)
+        release_claims([pending], worker_id)
+        return False
+
 
-    while pending:
-        video_url = pending.get("source_url")
-        provider_id = pending.get("provider_id")
-        
-        # Validation
-        if not video_url:
-            print("⚠️ Pending document missing source_url", flush=True)
-            # Mark it active (or delete it) so we don't get stuck in a loop? 
-            # For now, let's just break to avoid infinite error loop
+def release_claims(documents: list[dict], worker_id: str) -> None:
+    """Hands unfinished documents back right away instead of waiting for the lease to expire."""
+    for document in documents:
+        (
+            supabase.table("provider_documents")
+            .update({"claimed_by": None, "claimed_at": None, "claim_expires_at": None})
+            .eq("id", document["id"])
+            .eq("claimed_by", worker_id)
+            .execute()
+        )
+
+
+def _release_after_error(pending: dict, worker_id: str, action: str, error: Exception) -> None:
+    """Hands a document back after a Supabase error, so the worker carries on with its batch."""
+    print(f"⚠️ [{worker_id}] {action} failed for document {pending.get('id')}: {error}", flush=True)
+    try:
+        release_claims([pending], worker_id)
+    except Exception as e:
+        print(f"⚠️ [{worker_id}] Could not release document {pending.get('id')}, its lease will expire: {e}", flush=True)
+
+
+def process_pending_document(pending: dict, worker_id: str) -> bool:
+    video_url = pending.get("source_url")
+    provider_id = pending.get("provider_id")
+
+    # Invalid rows keep their lease, so they are retried only after it expires
+    if not video_url:
+        print(f"⚠️ Pending document {pending.get('id')} missing source_url. Skipping.", flush=True)
+        return False
+
+    if not provider_id:
+        print(f"⚠️ Document {pending.get('id')} missing provider_id. Skipping.", flush=True)
+        return False
+
+    try:
+        renew_claim(pending.get("id"), worker_id)
+    except Exception as e:
+        _release_after_error(pending, worker_id, "Renewing the claim", e)
+        return False
+
+    # Process with the CORRECT provider_id
+    success, doc_id = process_video(
+        video_url,
+        provider_id,
+        manual_title=pending.get("title"),
+        existing_doc=pending
+    )
+
+    if not (success and doc_id):
+        return False
+    try:
+        mark_document_active(doc_id)
+    except Exception as e:
+        _release_after_error(pending, worker_id, "Marking it active", e)
+        return False
+    print(f"✅ [{worker_id}] Marked document {doc_id} as active.", flush=True)
+    return True
+
+
+def _out_of_time(deadline, worker_id: str) -> bool:
+    if deadline.can_start():
+        return False
+    print(
+        f"⏳ [{worker_id}] {max(0.0, deadline.remaining()):.0f}s left but a video takes ~{deadline.estimate():.0f}s; "
+        "leaving the rest for the next run.",
+        flush=True,
+    )
+    return True
+
+
+def run_worker(worker_id: str) -> tuple[int, int]:
+    """
+    Claims and processes batches until no unleased pending documents remain or
+    the run's deadline leaves no time for another video. A video cut off by the
+    deadline keeps its checkpoints and is released for the next run to resume.
+    """
+    deadline = current_deadline()
+    attempted = set()
+    processed = 0
+    while not _out_of_time(deadline, worker_id):
+        batch = claim_pending_documents(worker_id, CLAIM_BATCH_SIZE, attempted)
+        if not batch:
             break
-            
-        if not provider_id:
-            print(f"⚠️ Document {pending.get('id')} missing provider_id. Skipping.", flush=True)
+        for idx, pending in enumerate(batch):
+            if _out_of_time(deadline, worker_id):
+                release_claims(batch[idx:], worker_id)
+                return processed, len(attempted)
+            attempted.add(pending["id"])
+            started = time.monotonic()
+            try:
+                done = process_pending_document(pending, worker_id)
+            except DeadlineReached as e:
+                print(f"⏳ [{worker_id}] Document {pending['id']} paused at its last checkpoint: {e}", flush=True)
+                release_claims(batch[idx:], worker_id)
+                return processed, len(attempted)
+            if done:
+                processed += 1
+                deadline.record(time.monotonic() - started)
+    return processed, len(attempted)
+
+
+_STOP = object()
+
+
+class PipelineStage:
+    """
+    A pool of threads pulling work items from inbox and pushing results to outbox.
+
+    Handlers return the item to hand on, or None to drop it. Busy time is tracked
+    so each stage can report its utilization once the pipeline drains.
+    """
+
+    def __init__(self, name, handler, workers, inbox, outbox=None):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.inbox = inbox
+        self.outbox = outbox
+        self.busy_seconds = 0.0
+        self.completed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        for idx in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{idx}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Signals every worker to exit once the inbox drains, then waits for them."""
+        for _ in self._threads:
+            self.inbox.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        while True:
+            item = self.inbox.get()
+            if item is _STOP:
+                return
+            started = time.monotonic()
+            result = None
+            try:
+                result = self.handler(item)
+            except Exception as e:
+                print(f"❌ [{self.name}] {item.get('source_url')}: {e}", flush=True)
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.busy_seconds += elapsed
+                if result is None:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+            if result is not None and self.outbox is not None:
+                self.outbox.put(result)
+
+    def report(self, wall_seconds):
+        capacity = self.workers * wall_seconds
+        utilization = (self.busy_seconds / capacity * 100) if capacity else 0.0
+        return (
+            f"   {self.name:<10} workers={self.workers} done={self.completed} failed={self.failed} "
+            f"busy={self.busy_seconds:.1f}s utilization={utilization:.0f}%"
+        )
+
+
+def _pipeline_download(item):
+    pending = item["pending"]
+    if not pending.get("source_url") or not pending.get("provider_id"):
+        print(f"⚠️ Pending document {pending.get('id')} missing source_url/provider_id. Skipping.", flush=True)
+        return None
+    if not current_deadline().can_start():
+        # Queued before time ran short; hand it back untouched
+        release_claims([pending], item["worker_id"])
+        return None
+    renew_claim(pending["id"], item["worker_id"])
+    item["started"] = time.monotonic()
+    print(f"\n🚀 Starting processing for: {pending['source_url']} (Provider: {pending['provider_id']})", flush=True)
+    checkpoint = pending.get("seed_checkpoint")
+    if checkpoint:
+        print("   ↩️  Resuming from saved transcript.", flush=True)
+        item["segments"], item["words"], item["checkpointed"] = checkpoint["segments"], None, True
+        item["title"] = pending.get("title") or checkpoint.get("title") or "Untitled video"
+        return item
+    segments, caption_title = fetch_caption_segments(pending["source_url"], want_title=not pending.get("title"))
+    if segments:
+        # Already transcribed; the transcribe stage passes it straight through
+        item["segments"], item["words"] = segments, None
+        item["title"] = pending.get("title") or caption_title or "Untitled video"
+        return item
+    item["scratch"] = ScratchSpace(f"vimeo-{pending['id']}")
+    try:
+        item["audio_path"], detected_title = download_audio(pending["source_url"], item["scratch"])
+        item["fingerprint"] = fingerprint_file(item["audio_path"])
+        item["match"] = find_matching_document(supabase, item["fingerprint"], pending["id"])
+    except Exception:
+        item["scratch"].cleanup()
+        raise
+    item["title"] = pending.get("title") or detected_title
+    if item["match"]:
+        # Nothing to transcribe; the embed stage copies the match's chunks
+        item["scratch"].cleanup()
+        item["segments"], item["words"] = None, None
+    return item
+
+
+def _pipeline_transcribe(item):
+    if "segments" in item:
+        return item
+    try:
+        renew_claim(item["pending"]["id"], item["worker_id"])
+        item["segments"], item["words"] = transcribe_audio(item["audio_path"])
+    finally:
+        item["scratch"].cleanup()
+    return item
+
+
+def _pipeline_embed(item):
+    pending = item["pending"]
+    renew_claim(pending["id"], item["worker_id"])
+    doc_id = resolve_document_id(pending["source_url"], pending["provider_id"], item["title"], pending)
+    if item["segments"] and not item.get("checkpointed"):
+        save_transcript_checkpoint(doc_id, item["title"], item["segments"], item["words"])
+    try:
+        store_knowledge(
+            item["segments"], pending["source_url"], pending["provider_id"], doc_id, item["title"],
+            item.get("fingerprint"), item.get("match"), reseed=True,
+        )
+    except DeadlineReached as e:
+        print(f"⏳ [{item['worker_id']}] Document {doc_id} paused at its last checkpoint: {e}", flush=True)
+        release_claims([pending], item["worker_id"])
+        return None
+    mark_document_active(doc_id)
+    current_deadline().record(time.monotonic() - item["started"])
+    print(f"✅ [{item['worker_id']}] Marked document {doc_id} as active.", flush=True)
+    return item
+
+
+def run_pipeline(worker_id: str) -> tuple[int, int]:
+    """
+    Drains pending documents through download → transcribe → embed/insert stages.
+
+    Stages are connected by bounded queues, so video N+1 downloads while video N
+    is transcribed and video N-1 is embedded; a slow stage applies backpressure
+    upstream instead of letting downloads pile up on disk.
+    """
+    download_q = queue.Queue(maxsize=max(1, DOWNLOAD_WORKERS))
+    transcribe_q = queue.Queue(maxsize=max(1, PIPELINE_QUEUE_SIZE))
+    embed_q = queue.Queue(maxsize=max(1, PIPELINE_QUEUE_SIZE))
+    stages = [
+        PipelineStage("download", _pipeline_download, DOWNLOAD_WORKERS, download_q, transcribe_q),
+        PipelineStage("transcribe", _pipeline_transcribe, TRANSCRIBE_WORKERS, transcribe_q, embed_q),
+        PipelineStage("embed", _pipeline_embed, EMBED_WORKERS, embed_q),
+    ]
+    print(
+        f"🏭 Pipeline mode: download={DOWNLOAD_WORKERS} transcribe={TRANSCRIBE_WORKERS} "
+        f"embed={EMBED_WORKERS} queue={PIPELINE_QUEUE_SIZE}",
+        flush=True,
+    )
+    started = time.monotonic()
+    for stage in stages:
+        stage.start()
+
+    deadline = current_deadline()
+    attempted = set()
+    while not _out_of_time(deadline, worker_id):
+        batch = claim_pending_documents(worker_id, max(1, DOWNLOAD_WORKERS), attempted)
+        if not batch:
             break
+        for pending in batch:
+            attempted.add(pending["id"])
+            download_q.put({"pending": pending, "worker_id": worker_id, "source_url": pending.get("source_url")})
+
+    # Shut stages down in order so each one drains into the next before stopping
+    for stage in stages:
+        stage.stop()
+
+    wall_seconds = time.monotonic() - started
+    print(f"📊 Pipeline drained {len(attempted)} documents in {wall_seconds:.1f}s", flush=True)
+    for stage in stages:
+        print(stage.report(wall_seconds), flush=True)
+    return stages[-1].completed, len(attempted)
 
-        # Process with the CORRECT provider_id
-        success, doc_id = process_video(
-            video_url, 
-            provider_id, 
-            manual_title=pending.get("title"), 
-            existing_doc=pending
+
+PENDING_PAGE_SIZE = 1000
+
+
+def list_pending_documents() -> list[dict]:
+    """Every pending document, claimed or not; read-only, for estimates."""
+    rows = []
+    start = 0
+    while True:
+        response = (
+            supabase.table("provider_documents")
+            .select("id, source_url, provider_id, seed_checkpoint")
+            .eq("is_active", False)
+            .order("id")
+            .range(start, start + PENDING_PAGE_SIZE - 1)
+            .execute()
         )
-        
-        if success and doc_id:
-            mark_document_active(doc_id)
-            print(f"✅ Marked document {doc_id} as active.", flush=True)
-        
-        # Fetch next
-        pending = fetch_next_pending_document()
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < PENDING_PAGE_SIZE:
+            return rows
+        start += PENDING_PAGE_SIZE
+
+
+def _vimeo_duration(video_url):
+    match = VIMEO_VIDEO_ID_RE.search(video_url or "")
+    if not VIMEO_ACCESS_TOKEN or not match:
+        return None
+    try:
+        return _vimeo_api_get(f"/videos/{match.group(1)}", fields="duration").get("duration")
+    except requests.exceptions.RequestException:
+        return None
+
+
+def estimate_video(video_url, estimate: Estimate, checkpoint=None) -> None:
+    """What process_video would cost: the saved transcript or captions if any, else the video's duration."""
+    estimate.add_item()
+    # Claim, renew, checkpoint and activate
+    estimate.add_requests("supabase", 4)
+    if checkpoint:
+        estimate.add_segments(checkpoint["segments"])
+        return
+    segments, _ = fetch_caption_segments(video_url)
+    estimate.add_requests("http", 2)
+    if segments:
+        estimate.add_segments(segments)
+        return
+    duration = _vimeo_duration(video_url) or media_duration(video_url)
+    estimate.add_requests("http")
+    estimate.add_media(duration)
+
+
+def estimate_pending(workers: int | None = None) -> Estimate:
+    """
+    Projects the cost of seeding every pending document from a sample of them
+    (captions, checkpoints and durations are looked up; nothing is claimed).
+    """
+    workers = workers or max(1, WORKER_COUNT)
+    pipeline = PIPELINE_ENABLED or "--pipeline" in sys.argv[1:]
+    stages = {"download": DOWNLOAD_WORKERS, "whisper": TRANSCRIBE_WORKERS, "embedding": EMBED_WORKERS} if pipeline else None
+    estimate = Estimate("Vimeo pending documents", concurrency=workers, stage_concurrency=stages)
+    pending = [row for row in list_pending_documents() if row.get("source_url")]
+    estimate.add_requests("supabase", len(pending) // PENDING_PAGE_SIZE + 1)
+    picked, scale = sample(pending)
+    print(f"🔎 {len(pending)} pending documents; measuring {len(picked)}...", flush=True)
+    measured = Estimate(estimate.label)
+    for row in picked:
+        estimate_video(row["source_url"], measured, row.get("seed_checkpoint"))
+    estimate.merge(measured, scale)
+    return estimate
+
+
+def parse_worker_count(args: list[str]) -> int:
+    if "--workers" in args:
+        idx = args.index("--workers")
+        if idx == len(args) - 1:
+            raise SystemExit("Usage: python seedvimeo.py [--workers <count>] [--pipeline] [--estimate] | --document-id <id>")
+        try:
+            return max(1, int(args[idx + 1]))
+        except ValueError:
+            raise SystemExit("workers must be an integer")
+    return max(1, WORKER_COUNT)
+
+
+def main(workers: int | None = None):
+    # Print for debugging in Cloud Run
+    print("🔎 Checking for pending documents...", flush=True)
+
+    args = sys.argv[1:]
+    if estimate_requested(args):
+        estimate_pending(workers or parse_worker_count(args)).report()
+        return
+    if "--document-id" in args:
+        idx = args.index("--document-id")
+        try:
+            reseed_document(int(args[idx + 1]))
+        except (IndexError, ValueError):
+            raise SystemExit("Usage: python seedvimeo.py --document-id <document_id>")
+        return
+
+    workers = workers or parse_worker_count(args)
+    if PIPELINE_ENABLED or "--pipeline" in sys.argv[1:]:
+        results = [run_pipeline(f"{WORKER_ID}-pipeline")]
+    elif workers == 1:
+        results = [run_worker(f"{WORKER_ID}-w0")]
+    else:
+        print(f"👷 Starting {workers} workers ({WORKER_ID})...", flush=True)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_worker, f"{WORKER_ID}-w{idx}") for idx in range(workers)]
+            results = [future.result() for future in futures]
+
+    processed = sum(done for done, _ in results)
+    attempted = sum(claimed for _, claimed in results)
+    if not attempted:
+        print("🎉 Nothing pending.", flush=True)
+    else:
+        print(f"🎉 Processed {processed}/{attempted} claimed documents.", flush=True)
 
 if __name__ == "__main__":
     main()
@@ -1,3 +1,4 @@
+import math
 import os
 import re
 import sys
@@ -5,8 +6,15 @@ import time
 import requests
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
-from supabase import create_client, Client
-from llama_index.embeddings.openai import OpenAIEmbedding
+
+try:
+    from .clients import LazyClient, embed_model
+    from .estimate import Estimate, estimate_requested, sample
+    from .leases import LEASE_BATCH_SIZE, LeaseClient, default_backend
+except ImportError:
+    from clients import LazyClient, embed_model
+    from estimate import Estimate, estimate_requested, sample
+    from leases import LEASE_BATCH_SIZE, LeaseClient, default_backend
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
@@ -14,8 +22,16 @@ load_dotenv(os.path.join(parent_dir, ".env"))
 
 SUPABASE_URL = os.getenv("SUPABASE_URL") or os.getenv("PLASMO_PUBLIC_SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-embed_model = OpenAIEmbedding(model="text-embedding-3-small")
+
+
+def _create_supabase():
+    from supabase import create_client
+
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+
+# Built on first use, so --help and argument errors cost no client setup
+supabase = LazyClient(_create_supabase)
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; SiteContentSeeder/1.0; +https://example.com)",
@@ -26,6 +42,8 @@ SITEMAP_FETCH_TIMEOUT = int(os.getenv("SITEMAP_FETCH_TIMEOUT", "15"))
 CHUNK_MIN_LENGTH = int(os.getenv("SITE_CHUNK_MIN_LENGTH", "30"))
 CHUNK_MAX_LENGTH = int(os.getenv("SITE_CHUNK_MAX_LENGTH", "150"))
 CHUNK_LIMIT = int(os.getenv("SITE_CHUNK_LIMIT", "50"))
+# sitemap_pages.processed values
+PAGE_PENDING, PAGE_DONE, PAGE_FAILED = "pending", "done", "failed"
 
 
 def fetch_sitemap_urls(sitemap_url: str) -> list[str]:
@@ -108,7 +126,8 @@ def embed_chunks(chunks: list[str]) -> list[list[float]]:
         return []
 
 
-def discover_new_pages(provider_id: int, feed_id: int) -> list[dict]:
+def find_new_page_urls(provider_id: int, feed_id: int) -> list[str]:
+    """Sitemap URLs not yet tracked in sitemap_pages; read-only."""
     page_resp = (
         supabase.table("sitemap_pages")
         .select("id, page_url")
@@ -129,16 +148,43 @@ def discover_new_pages(provider_id: int, feed_id: int) -> list[dict]:
         print(f"⚠️ Feed {feed_id} missing feed_url")
         return []
     sitemap_urls = fetch_sitemap_urls(feed_url)
-    new_urls = [url for url in sitemap_urls if url not in existing_urls]
+    return [url for url in sitemap_urls if url not in existing_urls]
+
+
+def discover_new_pages(provider_id: int, feed_id: int) -> list[dict]:
+    """Stores the feed's new sitemap URLs as pending pages, for any instance to process."""
+    new_urls = find_new_page_urls(provider_id, feed_id)
     if not new_urls:
         return []
-    payload = [{"feed_id": feed_id, "page_url": url, "tracked": True} for url in new_urls]
-    insert_resp = supabase.table("sitemap_pages").insert(payload).select("id, page_url").execute()
-    if insert_resp.error:
-        raise RuntimeError(f"Failed to insert sitemap pages: {insert_resp.error}")
+    payload = [
+        {"feed_id": feed_id, "page_url": url, "tracked": True, "processed": PAGE_PENDING} for url in new_urls
+    ]
+    insert_resp = supabase.table("sitemap_pages").insert(payload).execute()
+    error = getattr(insert_resp, "error", None)
+    if error:
+        raise RuntimeError(f"Failed to insert sitemap pages: {error}")
     return insert_resp.data or []
 
 
+def fetch_pending_pages(feed_id: int) -> list[dict]:
+    """Stored pages not yet processed, including ones that failed on an earlier run."""
+    resp = (
+        supabase.table("sitemap_pages")
+        .select("id, page_url")
+        .eq("feed_id", feed_id)
+        .or_(f"processed.is.null,processed.neq.{PAGE_DONE}")
+        .execute()
+    )
+    return resp.data or []
+
+
+def mark_page(page_id: int, status: str) -> None:
+    try:
+        supabase.table("sitemap_pages").update({"processed": status}).eq("id", page_id).execute()
+    except Exception as exc:
+        print(f"⚠️ Could not mark sitemap page {page_id} {status}: {exc}")
+
+
 def build_metadata(page_url: str, title: str | None) -> dict:
     meta = {"source": page_url}
     if title:
@@ -156,6 +202,8 @@ def persist_site_chunks(
 ) -> None:
     if not chunks or not embeddings:
         return
+    # A re-processed page replaces its chunks rather than adding a second set
+    supabase.table("site_content").delete().eq("sitemap_page_id", sitemap_page_id).execute()
     payload = []
     for idx, chunk in enumerate(chunks):
         payload.append(
@@ -186,35 +234,78 @@ def fetch_page_title(page_url: str) -> str | None:
     return title_tag.text.strip() if title_tag else None
 
 
-def process_page_entry(provider_id: int, page: dict) -> None:
+def process_page_entry(provider_id: int, page: dict) -> bool:
+    """True when the page's chunks were stored."""
     page_url = page.get("page_url")
     page_id = page.get("id")
     if not page_url or not page_id:
-        return
+        return False
     print(f"🌐 Chunking {page_url}")
     blocks = extract_page_text(page_url)
     chunks = chunk_sentences(blocks, CHUNK_MIN_LENGTH, CHUNK_MAX_LENGTH, CHUNK_LIMIT)
     if not chunks:
         print(f"⚠️ No chunkable text for {page_url}")
-        return
+        return False
     embeddings = embed_chunks(chunks)
     if len(embeddings) != len(chunks):
         print(f"⚠️ Embedding count mismatch for {page_url}")
-        return
+        return False
     metadata = build_metadata(page_url, fetch_page_title(page_url))
     persist_site_chunks(provider_id, page_id, page_url, chunks, embeddings, metadata)
     print(f"🧱 Stored {len(chunks)} chunks for {page_url}")
     time.sleep(1)
+    return True
+
+
+def process_leased_page(leases: LeaseClient, provider_id: int, page: dict) -> None:
+    """
+    process_page_entry for a page this instance holds the lease on. The outcome
+    is recorded on the page; a failed page's lease is released, and the next
+    sync picks it up again.
+    """
+    try:
+        stored = process_page_entry(provider_id, page)
+    except Exception as exc:
+        print(f"❌ Failed to process {page.get('page_url')}: {exc}")
+        stored = False
+    mark_page(page["id"], PAGE_DONE if stored else PAGE_FAILED)
+    if not stored:
+        try:
+            leases.release("sitemap_page", [page["id"]])
+        except Exception as exc:
+            print(f"⚠️ Could not release sitemap page {page['id']}: {exc}")
+
+
+def open_leases() -> LeaseClient:
+    """Page and feed leases shared with every other instance running this seeder."""
+    return LeaseClient(default_backend(supabase)).open()
+
+
+def pages_to_process(leases: LeaseClient, provider_id: int, feed_id: int, force: bool) -> list[dict]:
+    """
+    All of the feed's pages with force, else its pending ones. One instance
+    discovers a feed at a time, so new sitemap pages aren't inserted twice;
+    every instance then shares out the stored pending pages through page leases.
+    """
+    if force:
+        return fetch_all_pages_for_feed(feed_id)
+    if leases.claim("sitemap_feed", [feed_id]):
+        discover_new_pages(provider_id, feed_id)
+    else:
+        print(f"🔒 Feed {feed_id} is being discovered by another instance; processing its stored pages")
+    return fetch_pending_pages(feed_id)
 
 
 def process_provider(provider_id: int, feed_ids: list[int], force: bool) -> None:
-    for feed_id in feed_ids:
-        print(f"🔁 Syncing provider {provider_id} feed {feed_id}")
-        new_pages = (
-            discover_new_pages(provider_id, feed_id) if not force else fetch_all_pages_for_feed(feed_id)
-        )
-        for page in new_pages:
-            process_page_entry(provider_id, page)
+    leases = open_leases()
+    try:
+        for feed_id in feed_ids:
+            print(f"🔁 Syncing provider {provider_id} feed {feed_id}")
+            pages = [page for page in pages_to_process(leases, provider_id, feed_id, force) if page.get("id")]
+            for page in leases.claimed("sitemap_page", pages, key=lambda page: page["id"]):
+                process_leased_page(leases, provider_id, page)
+    finally:
+        leases.close()
 
 
 def process_feed(feed_id: int, force: bool) -> None:
@@ -237,8 +328,12 @@ def process_feed(feed_id: int, force: bool) -> None:
         return
     if force:
         print(f"⚠️ Force rebuild enabled; reprocessing {len(pages)} pages")
-    for page in pages:
-        process_page_entry(provider_id, page)
+    leases = open_leases()
+    try:
+        for page in leases.claimed("sitemap_page", [page for page in pages if page.get("id")], key=lambda page: page["id"]):
+            process_leased_page(leases, provider_id, page)
+    finally:
+        leases.close()
 
 
 def process_specific_page(page_id: int, force: bool) -> None:
@@ -270,7 +365,78 @@ def process_specific_page(page_id: int, force: bool) -> None:
         print(f"⚠️ Feed {feed_id} missing provider_id")
         return
     provider_id = feed["provider_id"]
-    process_page_entry(provider_id, page)
+    leases = open_leases()
+    try:
+        if not leases.claim("sitemap_page", [page_id]):
+            print(f"🔒 Sitemap page {page_id} is being processed by another instance")
+            return
+        process_leased_page(leases, provider_id, page)
+    finally:
+        leases.close()
+
+
+def estimate_page(page_url: str, estimate: Estimate) -> None:
+    """process_page_entry's work, without the embeddings and insert."""
+    estimate.add_requests("http")
+    estimate.add_wait(1)
+    chunks = chunk_sentences(extract_page_text(page_url), CHUNK_MIN_LENGTH, CHUNK_MAX_LENGTH, CHUNK_LIMIT)
+    if not chunks:
+        estimate.add_skipped()
+        return
+    # Title fetch; one embedding batch and one insert per page
+    estimate.add_requests("http")
+    estimate.add_chunks(chunks, embed_batch=CHUNK_LIMIT, insert_batch=CHUNK_LIMIT)
+    estimate.add_item()
+
+
+def estimate_pages(page_urls: list[str], estimate: Estimate) -> Estimate:
+    picked, scale = sample(page_urls)
+    print(f"📐 {len(page_urls)} pages to process; measuring {len(picked)}...")
+    measured = Estimate(estimate.label)
+    for page_url in picked:
+        estimate_page(page_url, measured)
+    estimate.merge(measured, scale)
+    # Page leases are claimed a batch at a time
+    estimate.add_requests("supabase", math.ceil(len(page_urls) / LEASE_BATCH_SIZE))
+    estimate.note("Pages are leased, so each extra instance running the same sync divides the wall clock.")
+    return estimate
+
+
+def estimate_provider(provider_id: int, feed_ids: list[int], force: bool) -> Estimate:
+    """process_provider's work: new (or, with force, all) sitemap pages, measured on a sample."""
+    estimate = Estimate(f"sitemap {'rebuild' if force else 'sync'} for provider {provider_id}")
+    page_urls = []
+    for feed_id in feed_ids:
+        if force:
+            urls = [page["page_url"] for page in fetch_all_pages_for_feed(feed_id) if page.get("page_url")]
+        else:
+            urls = [page["page_url"] for page in fetch_pending_pages(feed_id) if page.get("page_url")]
+            urls += find_new_page_urls(provider_id, feed_id)
+            estimate.add_requests("http")
+            estimate.add_requests("supabase")
+        estimate.add_requests("supabase", 2)
+        print(f"🔁 Provider {provider_id} feed {feed_id}: {len(urls)} pages")
+        page_urls.extend(urls)
+    return estimate_pages(page_urls, estimate)
+
+
+def estimate_feed(feed_id: int) -> Estimate:
+    """process_feed's work: every page of the feed, with or without --rebuild."""
+    estimate = Estimate(f"sitemap feed {feed_id}")
+    pages = fetch_all_pages_for_feed(feed_id)
+    estimate.add_requests("supabase", 2)
+    return estimate_pages([page["page_url"] for page in pages if page.get("page_url")], estimate)
+
+
+def estimate_specific_page(page_id: int) -> Estimate:
+    estimate = Estimate(f"sitemap page {page_id}")
+    page = supabase.table("sitemap_pages").select("page_url").eq("id", page_id).maybe_single().execute().data
+    estimate.add_requests("supabase", 3)
+    if not page or not page.get("page_url"):
+        print(f"⚠️ Sitemap page {page_id} not found")
+        return estimate
+    estimate_page(page["page_url"], estimate)
+    return estimate
 
 
 def fetch_all_pages_for_feed(feed_id: int) -> list[dict]:
@@ -286,6 +452,7 @@ def fetch_all_pages_for_feed(feed_id: int) -> list[dict]:
 def main() -> None:
     force = "--rebuild" in sys.argv
     args = [arg for arg in sys.argv[1:] if arg != "--rebuild"]
+    estimate = estimate_requested(args)
     page_id = None
     feed_id = None
     if "--page-id" in args:
@@ -309,22 +476,31 @@ def main() -> None:
     if page_id is not None:
         if args:
             raise SystemExit("Cannot mix --page-id with provider/feed arguments.")
+        if estimate:
+            estimate_specific_page(page_id).report()
+            return
         process_specific_page(page_id, force)
         return
     if feed_id is not None:
         if args:
             raise SystemExit("Cannot mix --feed-id with provider/feed arguments.")
+        if estimate:
+            estimate_feed(feed_id).report()
+            return
         process_feed(feed_id, force)
         return
     if len(args) < 2:
         raise SystemExit(
             "Usage:\n"
-            "  python site-content-seeder-dom.py <provider_id> <feed_id> [<feed_id> ...] [--rebuild]\n"
-            "  python site-content-seeder-dom.py --page-id <page_id> [--rebuild]\n"
-            "  python site-content-seeder-dom.py --feed-id <feed_id> [--rebuild]"
+            "  python site-content-seeder-dom.py <provider_id> <feed_id> [<feed_id> ...] [--rebuild] [--estimate]\n"
+            "  python site-content-seeder-dom.py --page-id <page_id> [--rebuild] [--estimate]\n"
+            "  python site-content-seeder-dom.py --feed-id <feed_id> [--rebuild] [--estimate]"
         )
     provider_id = int(args[0])
     feed_ids = [int(fid) for fid in args[1:]]
+    if estimate:
+        estimate_provider(provider_id, feed_ids, force).report()
+        return
     process_provider(provider_id, feed_ids, force)
 
 
@@ -0,0 +1,125 @@
+import os
+import re
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+CHUNK_MAX_TOKENS = int(os.environ.get("TRANSCRIPT_CHUNK_MAX_TOKENS", "250"))
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("TRANSCRIPT_CHUNK_OVERLAP_TOKENS", "40"))
+# Below this fill ratio we cut mid-sentence rather than emit a tiny chunk
+MIN_SENTENCE_FILL = 0.5
+
+SENTENCE_END_RE = re.compile(r"[.!?…][\"'”’)\]]*$")
+
+# Loaded on first use: building the encoding reads (or downloads) its BPE ranks
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text))
+    # Rough English average when tiktoken is not installed
+    return max(1, len(text) // 4)
+
+
+def segment_fields(seg) -> tuple[str, float, float]:
+    """Reads (text, start, end) from an OpenAI segment object or a plain dict."""
+    if isinstance(seg, dict):
+        return seg["text"], seg["start"], seg["end"]
+    return seg.text, seg.start, seg.end
+
+
+def _ends_sentence(text: str) -> bool:
+    return bool(SENTENCE_END_RE.search(text))
+
+
+def segment_texts(segments) -> list[str]:
+    """The stripped, non-empty segment texts that chunks are built from."""
+    texts = []
+    for seg in segments:
+        text = segment_fields(seg)[0].strip()
+        if text:
+            texts.append(text)
+    return texts
+
+
+def transcript_text(segments) -> str:
+    """The whole transcript as chunks see it; chunk charStart offsets index into this."""
+    return " ".join(segment_texts(segments))
+
+
+def chunk_segments(
+    segments,
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+):
+    """
+    Groups Whisper/caption segments into token-budgeted chunks.
+
+    Chunks end on a sentence boundary when one falls in the back half of the
+    budget, and each chunk after the first repeats up to overlap_tokens of
+    trailing whole segments from the previous one. Yields dicts with content,
+    timestampStart/timestampEnd (int seconds), the inclusive segment range and
+    charStart, the chunk's offset into transcript_text(segments).
+    Runs in time linear in the transcript length.
+    """
+    items = []
+    for seg in segments:
+        text, start, end = segment_fields(seg)
+        text = text.strip()
+        if text:
+            items.append((text, start, end, count_tokens(text), _ends_sentence(text)))
+    if not items:
+        return
+
+    offsets = []
+    position = 0
+    for item in items:
+        offsets.append(position)
+        position += len(item[0]) + 1
+
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    first = 0
+    previous_cut = -1
+    total = len(items)
+    while first < total:
+        # Grow the window up to the token budget (always at least one segment)
+        budget = 0
+        last = first
+        best_cut = None
+        while last < total and (last == first or budget + items[last][3] <= max_tokens):
+            budget += items[last][3]
+            if items[last][4] and last > previous_cut and budget >= max_tokens * MIN_SENTENCE_FILL:
+                best_cut = last
+            last += 1
+        cut = last - 1 if last == total or best_cut is None else best_cut
+
+        window = items[first:cut + 1]
+        yield {
+            "content": " ".join(item[0] for item in window),
+            "timestampStart": int(window[0][1]),
+            "timestampEnd": int(window[-1][2]),
+            "segmentStart": first,
+            "segmentEnd": cut,
+            "charStart": offsets[first],
+        }
+        if cut == total - 1:
+            return
+        previous_cut = cut
+
+        # Carry trailing whole segments into the next chunk as overlap, starting
+        # at a sentence boundary when one fits in the overlap budget
+        next_first = cut + 1
+        sentence_start = None
+        carried = 0
+        while next_first - 1 > first and carried + items[next_first - 1][3] <= overlap_tokens:
+            next_first -= 1
+            carried += items[next_first][3]
+            if next_first <= cut and items[next_first - 1][4]:
+                sentence_start = next_first
+        first = sentence_start or next_first
@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import requests
+
+try:
+    from .seeder_cache import load_json, save_json
+except ImportError:
+    from seeder_cache import load_json, save_json
+
+REDIRECT_CACHE = "redirect-cache.json"
+REDIRECT_TTL_SECONDS = int(os.environ.get("REDIRECT_CACHE_TTL_DAYS", "30")) * 86400
+# Failed lookups are retried soon rather than pinned for a month
+FAILED_TTL_SECONDS = int(os.environ.get("REDIRECT_CACHE_FAILED_TTL_SECONDS", "3600"))
+RESOLVE_WORKERS = int(os.environ.get("URL_RESOLVE_WORKERS", "16"))
+# (connect, read) seconds per hop
+RESOLVE_TIMEOUT = (3.05, 5)
+MAX_REDIRECTS = 10
+USER_AGENT = "Mozilla/5.0 (compatible; DialogueSeeder/1.0)"
+
+# Bump whenever normalize_url changes, so caches keyed by its output are rebuilt
+NORMALIZER_VERSION = 4
+
+# Hosts where only these query parameters name the resource; the rest are dropped
+KEEP_QUERY_PARAMS = {
+    "youtube.com": ("v", "list"),
+    # The video id is the path; t, si and feature are playback position and sharing noise
+    "youtu.be": ("list",),
+    "podcasts.apple.com": ("i",),
+    # Episodes, shows and tracks are identified by path alone
+    "spotify.com": (),
+}
+# Everywhere else the query is kept (?p=123 permalinks, ?id= pages) minus tracking parameters
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid", "twclid",
+    "mc_cid", "mc_eid", "_hsenc", "_hsmi", "mkt_tok", "ref", "ref_src", "ref_url",
+}
+TRACKING_PREFIXES = ("utm_",)
+HOST_TRACKING_PARAMS = {
+    "substack.com": ("r", "showWelcome"),
+}
+
+_lock = threading.Lock()
+_cache = None
+
+
+def _for_host(table: dict, host: str) -> tuple | None:
+    for suffix, params in table.items():
+        if host == suffix or host.endswith("." + suffix):
+            return params
+    return None
+
+
+def _kept_query(host: str, query: str) -> str:
+    pairs = parse_qsl(query, keep_blank_values=True)
+    kept = _for_host(KEEP_QUERY_PARAMS, host)
+    if kept is not None:
+        return urlencode([(key, value) for key, value in pairs if key in kept])
+    dropped = TRACKING_PARAMS.union(_for_host(HOST_TRACKING_PARAMS, host) or ())
+    return urlencode([
+        (key, value) for key, value in pairs
+        if key not in dropped and not key.lower().startswith(TRACKING_PREFIXES)
+    ])
+
+
+def normalize_url(raw_url: str) -> str:
+    """
+    The dedupe key for a URL: https by default, lowercase host, no fragment,
+    no trailing slash, and the query without tracking parameters (on hosts in
+    KEEP_QUERY_PARAMS, only the parameters that name the resource).
+    """
+    if not raw_url:
+        return ""
+    try:
+        parsed = urlparse(raw_url.strip())
+        scheme = (parsed.scheme or "https").lower()
+        host = parsed.netloc.lower()
+        path = parsed.path.rstrip("/")
+        if path == "":
+            path = "/"
+        query = _kept_query(host, parsed.query)
+        return urlunparse(parsed._replace(scheme=scheme, netloc=host, path=path, query=query, fragment=""))
+    except Exception:
+        return raw_url
+
+
+def _load_cache() -> dict:
+    global _cache
+    if _cache is None:
+        _cache = load_json(REDIRECT_CACHE, {})
+    return _cache
+
+
+def _cached(url: str) -> str | None:
+    with _lock:
+        hit = _load_cache().get(url)
+    # Entries written by another normalizer hold finals in the old form
+    if hit and hit["expires"] > time.time() and hit.get("version") == NORMALIZER_VERSION:
+        return hit["final"]
+    return None
+
+
+def _follow(url: str) -> str | None:
+    with requests.Session() as session:
+        session.max_redirects = MAX_REDIRECTS
+        headers = {"User-Agent": USER_AGENT}
+        response = session.head(url, allow_redirects=True, timeout=RESOLVE_TIMEOUT, headers=headers)
+        if response.status_code in (403, 405, 501):
+            # Some hosts refuse HEAD; a streamed GET follows the same chain without the body
+            response = session.get(url, allow_redirects=True, timeout=RESOLVE_TIMEOUT, headers=headers, stream=True)
+            response.close()
+        return response.url
+
+
+def _resolve_uncached(url: str) -> tuple[str, bool]:
+    try:
+        final = _follow(url)
+        return normalize_url(final or url), True
+    except requests.exceptions.RequestException:
+        return normalize_url(url), False
+
+
+def _store(results: dict[str, tuple[str, bool]]) -> None:
+    now = time.time()
+    with _lock:
+        cache = _load_cache()
+        for url, (final, ok) in results.items():
+            cache[url] = {
+                "final": final,
+                "expires": now + (REDIRECT_TTL_SECONDS if ok else FAILED_TTL_SECONDS),
+                "version": NORMALIZER_VERSION,
+            }
+        expired = [url for url, hit in cache.items() if hit["expires"] <= now]
+        for url in expired:
+            del cache[url]
+        save_json(REDIRECT_CACHE, cache)
+
+
+def canonical_url(url: str) -> str:
+    """Follows redirects (cached) and returns the normalized final URL."""
+    return resolve_many([url])[url]
+
+
+def resolve_many(urls, workers: int = RESOLVE_WORKERS) -> dict[str, str]:
+    """
+    Canonical URL for each input, resolving cache misses concurrently with
+    strict per-hop timeouts. The cache is written once per batch.
+    """
+    results: dict[str, str] = {}
+    misses = []
+    for url in dict.fromkeys(urls):
+        hit = _cached(url)
+        if hit is not None:
+            results[url] = hit
+        else:
+            misses.append(url)
+    if misses:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(misses)))) as pool:
+            resolved = dict(zip(misses, pool.map(_resolve_uncached, misses)))
+        _store(resolved)
+        results.update({url: final for url, (final, _) in resolved.items()})
+    return results
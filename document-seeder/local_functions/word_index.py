@@ -0,0 +1,146 @@
+import base64
+import os
+import re
+import zlib
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+
+try:
+    from .transcript_chunker import transcript_text
+except ImportError:
+    from transcript_chunker import transcript_text
+
+WORD_TIMESTAMPS_ENABLED = os.environ.get("SEEDER_WORD_TIMESTAMPS", "").lower() in ("1", "true", "yes")
+# How far ahead of the cursor a Whisper word may be found in the segment text
+ALIGN_WINDOW_CHARS = 200
+INDEX_VERSION = 1
+
+_WORD_CLEAN_RE = re.compile(r"[^\w']+")
+
+
+def whisper_granularities(word_timestamps: bool = WORD_TIMESTAMPS_ENABLED) -> list[str]:
+    return ["segment", "word"] if word_timestamps else ["segment"]
+
+
+def _word_fields(word) -> tuple[str, float]:
+    if isinstance(word, dict):
+        return word["word"], word["start"]
+    return word.word, word.start
+
+
+class WordIndex:
+    """
+    Parallel arrays mapping character offsets in a document's transcript_text()
+    to media time. One compact blob per document, never one row per word.
+    """
+
+    def __init__(self, offsets: array, times_ms: array):
+        self.offsets = offsets
+        self.times_ms = times_ms
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def time_at(self, char_offset: int) -> float | None:
+        """Start time (seconds) of the word containing or preceding char_offset."""
+        if not self.offsets:
+            return None
+        idx = max(0, bisect_right(self.offsets, char_offset) - 1)
+        return self.times_ms[idx] / 1000
+
+    def time_in_chunk(self, chunk_char_start: int, offset_in_chunk: int) -> float | None:
+        """Maps an offset inside a chunk's content (metadata.charStart) to media time."""
+        return self.time_at(chunk_char_start + offset_in_chunk)
+
+    def encode(self) -> dict:
+        return {
+            "v": INDEX_VERSION,
+            "count": len(self),
+            "offsets": _pack_deltas(self.offsets),
+            "times": _pack_deltas(self.times_ms),
+        }
+
+    @classmethod
+    def decode(cls, payload: dict) -> "WordIndex":
+        if not payload or payload.get("v") != INDEX_VERSION:
+            return cls(array("I"), array("I"))
+        return cls(_unpack_deltas(payload["offsets"]), _unpack_deltas(payload["times"]))
+
+
+def _pack_deltas(values: array) -> str:
+    # Deltas are small, so they usually fit 16 bits and compress well
+    deltas = [b - a for a, b in zip([0] + list(values[:-1]), values)] if values else []
+    typecode = "H" if all(0 <= d <= 0xFFFF for d in deltas) else "I"
+    raw = array(typecode, deltas).tobytes()
+    return typecode + base64.b64encode(zlib.compress(raw, 9)).decode("ascii")
+
+
+def _unpack_deltas(packed: str) -> array:
+    deltas = array(packed[0])
+    deltas.frombytes(zlib.decompress(base64.b64decode(packed[1:])))
+    values = array("I")
+    total = 0
+    for delta in deltas:
+        total += delta
+        values.append(total)
+    return values
+
+
+def build_word_index(segments, words) -> WordIndex:
+    """
+    Aligns Whisper word timestamps onto the segment-joined transcript text.
+
+    Words are matched in order against a bounded window after a moving cursor,
+    so alignment is linear and a word Whisper spelled differently in the
+    segment text is simply skipped rather than derailing later matches.
+    """
+    text = transcript_text(segments).lower()
+    offsets = array("I")
+    times_ms = array("I")
+    cursor = 0
+    for word in words or []:
+        raw_word, start = _word_fields(word)
+        token = _WORD_CLEAN_RE.sub("", raw_word.lower())
+        if not token:
+            continue
+        position = text.find(token, cursor, cursor + ALIGN_WINDOW_CHARS + len(token))
+        if position < 0:
+            continue
+        time_ms = int(round(start * 1000))
+        if times_ms and time_ms < times_ms[-1]:
+            time_ms = times_ms[-1]
+        offsets.append(position)
+        times_ms.append(time_ms)
+        cursor = position + len(token)
+    return WordIndex(offsets, times_ms)
+
+
+def save_word_index(supabase, document_id, index: WordIndex) -> None:
+    supabase.table("provider_documents").update({"word_index": index.encode()}).eq("id", document_id).execute()
+
+
+@lru_cache(maxsize=256)
+def _load_cached(supabase, document_id) -> WordIndex:
+    response = (
+        supabase.table("provider_documents")
+        .select("word_index")
+        .eq("id", document_id)
+        .maybe_single()
+        .execute()
+    )
+    data = getattr(response, "data", None) or {}
+    return WordIndex.decode(data.get("word_index"))
+
+
+def load_word_index(supabase, document_id) -> WordIndex:
+    return _load_cached(supabase, document_id)
+
+
+def media_time_for_match(supabase, document_id, chunk_metadata: dict, offset_in_chunk: int) -> float | None:
+    """Deep-link time for a phrase at offset_in_chunk, falling back to the chunk start."""
+    index = load_word_index(supabase, document_id)
+    chunk_start = chunk_metadata.get("charStart")
+    if chunk_start is not None and len(index):
+        return index.time_in_chunk(chunk_start, offset_in_chunk)
+    return chunk_metadata.get("timestampStart")
@@ -0,0 +1,345 @@
+import atexit
+import importlib
+import importlib.util
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+try:
+    from .clients import get_embed_model, get_openai, get_supabase
+    from .deadline import start_run
+    from .job_queue import JOB_TIMEOUT_SECONDS, JobLog, job_log_path, summarize_log
+    from .scratch_space import SCRATCH_ROOT
+except ImportError:
+    from clients import get_embed_model, get_openai, get_supabase
+    from deadline import start_run
+    from job_queue import JOB_TIMEOUT_SECONDS, JobLog, job_log_path, summarize_log
+    from scratch_space import SCRATCH_ROOT
+
+RUNTIME_WORKERS = int(os.environ.get("SEEDER_JOB_WORKERS", "1"))
+# A worker is replaced after this many jobs, so leaks in the seeders or their libraries stay bounded
+MAX_TASKS_PER_CHILD = int(os.environ.get("SEEDER_MAX_TASKS_PER_CHILD", "20"))
+# Job types whose modules (and clients) are loaded as soon as a worker starts
+WARM_JOB_TYPES = [
+    name.strip()
+    for name in os.environ.get("SEEDER_WARM_JOB_TYPES", "vimeo,youtube,site,substack,spotify,pdf").split(",")
+    if name.strip()
+]
+
+# A worker still busy this long after the job timeout (threads the SIGALRM stop can't reach) is killed
+KILL_GRACE_SECONDS = int(os.environ.get("SEEDER_KILL_GRACE_SECONDS", "30"))
+# pdf jobs may only read files from these directories
+UPLOAD_DIRS = [path for path in (os.environ.get("SEEDER_UPLOAD_DIR", "/tmp/seeder-uploads"), SCRATCH_ROOT) if path]
+MAX_JOB_WORKERS = 32
+
+FUNCTIONS_DIR = Path(__file__).resolve().parent
+
+
+class JobTimeout(BaseException):
+    """BaseException so the seeders' broad `except Exception` handlers can't swallow it."""
+
+
+def _run_vimeo(module, params):
+    if params.get("estimate"):
+        module.estimate_pending(params.get("workers")).report()
+    elif params.get("document_id"):
+        # Single-item re-seed through the expedited lane
+        module.reseed_document(int(params["document_id"]))
+    else:
+        module.main(workers=params.get("workers"))
+
+
+def _run_youtube(module, params):
+    provider_id = int(params["provider_id"])
+    if params.get("batch"):
+        if params.get("estimate"):
+            module.estimate_youtube_batch(params["source"], provider_id).report()
+        else:
+            module.seed_youtube_batch(params["source"], provider_id)
+    elif params.get("estimate"):
+        module.estimate_youtube(params["url"], provider_id).report()
+    else:
+        module.seed_youtube(params["url"], provider_id)
+
+
+def _run_spotify(module, params):
+    provider_id = int(params["provider_id"])
+    if params.get("batch"):
+        urls = module._read_batch_urls(params["source"])
+        if params.get("estimate"):
+            module.estimate_spotify_batch(urls, provider_id).report()
+        else:
+            module.seed_spotify_batch(urls, provider_id)
+    elif params.get("estimate"):
+        module.estimate_spotify_universal(params["url"], provider_id).report()
+    else:
+        module.seed_spotify_universal(params["url"], provider_id)
+
+
+def _run_site(module, params):
+    if params.get("estimate"):
+        module.estimate_site(params["url"], int(params["provider_id"])).report()
+    else:
+        module.crawl_site(params["url"], int(params["provider_id"]))
+
+
+def _run_substack(module, params):
+    backfill = bool(params.get("backfill"))
+    if params.get("estimate"):
+        module.estimate_substack(params["url"], int(params["provider_id"]), backfill=backfill).report()
+    else:
+        module.seed_substack(params["url"], int(params["provider_id"]), backfill=backfill)
+
+
+def _run_pdf(module, params):
+    if params.get("estimate"):
+        module.estimate_pdf(params["file_path"], int(params["provider_id"])).report()
+    else:
+        module.seed_pdf(params["file_path"], int(params["provider_id"]))
+
+
+# job type -> (seeder file in local_functions, runner, required params)
+JOB_TYPES = {
+    "vimeo": ("seedvimeo.py", _run_vimeo, ()),
+    "youtube": ("seed-youtube.py", _run_youtube, ("provider_id",)),
+    "spotify": ("seed-spotify-universal.py", _run_spotify, ("provider_id",)),
+    "site": ("seed-site.py", _run_site, ("url", "provider_id")),
+    "substack": ("seed-substack.py", _run_substack, ("url", "provider_id")),
+    "pdf": ("seed-pdf.py", _run_pdf, ("file_path", "provider_id")),
+}
+
+_modules = {}
+
+
+def _positive_int(value) -> int | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    return value if isinstance(value, int) and value > 0 else None
+
+
+def _in_upload_dir(file_path: str) -> bool:
+    resolved = Path(os.path.realpath(file_path))
+    return any(resolved.is_relative_to(os.path.realpath(root)) for root in UPLOAD_DIRS)
+
+
+def validate_job(job_type: str, params: dict) -> str | None:
+    """
+    An error message for a request the runtime can't run, else None. Integer
+    parameters sent as strings ("12") are converted in place.
+    """
+    if job_type not in JOB_TYPES:
+        return f"Unknown job type '{job_type}'. Expected one of: {', '.join(JOB_TYPES)}"
+    _, _, required = JOB_TYPES[job_type]
+    if job_type in ("youtube", "spotify"):
+        required = required + (("source",) if params.get("batch") else ("url",))
+    missing = [name for name in required if params.get(name) in (None, "")]
+    if missing:
+        return f"Missing parameters for {job_type}: {', '.join(missing)}"
+    for name in ("provider_id", "document_id", "workers"):
+        if params.get(name) is None:
+            continue
+        value = _positive_int(params[name])
+        if value is None:
+            return f"{name} must be a positive integer"
+        params[name] = value
+    if params.get("workers", 0) > MAX_JOB_WORKERS:
+        return f"workers must be at most {MAX_JOB_WORKERS}"
+    if job_type == "pdf":
+        if not isinstance(params["file_path"], str) or not _in_upload_dir(params["file_path"]):
+            return f"file_path must be inside {' or '.join(UPLOAD_DIRS)}"
+    return None
+
+
+def load_seeder(job_type: str):
+    """
+    The seeder module for job_type, imported once per worker process. The
+    clients it uses (Supabase, OpenAI, embeddings, scrapers) are process-wide,
+    so every later job the worker runs reuses them. Hyphenated files are loaded by path under
+    the local_functions package so their relative imports resolve.
+    """
+    module = _modules.get(job_type)
+    if module is None:
+        filename = JOB_TYPES[job_type][0]
+        name = f"local_functions.{Path(filename).stem.replace('-', '_')}"
+        if "-" in filename:
+            importlib.import_module("local_functions")
+            spec = importlib.util.spec_from_file_location(name, FUNCTIONS_DIR / filename)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[name] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                del sys.modules[name]
+                raise
+        else:
+            module = importlib.import_module(name)
+        _modules[job_type] = module
+    return module
+
+
+def _warm_worker() -> None:
+    # A seeder that fails to import must not take the worker down; its jobs report the error
+    for job_type in WARM_JOB_TYPES:
+        if job_type not in JOB_TYPES:
+            continue
+        try:
+            load_seeder(job_type)
+        except BaseException as e:
+            print(f"⚠️ Could not preload {job_type} seeder: {e!r}", flush=True)
+    # Seeder clients are lazy; build the shared ones now so the first job doesn't pay for them
+    for build in (get_supabase, get_openai, get_embed_model):
+        try:
+            build()
+        except Exception as e:
+            print(f"⚠️ Could not prebuild client: {e!r}", flush=True)
+
+
+def _on_alarm(signum, frame):
+    raise JobTimeout()
+
+
+def execute_job(job_id: str, job_type: str, params: dict, db_path: str) -> dict:
+    """Runs one job inside a worker process with its output streamed to the job log."""
+    log = JobLog(job_id, db_path)
+    error = None
+    # Seeders that read sys.argv must not see the server's command line
+    sys.argv = [JOB_TYPES[job_type][0]]
+    # Seeders stop starting work before the hard SIGALRM stop below
+    start_run(JOB_TIMEOUT_SECONDS)
+    signal.signal(signal.SIGALRM, _on_alarm)
+    signal.alarm(JOB_TIMEOUT_SECONDS)
+    try:
+        with redirect_stdout(log), redirect_stderr(log):
+            try:
+                _, runner, _ = JOB_TYPES[job_type]
+                runner(load_seeder(job_type), params)
+            except JobTimeout:
+                error = f"timed out after {JOB_TIMEOUT_SECONDS}s"
+                print(f"❌ {error}")
+            except SystemExit as e:
+                if e.code not in (None, 0):
+                    error = f"exited with code {e.code}"
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                traceback.print_exc()
+    finally:
+        signal.alarm(0)
+        log.close()
+    return {"error": error, **log.summary()}
+
+
+def _worker_main(conn, max_tasks: int) -> None:
+    """A warm worker process: runs the jobs sent over conn one at a time, and exits after max_tasks."""
+    _warm_worker()
+    done = 0
+    while not max_tasks or done < max_tasks:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        conn.send(execute_job(*message))
+        done += 1
+
+
+class _Worker:
+    """One warm seeder process and the pipe its jobs are sent over."""
+
+    def __init__(self, context, max_tasks: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, max_tasks), name="seeder-worker")
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def run(self, message: tuple, timeout: float) -> dict | None:
+        """The job's result, or None if it is still running after timeout. EOFError if the process died."""
+        self.conn.send(message)
+        if not self.conn.poll(timeout):
+            return None
+        result = self.conn.recv()
+        self.jobs += 1
+        return result
+
+    def stop(self, kill: bool = False) -> None:
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerRuntime:
+    """
+    A pool of warm seeder processes. Jobs run in-process in a worker that has
+    already imported the seeders, instead of a fresh interpreter per trigger;
+    each worker is recycled after MAX_TASKS_PER_CHILD jobs. The job timeout
+    is enforced here, outside the worker: a job still running KILL_GRACE_SECONDS
+    after it (seeder threads keep a process alive past the in-worker SIGALRM
+    stop) has its worker killed and replaced.
+    """
+
+    def __init__(
+        self,
+        workers: int = RUNTIME_WORKERS,
+        max_tasks_per_child: int = MAX_TASKS_PER_CHILD,
+        timeout_seconds: int = JOB_TIMEOUT_SECONDS,
+    ):
+        self.workers = max(1, workers)
+        self.max_tasks_per_child = max_tasks_per_child
+        self.timeout_seconds = timeout_seconds
+        # Fresh interpreters: forking a process with live client threads isn't safe
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        for _ in range(self.workers):
+            self._idle.put(self._start())
+        atexit.register(self.shutdown)
+
+    def _start(self) -> _Worker:
+        return _Worker(self._context, self.max_tasks_per_child)
+
+    def run(self, job_id: str, job_type: str, params: dict, db_path: str) -> dict:
+        worker = self._idle.get()
+        try:
+            result = worker.run((job_id, job_type, params, db_path), self.timeout_seconds + KILL_GRACE_SECONDS)
+        except (EOFError, OSError) as e:
+            # The worker died hard (OOM, segfault); later jobs get a fresh one
+            worker.stop(kill=True)
+            self._idle.put(self._start())
+            raise RuntimeError(f"worker process exited with code {worker.process.exitcode}") from e
+        if result is None:
+            worker.stop(kill=True)
+            self._idle.put(self._start())
+            error = f"timed out after {self.timeout_seconds}s; worker killed"
+            path = job_log_path(job_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as log:
+                log.write(f"❌ {error}\n")
+            return {"error": error, **summarize_log(job_id)}
+        if self.max_tasks_per_child and worker.jobs >= self.max_tasks_per_child:
+            # The worker exits on its own after its last job
+            worker.process.join()
+            worker.conn.close()
+            worker = self._start()
+        self._idle.put(worker)
+        return result
+
+    def shutdown(self) -> None:
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            worker.stop()
@@ -0,0 +1,83 @@
+import os
+
+try:
+    from .word_index import whisper_granularities
+except ImportError:
+    from word_index import whisper_granularities
+
+
+def download_audio(url, scratch):
+    """
+    Downloads audio using yt-dlp into the job's scratch space.
+    We try to get m4a or mp3 at the lowest quality to keep file size < 25MB (OpenAI limit).
+    """
+    import yt_dlp
+
+    print(f"   ⏳ Downloading audio stream...")
+    
+    # Configuration to get smallest audio file possible
+    ydl_opts = {
+        'format': 'bestaudio/best',
+        'outtmpl': str(scratch.file('audio.%(ext)s')),
+        'postprocessors': [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'mp3',
+            'preferredquality': '32', # Low bitrate to save size
+        }],
+        'quiet': True,
+        'no_warnings': True,
+    }
+
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            # Get metadata first
+            info = ydl.extract_info(url, download=True)
+            title = info.get('title', 'Unknown YouTube Video')
+            video_id = info.get('id', 'unknown')
+            thumbnail = info.get('thumbnail', None)
+            
+            scratch.measure()
+
+            # Find the file we just downloaded
+            mp3_path = scratch.file("audio.mp3")
+            if mp3_path.exists():
+                return str(mp3_path), title, video_id, thumbnail
+            
+            # Fallback if mp3 conversion failed (maybe no ffmpeg)
+            files = sorted(scratch.path.glob("audio.*"))
+            if files:
+                return str(files[0]), title, video_id, thumbnail
+
+    except Exception as e:
+        print(f"   ❌ Download Error: {e}")
+        return None, None, None, None
+
+    return None, None, None, None
+
+
+def transcribe_audio_with_timestamps(openai_client, file_path):
+    """
+    Sends audio file to OpenAI Whisper asking for verbose JSON 
+    to get timestamp segments (and word timestamps when enabled).
+    Returns (segments, words).
+    """
+    file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
+    print(f"   🎙️  Transcribing with Whisper ({file_size_mb:.2f} MB)...")
+
+    if file_size_mb > 25:
+        print("   ❌ Error: File is larger than OpenAI's 25MB limit.")
+        return None, None
+
+    try:
+        with open(file_path, "rb") as audio_file:
+            transcript = openai_client.audio.transcriptions.create(
+                model="whisper-1", 
+                file=audio_file,
+                response_format="verbose_json", # <--- CRITICAL CHANGE FOR TIMESTAMPS
+                timestamp_granularities=whisper_granularities()
+            )
+        # Segments are objects (text, start, end); words only exist when requested
+        return transcript.segments, getattr(transcript, "words", None)
+    except Exception as e:
+        print(f"   ❌ Whisper Error: {e}")
+        return None, None
@@ -1,82 +1,99 @@
+import json
 import os
-import subprocess
-import sys
-# Threading is removed to prevent CPU throttling
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+
+from local_functions.job_queue import JobQueue, QueueFull
+from local_functions.worker_runtime import WorkerRuntime, validate_job
 
 app = Flask(__name__)
 
-def run_seeder_script():
-    """Runs the heavy seeder script BLOCKING (Synchronously)."""
-    print("🚀 Starting sync job...", flush=True)
-    try:
-        # Use the relative path to your script
-        script_path = "scripts/run-seed-vimeo.py"
-        
-        # Run the script using the current python executable
-        # checks=True is not used so we can handle return codes manually
-        result = subprocess.run(
-            [sys.executable, script_path], 
-            capture_output=True,
-            text=True,
-            timeout=3500  # 58 minutes (leave buffer for Cloud Run 60m limit)
-        )
-
-        if result.returncode == 0:
-            print(f"✅ Job Success:\n{result.stdout}", flush=True)
-            return True, result.stdout
-        else:
-            print(f"❌ Job Failed (Return Code {result.returncode}):\n{result.stderr}", flush=True)
-            # Print stdout too, as python scripts often print errors there
-            print(f"Standard Output:\n{result.stdout}", flush=True)
-            return False, result.stderr + "\n" + result.stdout
-
-    except subprocess.TimeoutExpired:
-        msg = "❌ Job timed out after 58 minutes"
-        print(msg, flush=True)
-        return False, msg
-    except Exception as e:
-        msg = f"❌ Script Crash: {e}"
-        print(msg, flush=True)
-        return False, msg
+# Jobs run in warm worker processes in the background, so Cloud Run must keep
+# CPU allocated between requests (deployed with --no-cpu-throttling). Job state
+# is local to the instance, so the service is pinned to exactly one instance.
+jobs = JobQueue(WorkerRuntime())
 
-@app.route("/", methods=["POST"])
-def handle_request():
-    print("✨ VERSION 3.0: SYNC BLOCKING MODE ✨", flush=True)
 
-    # 1. Security Check
+def check_secret():
+    """Returns an error response, or None when the x-site-secret header is valid."""
     secret = request.headers.get("x-site-secret")
     expected_secret = os.environ.get("SITE_SEEDER_SECRET")
-    
+
     if not expected_secret:
         print("Error: SITE_SEEDER_SECRET not set in environment variables", flush=True)
         return jsonify({"error": "Configuration error"}), 500
-        
+
     if secret != expected_secret:
         print(f"⚠️ Unauthorized access attempt with secret: {secret}", flush=True)
         return jsonify({"error": "Unauthorized"}), 403
+    return None
+
+
+@app.route("/", methods=["POST"])
+def handle_request():
+    print("✨ VERSION 5.0: WARM WORKER MODE ✨", flush=True)
+
+    # 1. Security Check
+    denied = check_secret()
+    if denied:
+        return denied
+
+    # 2. Validate: {"type": "youtube", "url": ..., "provider_id": ...}; an empty body is the Vimeo run
+    params = request.get_json(silent=True) or {}
+    job_type = params.pop("type", "vimeo")
+    problem = validate_job(job_type, params)
+    if problem:
+        return jsonify({"status": "error", "message": problem}), 400
+
+    # 3. Enqueue and answer straight away; N8N polls /jobs/<id>
+    try:
+        job_id = jobs.submit(job_type, params)
+    except QueueFull as e:
+        return jsonify({"status": "error", "message": f"Job queue full: {e}"}), 429
+
+    print(f"🚀 Received trigger from N8N. Queued {job_type} job {job_id}.", flush=True)
+    return jsonify({
+        "status": "queued",
+        "job_id": job_id,
+        "type": job_type,
+        "status_url": f"/jobs/{job_id}",
+        "logs_url": f"/jobs/{job_id}/logs",
+    }), 202
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    denied = check_secret()
+    if denied:
+        return denied
+
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    # Only the summary and tail; the full log is streamed from /jobs/<id>/logs
+    return jsonify({**job, "logs_url": f"/jobs/{job_id}/logs"}), 200
+
+
+@app.route("/jobs/<job_id>/logs", methods=["GET"])
+def job_logs(job_id):
+    """Server-sent events: one event per log line, then an "end" event with the final status."""
+    denied = check_secret()
+    if denied:
+        return denied
+    if jobs.get(job_id) is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    def events():
+        for line in jobs.follow_log(job_id):
+            yield f"data: {line}\n\n"
+        job = jobs.get(job_id)
+        yield f"event: end\ndata: {json.dumps({'status': job['status'], 'progress': job['progress']})}\n\n"
 
-    print(f"🚀 Received trigger from N8N. Executing script now (this will wait)...", flush=True)
-
-    # 2. RUN BLOCKING
-    # The request will hang here until the script finishes. 
-    # This keeps the Cloud Run CPU active.
-    success, output = run_seeder_script()
-
-    # 3. Respond to N8N with the actual result
-    if success:
-        return jsonify({
-            "status": "success", 
-            "message": "Job completed successfully",
-            "logs": output
-        }), 200
-    else:
-        return jsonify({
-            "status": "error", 
-            "message": "Job failed",
-            "logs": output
-        }), 500
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
-    app.run(host="0.0.0.0", port=port)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=port)
@@ -0,0 +1,77 @@
+import os
+import random
+import sys
+import time
+
+# --- PATH FIX: Allow importing from the parent folder ---
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(root_dir)
+# --------------------------------------------------------
+
+from local_functions.transcript_chunker import chunk_segments
+
+WORDS = (
+    "founders equity investors shares option pool vesting cliff term sheet valuation "
+    "dilution convertible note seed round board consent agreement legal cap table"
+).split()
+
+
+def synthetic_transcript(hours: float, seed: int = 7) -> list[dict]:
+    """Whisper-like segments: ~4s each, 6-20 words, roughly every third one ends a sentence."""
+    rng = random.Random(seed)
+    segments = []
+    clock = 0.0
+    while clock < hours * 3600:
+        length = rng.uniform(2.0, 6.0)
+        words = rng.choices(WORDS, k=rng.randint(6, 20))
+        text = " ".join(words) + ("." if rng.random() < 0.35 else ",")
+        segments.append({"text": " " + text.capitalize(), "start": clock, "end": clock + length})
+        clock += length
+    return segments
+
+
+def legacy_chunks(segments) -> list[dict]:
+    """The aggregation loop previously copied into each seeder, minus the embed call."""
+    chunks = []
+    current_chunk_text = ""
+    chunk_start_time = 0
+    for i, seg in enumerate(segments):
+        text, start, end = seg["text"], seg["start"], seg["end"]
+        if current_chunk_text == "":
+            chunk_start_time = start
+        current_chunk_text += text + " "
+        if len(current_chunk_text) > 1000 or i == len(segments) - 1:
+            chunks.append({
+                "content": current_chunk_text.strip(),
+                "timestampStart": int(chunk_start_time),
+                "timestampEnd": int(end),
+            })
+            current_chunk_text = ""
+    return chunks
+
+
+def best_of(fn, repeats: int) -> tuple[float, int]:
+    best = float("inf")
+    count = 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        count = len(fn())
+        best = min(best, time.perf_counter() - started)
+    return best, count
+
+
+def main():
+    hours_list = [float(arg) for arg in sys.argv[1:]] or [1, 4, 12]
+    print(f"{'hours':>6} {'segments':>9} {'legacy ms':>10} {'chunks':>7} {'chunker ms':>11} {'chunks':>7}")
+    for hours in hours_list:
+        segments = synthetic_transcript(hours)
+        legacy_s, legacy_n = best_of(lambda: legacy_chunks(segments), 5)
+        new_s, new_n = best_of(lambda: list(chunk_segments(segments)), 5)
+        print(
+            f"{hours:>6g} {len(segments):>9} {legacy_s * 1000:>10.1f} {legacy_n:>7} "
+            f"{new_s * 1000:>11.1f} {new_n:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Cold-start import cost per entry point, measured with `python -X importtime`
+# in a fresh interpreter per run.
+#
+#   python scripts/bench-imports.py            # report
+#   python scripts/bench-imports.py --check    # exit 1 if an entry point is over budget
+#   python scripts/bench-imports.py seed-youtube.py main --runs 5
+#
+# tests/test_import_budget.py runs the same check under pytest when
+# SEEDER_IMPORT_BUDGET_TESTS=1 is set.
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(root_dir, "scripts", "import-budget.json")
+RUNS = 3
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Seeder files are loaded by path under the local_functions package, the way the worker runtime does
+_LOAD_SEEDER = (
+    "import importlib.util, sys\n"
+    "import local_functions\n"
+    "spec = importlib.util.spec_from_file_location('local_functions.{name}', {path!r})\n"
+    "module = importlib.util.module_from_spec(spec)\n"
+    "sys.modules[spec.name] = module\n"
+    "spec.loader.exec_module(module)\n"
+)
+
+
+SEEDERS = (
+    "seedvimeo.py",
+    "seed-youtube.py",
+    "seed-youtube-audio.py",
+    "seed-spotify-universal.py",
+    "seed-substack.py",
+    "seed-site.py",
+    "seed-pdf.py",
+    "seedlegals-videos.py",
+    "channel_discovery.py",
+    "site-content-seeder.py",
+    "site-content-seeder-dom.py",
+)
+
+
+def entry_points() -> dict[str, str]:
+    # main starts the warm worker pool; without the flag its spawned workers don't log import
+    # times into the same stderr, so only main's own imports are counted
+    entries = {"main": "import sys\nsys._xoptions.pop('importtime', None)\nimport main"}
+    for filename in SEEDERS:
+        path = os.path.join(root_dir, "local_functions", filename)
+        entries[filename] = _LOAD_SEEDER.format(name=filename[:-3].replace("-", "_"), path=path)
+    return entries
+
+
+def measure(code: str) -> tuple[float, list[tuple[float, str]]]:
+    """Milliseconds spent importing, and the heaviest top-level imports."""
+    with tempfile.TemporaryDirectory() as scratch:
+        env = {
+            **os.environ,
+            "PYTHONDONTWRITEBYTECODE": "1",
+            # Keep main.py's job table out of the real one
+            "SEEDER_JOB_DB": os.path.join(scratch, "jobs.sqlite3"),
+        }
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=root_dir, env=env, capture_output=True, text=True,
+        )
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.strip().splitlines() if not line.startswith("import time:")]
+        raise RuntimeError((errors or ["unknown error"])[-1])
+    top_level = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        # Nesting is shown as two spaces per level; only top-level imports add up without double counting
+        if match and len(match.group(3)) == 1:
+            top_level.append((int(match.group(2)) / 1000, match.group(4)))
+    top_level.sort(reverse=True)
+    return sum(ms for ms, _ in top_level), top_level[:5]
+
+
+def main():
+    args = sys.argv[1:]
+    check = "--check" in args
+    runs = RUNS
+    if "--runs" in args:
+        runs = max(1, int(args[args.index("--runs") + 1]))
+        del args[args.index("--runs"):args.index("--runs") + 2]
+    selected = [arg for arg in args if not arg.startswith("--")]
+
+    with open(BUDGET_FILE, "r", encoding="utf-8") as handle:
+        budgets = json.load(handle)
+    default_budget = budgets.get("default")
+
+    entries = entry_points()
+    over = []
+    print(f"{'entry point':<32} {'median ms':>10} {'budget':>8}  heaviest imports")
+    for name, code in entries.items():
+        if selected and name not in selected:
+            continue
+        budget = budgets.get(name, default_budget)
+        try:
+            samples = [measure(code) for _ in range(runs)]
+        except RuntimeError as e:
+            print(f"{name:<32} {'error':>10} {budget or '-':>8}  {e}")
+            over.append(name)
+            continue
+        median_ms = statistics.median(ms for ms, _ in samples)
+        heaviest = ", ".join(f"{module} {ms:.0f}" for ms, module in samples[-1][1])
+        flag = " ❌" if budget is not None and median_ms > budget else ""
+        print(f"{name:<32} {median_ms:>10.1f} {budget or '-':>8}  {heaviest}{flag}")
+        if flag:
+            over.append(name)
+
+    if check and over:
+        print(f"\n❌ Over import-time budget or failed to import: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+-- Channel registry read by local_functions/channel_discovery.py.
+-- Each row is one Vimeo channel or YouTube channel scanned for new videos on behalf
+-- of a provider; cursor holds per-channel state (page ETags, last scan time).
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS discovery_channels (
+  id bigserial PRIMARY KEY,
+  provider_id bigint NOT NULL,
+  platform text NOT NULL CHECK (platform IN ('vimeo', 'youtube')),
+  channel_id text NOT NULL,
+  is_active boolean NOT NULL DEFAULT true,
+  requests_per_minute integer,
+  cursor jsonb NOT NULL DEFAULT '{}'::jsonb,
+  created_at timestamptz NOT NULL DEFAULT now(),
+  UNIQUE (platform, channel_id, provider_id)
+);
+
+-- Lets discovery bulk-upsert pending rows with ON CONFLICT DO NOTHING.
+-- Remove duplicate (provider_id, source_url) rows before applying.
+CREATE UNIQUE INDEX IF NOT EXISTS provider_documents_provider_source_url_key
+  ON provider_documents (provider_id, source_url);
+
+INSERT INTO discovery_channels (provider_id, platform, channel_id)
+VALUES (12, 'vimeo', 'seedlegals')
+ON CONFLICT DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,14 @@
+-- Audio fingerprints written by local_functions/audio_fingerprint.py once a document's
+-- knowledge rows are stored. New downloads are matched against rows of similar duration,
+-- and a match reuses that document's chunks and embeddings instead of re-transcribing.
+BEGIN;
+
+ALTER TABLE provider_documents
+  ADD COLUMN IF NOT EXISTS audio_fingerprint text,
+  ADD COLUMN IF NOT EXISTS audio_duration double precision;
+
+CREATE INDEX IF NOT EXISTS provider_documents_audio_duration_idx
+  ON provider_documents (audio_duration)
+  WHERE audio_fingerprint IS NOT NULL;
+
+COMMIT;
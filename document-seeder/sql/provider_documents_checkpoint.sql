@@ -0,0 +1,13 @@
+-- Resume state for local_functions/seedvimeo.py. A run that reaches its deadline leaves the
+-- transcript here (and its stored chunks tagged with metadata->chunkIndex), so the next run
+-- continues from the last inserted chunk instead of downloading and transcribing again.
+-- Cleared when the document is marked active.
+BEGIN;
+
+ALTER TABLE provider_documents
+  ADD COLUMN IF NOT EXISTS seed_checkpoint jsonb;
+
+CREATE INDEX IF NOT EXISTS provider_knowledge_document_chunk_idx
+  ON provider_knowledge (document_id, ((metadata->>'chunkIndex')::int));
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- Lease columns used by local_functions/seedvimeo.py to claim pending documents.
+-- A row is claimable while is_active = false and claim_expires_at is null or in the past;
+-- expired leases (crashed or killed workers) are therefore reclaimed automatically.
+BEGIN;
+
+ALTER TABLE provider_documents
+  ADD COLUMN IF NOT EXISTS claimed_by text,
+  ADD COLUMN IF NOT EXISTS claimed_at timestamptz,
+  ADD COLUMN IF NOT EXISTS claim_expires_at timestamptz;
+
+CREATE INDEX IF NOT EXISTS provider_documents_pending_claim_idx
+  ON provider_documents (id, claim_expires_at)
+  WHERE is_active = false;
+
+COMMIT;
@@ -0,0 +1,5 @@
+-- Per-document word timestamp index written by local_functions/word_index.py.
+-- One compact blob per document: zlib+base64 delta-encoded parallel arrays of
+-- character offsets (into the segment-joined transcript) and start times in ms.
+ALTER TABLE provider_documents
+  ADD COLUMN IF NOT EXISTS word_index jsonb;
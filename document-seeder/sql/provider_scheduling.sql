@@ -0,0 +1,32 @@
+-- Fair scheduling for local_functions/fair_scheduler.py. Pending documents are shared between
+-- providers by weighted round-robin; provider_seeding_policy sets a provider's weight and the
+-- most documents it may have in flight across all workers (null = uncapped). seed_priority > 0
+-- puts a document in the expedited lane (single-item re-seeds), claimed before anything else.
+BEGIN;
+
+ALTER TABLE provider_documents
+  ADD COLUMN IF NOT EXISTS seed_priority smallint NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS provider_seeding_policy (
+  provider_id bigint PRIMARY KEY,
+  weight integer NOT NULL DEFAULT 1 CHECK (weight > 0),
+  max_concurrency integer CHECK (max_concurrency IS NULL OR max_concurrency > 0)
+);
+
+CREATE INDEX IF NOT EXISTS provider_documents_pending_provider_idx
+  ON provider_documents (provider_id, id)
+  WHERE is_active = false;
+
+CREATE OR REPLACE VIEW provider_pending_work AS
+SELECT
+  provider_id,
+  count(*) FILTER (WHERE claim_expires_at IS NULL OR claim_expires_at < now()) AS claimable,
+  count(*) FILTER (WHERE claim_expires_at >= now()) AS in_flight,
+  count(*) FILTER (
+    WHERE seed_priority > 0 AND (claim_expires_at IS NULL OR claim_expires_at < now())
+  ) AS expedited
+FROM provider_documents
+WHERE is_active = false
+GROUP BY provider_id;
+
+COMMIT;
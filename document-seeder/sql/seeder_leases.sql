@@ -0,0 +1,60 @@
+-- Leases for local_functions/leases.py: any seeder instance can claim a unit of work
+-- (a sitemap page, a feed shard, ...) by (resource, lease_key). A lease is held while
+-- expires_at is in the future; the owner's heartbeat pushes it forward, so a crashed or
+-- killed instance simply stops renewing and its leases are taken over once they expire.
+-- The functions are called through PostgREST (supabase.rpc) or directly over psycopg.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS seeder_leases (
+  resource text NOT NULL,
+  lease_key text NOT NULL,
+  owner text NOT NULL,
+  acquired_at timestamptz NOT NULL DEFAULT now(),
+  heartbeat_at timestamptz NOT NULL DEFAULT now(),
+  expires_at timestamptz NOT NULL,
+  PRIMARY KEY (resource, lease_key)
+);
+
+CREATE INDEX IF NOT EXISTS seeder_leases_owner_idx ON seeder_leases (owner);
+
+-- Claims every key that is free, expired or already ours; returns the keys won.
+CREATE OR REPLACE FUNCTION claim_seeder_leases(p_resource text, p_keys text[], p_owner text, p_ttl_seconds integer)
+RETURNS TABLE (lease_key text)
+LANGUAGE sql AS $$
+  INSERT INTO seeder_leases AS l (resource, lease_key, owner, acquired_at, heartbeat_at, expires_at)
+  SELECT p_resource, k, p_owner, now(), now(), now() + make_interval(secs => p_ttl_seconds)
+  FROM unnest(p_keys) AS k
+  ON CONFLICT (resource, lease_key) DO UPDATE
+    SET owner = excluded.owner,
+        acquired_at = CASE WHEN l.owner = excluded.owner THEN l.acquired_at ELSE excluded.acquired_at END,
+        heartbeat_at = excluded.heartbeat_at,
+        expires_at = excluded.expires_at
+    WHERE l.expires_at < now() OR l.owner = excluded.owner
+  RETURNING l.lease_key;
+$$;
+
+-- Extends every live lease held by p_owner; returns how many are still held.
+CREATE OR REPLACE FUNCTION heartbeat_seeder_leases(p_owner text, p_ttl_seconds integer)
+RETURNS integer
+LANGUAGE sql AS $$
+  WITH renewed AS (
+    UPDATE seeder_leases
+    SET heartbeat_at = now(), expires_at = now() + make_interval(secs => p_ttl_seconds)
+    WHERE owner = p_owner AND expires_at >= now()
+    RETURNING 1
+  )
+  SELECT count(*)::integer FROM renewed;
+$$;
+
+CREATE OR REPLACE FUNCTION release_seeder_leases(p_resource text, p_keys text[], p_owner text)
+RETURNS integer
+LANGUAGE sql AS $$
+  WITH released AS (
+    DELETE FROM seeder_leases
+    WHERE resource = p_resource AND lease_key = ANY (p_keys) AND owner = p_owner
+    RETURNING 1
+  )
+  SELECT count(*)::integer FROM released;
+$$;
+
+COMMIT;
@@ -0,0 +1,12 @@
+-- sitemap_pages.processed for local_functions/site-content-seeder*.py: 'pending' until the
+-- page's chunks are stored, then 'done' ('failed' pages are retried by the next sync).
+-- Run before deploying the seeder that reads it: pages seeded before the column was
+-- written already have site_content rows and must not be re-chunked on the first sync.
+BEGIN;
+
+UPDATE sitemap_pages AS p
+SET processed = 'done'
+WHERE p.processed IS DISTINCT FROM 'done'
+  AND EXISTS (SELECT 1 FROM site_content AS c WHERE c.sitemap_page_id = p.id);
+
+COMMIT;
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the seeder modules as the local_functions package, the way main.py does
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+sys.path.insert(0, os.path.join(root_dir, "tests"))
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keeps seeder_cache writes out of local_functions/.cache."""
+    from local_functions import seeder_cache
+
+    monkeypatch.setattr(seeder_cache, "CACHE_DIR", tmp_path / "cache")
+    return tmp_path / "cache"
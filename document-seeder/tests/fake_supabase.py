@@ -0,0 +1,185 @@
+import itertools
+import re
+
+
+class Response:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _get(row: dict, column: str):
+    """Reads "col" or a JSON path like "metadata->chunkIndex"."""
+    value = row
+    for part in column.split("->"):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+_OPERATORS = {
+    "eq": lambda value, arg: value == arg,
+    "neq": lambda value, arg: value != arg,
+    "gt": lambda value, arg: value is not None and value > arg,
+    "gte": lambda value, arg: value is not None and value >= arg,
+    "lt": lambda value, arg: value is not None and value < arg,
+    "lte": lambda value, arg: value is not None and value <= arg,
+    "is": lambda value, arg: value is None if arg == "null" else value is arg,
+    "in": lambda value, arg: value in arg,
+    "imatch": lambda value, arg: value is not None and re.search(arg, value, re.IGNORECASE) is not None,
+}
+
+
+class Query:
+    """The slice of postgrest-py's builder the seeders use, run against in-memory rows."""
+
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.columns = None
+        self.payload = None
+        self.filters = []
+        self.ordering = None
+        self.window = (0, None)
+        self.count = None
+        self.head = False
+        self.single = False
+        self._negate = False
+
+    # --- actions
+    def select(self, *columns, count=None, head=None):
+        self.columns = [column.strip() for spec in columns for column in spec.split(",")]
+        self.count = count
+        self.head = bool(head)
+        return self
+
+    def insert(self, rows):
+        self.action, self.payload = "insert", rows
+        return self
+
+    def update(self, values):
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    # --- filters
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def filter(self, column, operator, value):
+        negate, self._negate = self._negate, False
+        self.filters.append((column, operator, value, negate))
+        return self
+
+    def eq(self, column, value):
+        return self.filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self.filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self.filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self.filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self.filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self.filter(column, "lte", value)
+
+    def is_(self, column, value):
+        return self.filter(column, "is", value)
+
+    def in_(self, column, values):
+        return self.filter(column, "in", list(values))
+
+    def or_(self, filters: str):
+        """PostgREST or=(...) of simple "column.operator.value" terms, e.g. "processed.is.null,processed.neq.done"."""
+        terms = [term.split(".", 2) for term in filters.split(",")]
+        self.filters.append((None, "or", terms, False))
+        return self
+
+    # --- modifiers
+    def order(self, column, desc=False):
+        self.ordering = (column, desc)
+        return self
+
+    def limit(self, size):
+        self.window = (self.window[0], size)
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end - start + 1)
+        return self
+
+    def maybe_single(self):
+        self.single = True
+        return self
+
+    def _matches(self, row) -> bool:
+        return all(
+            (
+                any(_OPERATORS[term_operator](_get(row, term_column), term_value) for term_column, term_operator, term_value in value)
+                if operator == "or"
+                else _OPERATORS[operator](_get(row, column), value)
+            )
+            != negate
+            for column, operator, value, negate in self.filters
+        )
+
+    def _project(self, row) -> dict:
+        if not self.columns or self.columns == ["*"]:
+            return dict(row)
+        projected = {}
+        for column in self.columns:
+            alias, _, path = column.rpartition(":")
+            projected[alias or path.split("->")[-1]] = _get(row, path)
+        return projected
+
+    def execute(self) -> Response:
+        rows = self.db.tables.setdefault(self.table, [])
+        self.db.calls.append(self)
+        if self.action == "insert":
+            inserted = []
+            for row in self.payload if isinstance(self.payload, list) else [self.payload]:
+                row = {"id": next(self.db.ids), **row}
+                rows.append(row)
+                inserted.append(dict(row))
+            return Response(inserted)
+        matched = [row for row in rows if self._matches(row)]
+        if self.action == "update":
+            for row in matched:
+                row.update(self.payload)
+            return Response([dict(row) for row in matched])
+        if self.action == "delete":
+            self.db.tables[self.table] = [row for row in rows if row not in matched]
+            return Response([dict(row) for row in matched])
+        if self.ordering:
+            column, desc = self.ordering
+            matched.sort(key=lambda row: _get(row, column), reverse=desc)
+        total = len(matched)
+        start, size = self.window
+        matched = matched[start:] if size is None else matched[start:start + size]
+        data = [] if self.head else [self._project(row) for row in matched]
+        if self.single:
+            data = data[0] if data else None
+        return Response(data, total if self.count else None)
+
+
+class FakeSupabase:
+    """Tables are lists of dicts; ids are assigned on insert. Every executed query is kept in calls."""
+
+    def __init__(self, **tables):
+        self.tables = {name: [dict(row) for row in rows] for name, rows in tables.items()}
+        self.ids = itertools.count(1 + max((row.get("id", 0) for rows in tables.values() for row in rows), default=0))
+        self.calls = []
+
+    def table(self, name: str) -> Query:
+        return Query(self, name)
@@ -0,0 +1,28 @@
+class MemoryLeaseBackend:
+    """sql/seeder_leases.sql's claim/heartbeat/release rules over a dict, on a clock the test moves."""
+
+    def __init__(self):
+        self.now = 0.0
+        # (resource, key) -> [owner, expires_at]
+        self.leases = {}
+
+    def claim(self, resource: str, keys: list[str], owner: str, ttl_seconds: int) -> list[str]:
+        won = []
+        for key in keys:
+            lease = self.leases.get((resource, key))
+            if lease is None or lease[1] < self.now or lease[0] == owner:
+                self.leases[(resource, key)] = [owner, self.now + ttl_seconds]
+                won.append(key)
+        return won
+
+    def heartbeat(self, owner: str, ttl_seconds: int) -> int:
+        renewed = [lease for lease in self.leases.values() if lease[0] == owner and lease[1] >= self.now]
+        for lease in renewed:
+            lease[1] = self.now + ttl_seconds
+        return len(renewed)
+
+    def release(self, resource: str, keys: list[str], owner: str) -> int:
+        released = [key for key in keys if self.leases.get((resource, key), [None])[0] == owner]
+        for key in released:
+            del self.leases[(resource, key)]
+        return len(released)
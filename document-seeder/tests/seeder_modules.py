@@ -0,0 +1,17 @@
+import importlib.util
+import os
+import sys
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_seeder(filename: str):
+    """A local_functions seeder file, loaded by path under the package the way the worker runtime does."""
+    import local_functions
+
+    name = f"local_functions.{filename[:-3].replace('-', '_')}"
+    spec = importlib.util.spec_from_file_location(name, os.path.join(root_dir, "local_functions", filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
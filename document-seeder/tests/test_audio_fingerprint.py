@@ -0,0 +1,218 @@
+import shutil
+import subprocess
+import wave
+
+from array import array
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from fake_supabase import FakeSupabase
+from local_functions import audio_fingerprint
+from local_functions.audio_fingerprint import (
+    FRAMES_PER_SECOND,
+    MATCH_BIT_ERROR_RATE,
+    AudioFingerprint,
+    clone_document_knowledge,
+    find_matching_document,
+    fingerprint_file,
+)
+from local_functions.word_index import WordIndex
+
+needs_ffmpeg = pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not installed")
+
+RATE = 22050
+
+
+def tones(seed: int, seconds: float) -> "np.ndarray":
+    """Speech-like test audio: three random tones in the voice band, changing every 100ms."""
+    rng = np.random.default_rng(seed)
+    step = int(0.1 * RATE)
+    t = np.arange(step) / RATE
+    blocks = [
+        sum(rng.uniform(0.1, 1) * np.sin(2 * np.pi * freq * t) for freq in rng.uniform(300, 2000, 3))
+        for _ in range(int(seconds * 10))
+    ]
+    return np.concatenate(blocks)
+
+
+def write_wav(path, samples) -> None:
+    pcm = (samples / np.abs(samples).max() * 0.8 * 32767).astype("<i2")
+    with wave.open(str(path), "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(RATE)
+        handle.writeframes(pcm.tobytes())
+
+
+def encode(source, target, *options) -> str:
+    subprocess.run(["ffmpeg", "-v", "error", "-y", "-i", str(source), *options, str(target)], check=True)
+    return str(target)
+
+
+@pytest.fixture(scope="module")
+def recordings(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("audio")
+    talk = tones(1, 90)
+    write_wav(folder / "talk.wav", talk)
+    # The re-upload has its own 7s intro in front of the same talk
+    write_wav(folder / "reupload.wav", np.concatenate([tones(3, 7), talk]))
+    write_wav(folder / "other.wav", tones(2, 90))
+    return {
+        "original": encode(folder / "talk.wav", folder / "original.mp3", "-b:a", "128k"),
+        # The seeders' own download format: mono, 32k
+        "reencoded": encode(folder / "talk.wav", folder / "reencoded.mp3", "-ac", "1", "-b:a", "32k"),
+        "reupload": encode(folder / "reupload.wav", folder / "reupload.m4a", "-b:a", "64k"),
+        "other": encode(folder / "other.wav", folder / "other.mp3", "-b:a", "128k"),
+    }
+
+
+@needs_ffmpeg
+def test_two_encodes_of_the_same_clip_match(recordings):
+    original = fingerprint_file(recordings["original"])
+    reencoded = fingerprint_file(recordings["reencoded"])
+
+    assert original is not None and reencoded is not None
+    assert original.duration == pytest.approx(90, abs=0.5)
+    assert original.best_bit_error_rate(reencoded) < MATCH_BIT_ERROR_RATE
+
+
+@needs_ffmpeg
+def test_reupload_with_a_different_intro_matches(recordings):
+    original = fingerprint_file(recordings["original"])
+    reupload = fingerprint_file(recordings["reupload"])
+
+    assert original.best_bit_error_rate(reupload) < MATCH_BIT_ERROR_RATE
+    assert reupload.best_alignment(original)[1] == pytest.approx(7, abs=0.25)
+
+
+@needs_ffmpeg
+def test_unrelated_audio_does_not_match(recordings):
+    original = fingerprint_file(recordings["original"])
+    other = fingerprint_file(recordings["other"])
+
+    assert original.best_bit_error_rate(other) > MATCH_BIT_ERROR_RATE
+
+
+@needs_ffmpeg
+def test_fingerprint_survives_encode_and_decode(recordings):
+    original = fingerprint_file(recordings["original"])
+    decoded = AudioFingerprint.decode(original.encode(), original.duration)
+
+    assert np.array_equal(decoded.codes, original.codes)
+
+
+def test_fingerprinting_is_skipped_when_disabled(monkeypatch, tmp_path):
+    monkeypatch.setattr(audio_fingerprint, "DEDUPE_ENABLED", False)
+
+    assert fingerprint_file(str(tmp_path / "missing.mp3")) is None
+
+
+def _fingerprint(seed: int, frames: int = 960, duration: float = 120.0) -> AudioFingerprint:
+    rng = np.random.default_rng(seed)
+    return AudioFingerprint(rng.integers(0, 2**32, frames, dtype=np.uint64).astype("<u4"), duration)
+
+
+def _document(id, fingerprint: AudioFingerprint, **fields) -> dict:
+    return {
+        "id": id,
+        "title": f"doc {id}",
+        "is_active": True,
+        "audio_fingerprint": fingerprint.encode(),
+        "audio_duration": fingerprint.duration,
+        **fields,
+    }
+
+
+def test_match_skips_the_document_being_seeded():
+    audio = _fingerprint(1)
+    supabase = FakeSupabase(
+        provider_documents=[_document(1, audio)],
+        provider_knowledge=[{"id": 10, "document_id": 1}],
+    )
+
+    assert find_matching_document(supabase, audio)["id"] == 1
+    assert find_matching_document(supabase, audio, document_id=1) is None
+
+
+def test_match_requires_an_active_document_with_knowledge():
+    audio = _fingerprint(1)
+    supabase = FakeSupabase(
+        provider_documents=[
+            _document(1, audio, is_active=False),  # requeued
+            _document(2, audio),  # half-seeded: no chunks yet
+            _document(3, audio),
+        ],
+        provider_knowledge=[{"id": 10, "document_id": 1}, {"id": 11, "document_id": 3}],
+    )
+
+    assert find_matching_document(supabase, audio)["id"] == 3
+
+
+def test_match_reports_how_far_the_new_audio_is_shifted():
+    original = _fingerprint(1)
+    intro = _fingerprint(2, frames=int(7 * FRAMES_PER_SECOND)).codes
+    reupload = AudioFingerprint(np.concatenate([intro, original.codes])[:960], 127.0)
+    supabase = FakeSupabase(
+        provider_documents=[_document(1, original)],
+        provider_knowledge=[{"id": 10, "document_id": 1}],
+    )
+
+    assert find_matching_document(supabase, reupload)["time_shift"] == 7.0
+    assert find_matching_document(supabase, original)["time_shift"] == 0.0
+
+
+def test_match_ignores_unrelated_audio():
+    supabase = FakeSupabase(
+        provider_documents=[_document(1, _fingerprint(2))],
+        provider_knowledge=[{"id": 10, "document_id": 1}],
+    )
+
+    assert find_matching_document(supabase, _fingerprint(1)) is None
+
+
+def test_clone_copies_rows_and_word_index():
+    supabase = FakeSupabase(
+        provider_documents=[{"id": 1, "word_index": {"w": [1]}}, {"id": 2}],
+        provider_knowledge=[
+            {"id": 10, "document_id": 1, "content": "a", "embedding": [0.1], "metadata": {"chunkIndex": 0}},
+            {"id": 11, "document_id": 1, "content": "b", "embedding": [0.2], "metadata": {"chunkIndex": 1}},
+        ],
+    )
+
+    assert clone_document_knowledge(supabase, 1, 2, 7, "https://example.com/v") == 2
+
+    copies = [row for row in supabase.tables["provider_knowledge"] if row["document_id"] == 2]
+    assert [row["content"] for row in copies] == ["a", "b"]
+    assert copies[0]["metadata"] == {"chunkIndex": 0, "source": "https://example.com/v"}
+    assert supabase.tables["provider_documents"][1]["word_index"] == {"w": [1]}
+
+
+def test_clone_of_a_document_without_chunks_fails():
+    supabase = FakeSupabase(provider_documents=[{"id": 1}, {"id": 2}], provider_knowledge=[])
+
+    with pytest.raises(ValueError):
+        clone_document_knowledge(supabase, 1, 2, 7, "https://example.com/v")
+
+
+def test_clone_shifts_timestamps_and_word_times():
+    index = WordIndex(array("I", [0, 6, 12]), array("I", [1000, 2500, 40000]))
+    supabase = FakeSupabase(
+        provider_documents=[{"id": 1, "word_index": index.encode()}, {"id": 2}],
+        provider_knowledge=[
+            {"id": 10, "document_id": 1, "content": "a", "embedding": [0.1],
+             "metadata": {"timestampStart": 1, "timestampEnd": 30}},
+            {"id": 11, "document_id": 1, "content": "b", "embedding": [0.2],
+             "metadata": {"timestampStart": 30, "timestampEnd": 60}},
+        ],
+    )
+
+    clone_document_knowledge(supabase, 1, 2, 7, "https://example.com/v", time_shift=-2.0)
+
+    copies = [row["metadata"] for row in supabase.tables["provider_knowledge"] if row["document_id"] == 2]
+    # The re-upload cut 2s of intro, so nothing can start before 0
+    assert [(m["timestampStart"], m["timestampEnd"]) for m in copies] == [(0, 28), (28, 58)]
+    shifted = WordIndex.decode(supabase.tables["provider_documents"][1]["word_index"])
+    assert list(shifted.offsets) == [0, 6, 12]
+    assert list(shifted.times_ms) == [0, 500, 38000]
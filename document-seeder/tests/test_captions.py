@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from local_functions.captions import parse_srt, parse_timestamp, parse_transcript, parse_webvtt
+
+VTT = """WEBVTT
+Kind: captions
+
+NOTE produced by the uploader
+
+1
+00:00:00.500 --> 00:00:02.000 align:start
+<c.colorE5E5E5>Hello</c> &amp; welcome
+
+00:00:02.000 --> 00:00:03.250
+Hello &amp; welcome
+
+00:00:03.250 --> 00:00:05.000
+to the <b>show</b>,
+everyone.
+"""
+
+SRT = "1\r\n00:00:01,000 --> 00:00:02,500\r\nFirst line\r\n\r\n2\r\n01:00:02,5 --> 01:00:04,000\r\nSecond\r\n"
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [("00:01.500", 1.5), ("01:02:03.500", 3723.5), ("01:02:03,5", 3723.5), ("nonsense", None)],
+)
+def test_timestamps(value, seconds):
+    assert parse_timestamp(value) == seconds
+
+
+def test_webvtt_cues_are_cleaned_and_repeats_merged():
+    assert parse_webvtt(VTT) == [
+        {"text": "Hello & welcome", "start": 0.5, "end": 3.25},
+        {"text": "to the show, everyone.", "start": 3.25, "end": 5.0},
+    ]
+
+
+def test_srt_cues():
+    assert parse_srt(SRT) == [
+        {"text": "First line", "start": 1.0, "end": 2.5},
+        {"text": "Second", "start": 3602.5, "end": 3604.0},
+    ]
+
+
+def test_json_transcripts_skip_untimed_and_empty_segments():
+    payload = {
+        "segments": [
+            {"startTime": 0, "endTime": 1.5, "body": " Hi "},
+            {"startTime": 1.5, "body": "No end"},
+            {"endTime": 3, "body": "No start"},
+            {"startTime": 3, "endTime": 4, "body": ""},
+        ]
+    }
+
+    assert parse_transcript(json.dumps(payload), "application/json; charset=utf-8") == [
+        {"text": "Hi", "start": 0.0, "end": 1.5},
+        {"text": "No end", "start": 1.5, "end": 1.5},
+    ]
+
+
+def test_transcript_type_picks_the_parser():
+    assert parse_transcript(VTT, "text/vtt")[0]["text"] == "Hello & welcome"
+    assert parse_transcript(SRT, "application/x-subrip")[0]["text"] == "First line"
+    assert parse_transcript("plain words", "text/plain") == []
@@ -0,0 +1,48 @@
+import time
+
+import pytest
+
+from local_functions import deadline
+from local_functions.deadline import ESTIMATE_SMOOTHING, Deadline, DeadlineReached, start_run
+
+
+@pytest.fixture(autouse=True)
+def no_margin(monkeypatch):
+    monkeypatch.setattr(deadline, "SAFETY_MARGIN_SECONDS", 0)
+
+
+def test_unbounded_deadline_never_stops_work():
+    unbounded = Deadline()
+
+    assert unbounded.remaining() == float("inf")
+    assert unbounded.can_start(10**9)
+    unbounded.check()
+
+
+def test_units_start_only_while_the_estimate_fits():
+    run = Deadline(time.time() + 100, unit_estimate=60)
+
+    assert run.can_start()
+    assert not run.can_start(estimate=200)
+    run.record(300)
+    assert run.estimate() == pytest.approx(ESTIMATE_SMOOTHING * 300 + (1 - ESTIMATE_SMOOTHING) * 60)
+    assert not run.can_start()
+
+
+def test_check_raises_once_the_margin_is_reached(monkeypatch):
+    monkeypatch.setattr(deadline, "SAFETY_MARGIN_SECONDS", 30)
+    run = Deadline(time.time() + 20)
+
+    assert run.expired()
+    with pytest.raises(DeadlineReached):
+        run.check()
+
+
+def test_start_run_installs_a_fresh_deadline(monkeypatch):
+    monkeypatch.setattr(deadline, "_current", Deadline(time.time() - 1))
+
+    run = start_run(3500)
+
+    assert deadline.current() is run
+    assert run.remaining() == pytest.approx(3500, abs=5)
+    assert start_run(None).remaining() == float("inf")
@@ -0,0 +1,80 @@
+import re
+
+from fake_supabase import FakeSupabase
+from local_functions import discovery_index
+from local_functions.discovery_index import BloomFilter, DiscoveryIndex, spellings_pattern
+from local_functions.url_canonicalizer import normalize_url
+
+
+def documents(*urls, provider_id=7, first_id=1) -> list[dict]:
+    return [{"id": first_id + n, "provider_id": provider_id, "source_url": url} for n, url in enumerate(urls)]
+
+
+def test_later_loads_fetch_only_new_rows():
+    supabase = FakeSupabase(provider_documents=documents("https://a.example/1/", "https://a.example/2"))
+    DiscoveryIndex(supabase, 7, normalize_url).load()
+    supabase.tables["provider_documents"] += documents("https://a.example/3", first_id=3)
+    supabase.calls.clear()
+
+    index = DiscoveryIndex(supabase, 7, normalize_url).load()
+
+    assert index.urls == {"https://a.example/1", "https://a.example/2", "https://a.example/3"}
+    fetches = [call for call in supabase.calls if not call.head]
+    assert [value for column, op, value, _ in fetches[0].filters if column == "id"] == [2]
+
+
+def test_deleted_rows_force_a_full_reload():
+    supabase = FakeSupabase(provider_documents=documents("https://a.example/1", "https://a.example/2"))
+    DiscoveryIndex(supabase, 7, normalize_url).load()
+    supabase.tables["provider_documents"].pop(0)
+
+    index = DiscoveryIndex(supabase, 7, normalize_url).load()
+
+    assert index.urls == {"https://a.example/2"}
+
+
+def test_a_cache_from_another_normalizer_is_rebuilt():
+    supabase = FakeSupabase(provider_documents=documents("https://a.example/1?utm_source=x"))
+    DiscoveryIndex(supabase, 7, lambda url: url, normalizer_version=1).load()
+
+    index = DiscoveryIndex(supabase, 7, normalize_url, normalizer_version=2).load()
+
+    assert index.urls == {"https://a.example/1"}
+
+
+def test_spellings_pattern_matches_raw_forms_of_a_normalized_url():
+    pattern = re.compile(spellings_pattern(["https://blog.example.com/post?p=12"]), re.IGNORECASE)
+
+    for raw in (
+        "https://blog.example.com/post?p=12",
+        "HTTP://Blog.Example.com/post/?utm_source=x&p=12",
+        "https://blog.example.com/post?p=12#comments",
+    ):
+        assert pattern.search(raw), raw
+    for raw in ("https://blog.example.com/post?p=123", "https://blog.example.com/post/2?p=12", "https://blog.example.com/post"):
+        assert not pattern.search(raw), raw
+
+
+def test_bloom_positives_are_confirmed_against_the_database(monkeypatch):
+    monkeypatch.setattr(discovery_index, "BLOOM_THRESHOLD", 2)
+    supabase = FakeSupabase(
+        provider_documents=documents("https://a.example/1", "https://a.example/2/", "https://A.example/3/?utm_source=x")
+    )
+    index = DiscoveryIndex(supabase, 7, normalize_url).load()
+    assert index.bloom is not None
+
+    index.confirm_many(["https://a.example/3", "https://a.example/4"])
+
+    assert "https://a.example/3" in index
+    assert "https://a.example/2" in index
+    assert "https://a.example/4" not in index
+
+
+def test_bloom_filter_round_trips():
+    bloom = BloomFilter(100)
+    bloom.add("https://a.example/1")
+
+    restored = BloomFilter.from_dict(bloom.to_dict())
+
+    assert "https://a.example/1" in restored
+    assert "https://a.example/2" not in restored
@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from local_functions import estimate as estimate_module
+from local_functions import transcript_chunker
+from local_functions.estimate import Estimate, estimate_requested, sample
+from local_functions.transcript_chunker import chunk_segments
+
+
+@pytest.fixture(autouse=True)
+def char_tokenizer(monkeypatch):
+    # ~4 chars/token, so token counts are exact and no BPE file is fetched
+    monkeypatch.setattr(transcript_chunker, "tiktoken", None)
+
+
+def segments(count: int) -> list[dict]:
+    """Ten-token segments with no sentence ends, so chunks are cut on the token budget alone."""
+    return [{"text": f"{'x' * 39}{n % 10}", "start": n, "end": n + 1} for n in range(count)]
+
+
+@pytest.mark.parametrize("count", [1, 24, 25, 26, 46, 47, 100, 333])
+def test_add_tokens_projects_the_chunker_s_chunk_count(count):
+    chunks = list(chunk_segments(segments(count), max_tokens=250, overlap_tokens=40))
+    projected = Estimate("projected")
+
+    projected.add_tokens(count * 10, chunk_tokens=250, overlap_tokens=40)
+
+    assert projected.chunks == len(chunks)
+    measured = sum(transcript_chunker.count_tokens(chunk["content"]) for chunk in chunks)
+    assert projected.tokens == pytest.approx(measured, rel=0.05)
+
+
+def test_add_segments_counts_the_chunks_exactly():
+    measured = Estimate("measured")
+
+    measured.add_segments(segments(100))
+
+    assert measured.chunks == len(list(chunk_segments(segments(100))))
+    assert measured.requests["embedding"] == 1
+
+
+def test_add_tokens_ignores_empty_text():
+    empty = Estimate("empty")
+
+    empty.add_tokens(0)
+    empty.add_text("")
+
+    assert empty.chunks == 0 and not empty.requests
+
+
+def test_sample_scales_to_the_population(monkeypatch):
+    monkeypatch.setattr(random, "sample", lambda items, size: items[:size])
+
+    assert sample(range(100), 10) == (list(range(10)), 10.0)
+    assert sample(range(5), 10) == (list(range(5)), 1.0)
+    # 0 measures everything
+    assert sample(range(100), 0) == (list(range(100)), 1.0)
+
+
+def test_merge_scales_a_sample_up():
+    measured = Estimate("sample")
+    measured.add_item(3)
+    measured.add_skipped()
+    measured.add_tokens(1000)
+    measured.add_media(600)
+    measured.add_wait(2)
+    total = Estimate("total")
+    total.add_item()
+
+    total.merge(measured, scale=2.5)
+
+    assert total.items == 1 + round(3 * 2.5)
+    assert total.skipped == round(2.5)
+    assert total.chunks == round(measured.chunks * 2.5)
+    assert total.tokens == round(measured.tokens * 2.5)
+    assert total.whisper_minutes == pytest.approx(25)
+    assert total.requests["whisper"] == pytest.approx(2.5)
+    assert total.wait_seconds == pytest.approx(5)
+    assert any("sample of 4" in note for note in total.notes)
+
+
+def test_merge_without_scaling_adds_no_note():
+    measured = Estimate("all")
+    measured.add_item()
+    total = Estimate("total")
+
+    total.merge(measured)
+
+    assert total.items == 1 and total.notes == []
+
+
+def test_estimate_flag_is_stripped_from_the_arguments():
+    args = ["12", "--estimate", "https://example.com"]
+
+    assert estimate_requested(args) is True
+    assert args == ["12", "https://example.com"]
+    assert estimate_requested(args) is False
+    assert args == ["12", "https://example.com"]
+
+
+def test_stage_seconds_divide_by_each_stage_s_concurrency(monkeypatch):
+    monkeypatch.setitem(estimate_module.UNIT_SECONDS, "whisper_minute", 4.0)
+    run = Estimate("run", concurrency=4, stage_concurrency={"whisper": 2})
+
+    run.add_media(600)
+
+    assert run.stage_seconds()["whisper"] == pytest.approx(10 * 4.0 / 2)
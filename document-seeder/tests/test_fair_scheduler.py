@@ -0,0 +1,65 @@
+from fake_supabase import FakeSupabase
+from local_functions import fair_scheduler
+from local_functions.fair_scheduler import FairScheduler, SmoothWeightedRoundRobin
+
+
+def test_weighted_round_robin_interleaves_by_weight():
+    rotation = SmoothWeightedRoundRobin()
+
+    picks = [rotation.pick({"a": 3, "b": 1}) for _ in range(8)]
+
+    assert picks == ["a", "a", "b", "a"] * 2
+
+
+def test_drained_candidates_lose_their_credit():
+    rotation = SmoothWeightedRoundRobin()
+    rotation.pick({"a": 1, "b": 1})
+
+    assert rotation.pick({"a": 1}) == "a"
+    assert set(rotation.scores) == {"a"}
+    assert rotation.pick({}) is None
+
+
+def scheduler(policies=()) -> FairScheduler:
+    return FairScheduler(FakeSupabase(provider_seeding_policy=list(policies)))
+
+
+def work(provider_id, claimable, in_flight=0, expedited=0) -> dict:
+    return {"provider_id": provider_id, "claimable": claimable, "in_flight": in_flight, "expedited": expedited}
+
+
+def test_expedited_documents_take_slots_first():
+    expedited, providers = scheduler().plan(4, [work(1, 5, expedited=1), work(2, 5, expedited=1)])
+
+    assert expedited == 2
+    assert sorted(providers) == [1, 2]
+
+
+def test_slots_are_shared_by_weight():
+    policies = [{"provider_id": 1, "weight": 3, "max_concurrency": None}]
+
+    _, providers = scheduler(policies).plan(8, [work(1, 10), work(2, 10)])
+
+    assert (providers.count(1), providers.count(2)) == (6, 2)
+
+
+def test_a_provider_at_its_cap_gets_no_more_slots():
+    policies = [{"provider_id": 1, "weight": 5, "max_concurrency": 2}]
+
+    _, providers = scheduler(policies).plan(4, [work(1, 10, in_flight=1), work(2, 10)])
+
+    assert sorted(providers) == [1, 2, 2, 2]
+
+
+def test_a_provider_runs_out_of_claimable_work():
+    _, providers = scheduler().plan(5, [work(1, 2), work(2, 0)])
+
+    assert providers == [1, 1]
+
+
+def test_env_overrides_apply_without_a_policy_row(monkeypatch):
+    monkeypatch.setattr(fair_scheduler, "POLICY_OVERRIDES", {"2": {"max_concurrency": 0}})
+
+    _, providers = scheduler().plan(3, [work(1, 5), work(2, 5)])
+
+    assert providers == [1, 1, 1]
@@ -0,0 +1,31 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+# Wall-clock budgets flake on loaded CI machines, so these only run when asked for;
+# scripts/bench-imports.py --check is the gate that enforces them
+pytestmark = pytest.mark.skipif(
+    os.environ.get("SEEDER_IMPORT_BUDGET_TESTS", "").lower() not in ("1", "true", "yes"),
+    reason="set SEEDER_IMPORT_BUDGET_TESTS=1 to check import budgets",
+)
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+spec = importlib.util.spec_from_file_location("bench_imports", os.path.join(root_dir, "scripts", "bench-imports.py"))
+bench_imports = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bench_imports)
+
+with open(bench_imports.BUDGET_FILE, "r", encoding="utf-8") as handle:
+    BUDGETS = json.load(handle)
+
+ENTRY_POINTS = bench_imports.entry_points()
+
+
+@pytest.mark.parametrize("name", ENTRY_POINTS)
+def test_import_time_is_within_budget(name):
+    budget = BUDGETS.get(name, BUDGETS["default"])
+    # Best of two fresh interpreters, so one slow start on a busy machine doesn't fail the run
+    elapsed, heaviest = min(bench_imports.measure(ENTRY_POINTS[name]) for _ in range(2))
+
+    assert elapsed <= budget, f"{name} imports in {elapsed:.0f}ms (budget {budget}ms); heaviest: {heaviest}"
@@ -0,0 +1,97 @@
+import os
+import time
+import uuid
+
+import pytest
+
+from local_functions.leases import LEASE_DSN, LeaseClient, PostgresLeaseBackend
+from memory_leases import MemoryLeaseBackend
+
+TTL_SECONDS = 1
+
+
+@pytest.fixture(params=["memory", "postgres"])
+def backend(request):
+    if request.param == "memory":
+        return MemoryLeaseBackend()
+    if not LEASE_DSN:
+        pytest.skip("SEEDER_LEASE_DSN not set (a Postgres with sql/seeder_leases.sql applied)")
+    return PostgresLeaseBackend(LEASE_DSN)
+
+
+@pytest.fixture
+def resource():
+    # Unique per test, so runs against a shared database don't see each other's leases
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def let_leases_expire(backend) -> None:
+    if isinstance(backend, MemoryLeaseBackend):
+        backend.now += TTL_SECONDS + 0.5
+    else:
+        time.sleep(TTL_SECONDS + 0.5)
+
+
+def client(backend, owner: str) -> LeaseClient:
+    return LeaseClient(backend, owner=owner, ttl_seconds=TTL_SECONDS)
+
+
+def test_a_claimed_key_is_not_won_by_another_owner(backend, resource):
+    first, second = client(backend, "first"), client(backend, "second")
+
+    assert first.claim(resource, ["a", "b"]) == ["a", "b"]
+    assert second.claim(resource, ["b", "c"]) == ["c"]
+    # Reclaiming our own lease renews it
+    assert sorted(first.claim(resource, ["a", 1])) == ["1", "a"]
+
+
+def test_an_expired_lease_is_taken_over(backend, resource):
+    dead, survivor = client(backend, "dead"), client(backend, "survivor")
+    dead.claim(resource, ["a"])
+
+    assert survivor.claim(resource, ["a"]) == []
+    let_leases_expire(backend)
+    assert survivor.claim(resource, ["a"]) == ["a"]
+    assert dead.claim(resource, ["a"]) == []
+
+
+def test_heartbeat_keeps_leases_from_expiring(backend, resource):
+    holder, other = client(backend, "holder"), client(backend, "other")
+    holder.claim(resource, ["a"])
+
+    if isinstance(backend, MemoryLeaseBackend):
+        backend.now += TTL_SECONDS * 0.75
+        assert backend.heartbeat("holder", TTL_SECONDS) == 1
+        backend.now += TTL_SECONDS * 0.75
+    else:
+        time.sleep(TTL_SECONDS * 0.75)
+        assert backend.heartbeat("holder", TTL_SECONDS) >= 1
+        time.sleep(TTL_SECONDS * 0.75)
+    assert other.claim(resource, ["a"]) == []
+
+
+def test_release_frees_only_our_own_leases(backend, resource):
+    holder, other = client(backend, "holder"), client(backend, "other")
+    holder.claim(resource, ["a", "b"])
+
+    other.release(resource, ["a"])
+    assert other.claim(resource, ["a"]) == []
+    holder.release(resource, ["a"])
+    assert other.claim(resource, ["a"]) == ["a"]
+    assert holder.held[resource] == {"b"}
+
+
+def test_close_releases_everything_held(backend, resource):
+    with client(backend, "holder") as holder:
+        holder.claim(resource, ["a", "b"])
+    assert client(backend, "other").claim(resource, ["a", "b"]) == ["a", "b"]
+
+
+def test_claimed_yields_each_item_to_one_instance(backend, resource):
+    items = [{"id": n} for n in range(25)]
+    first, second = client(backend, "first"), client(backend, "second")
+
+    taken = [item["id"] for item in first.claimed(resource, items[:15], key=lambda item: item["id"], batch_size=4)]
+    taken += [item["id"] for item in second.claimed(resource, items, key=lambda item: item["id"], batch_size=4)]
+
+    assert sorted(taken) == list(range(25))
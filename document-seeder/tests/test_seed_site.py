@@ -0,0 +1,42 @@
+import pytest
+
+from fake_supabase import FakeSupabase
+from seeder_modules import load_seeder
+
+SITE = "https://example.com"
+TEXT = "A page about the product with enough text to be indexed. " * 5
+
+
+class Embeddings:
+    def get_text_embedding(self, text):
+        return [0.1]
+
+
+@pytest.fixture
+def site(monkeypatch):
+    module = load_seeder("seed-site.py")
+    module.pages = {
+        f"{SITE}/": f'<title>Home</title><a href="{SITE}/docs">Docs</a>',
+        f"{SITE}/docs": f'<title>Docs</title><a href="{SITE}/docs/setup">Setup</a>',
+    }
+    monkeypatch.setattr(module, "supabase", FakeSupabase(provider_documents=[], provider_knowledge=[]))
+    monkeypatch.setattr(module, "embed_model", Embeddings())
+    monkeypatch.setattr(module, "fetch_page", lambda url: (module.pages[url], TEXT) if url in module.pages else (None, None))
+    monkeypatch.setattr(module.time, "sleep", lambda seconds: None)
+    return module
+
+
+def stored_urls(site):
+    return sorted(doc["source_url"] for doc in site.supabase.tables["provider_documents"])
+
+
+def test_a_recrawl_follows_links_past_stored_pages(site):
+    site.crawl_site(SITE, 7)
+    assert stored_urls(site) == [f"{SITE}/", f"{SITE}/docs"]
+
+    # A page published since the last crawl is only reachable through stored ones
+    site.pages[f"{SITE}/docs/setup"] = "<title>Setup</title>"
+    site.crawl_site(SITE, 7)
+
+    assert stored_urls(site) == [f"{SITE}/", f"{SITE}/docs", f"{SITE}/docs/setup"]
+    assert len(site.supabase.tables["provider_knowledge"]) == 3
@@ -0,0 +1,79 @@
+import pytest
+
+from fake_supabase import FakeSupabase
+from local_functions import transcript_chunker
+from seeder_modules import load_seeder
+
+SEGMENTS = [{"text": f"Sentence number {n} of the episode.", "start": n, "end": n + 1} for n in range(40)]
+URL = "https://open.spotify.com/episode/abc"
+
+
+class Embeddings:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+
+    def get_text_embedding_batch(self, texts):
+        if self.fail:
+            raise RuntimeError("embeddings API down")
+        return [[0.1] for _ in texts]
+
+
+@pytest.fixture(scope="module")
+def spotify():
+    return load_seeder("seed-spotify-universal.py")
+
+
+@pytest.fixture
+def supabase(spotify, monkeypatch):
+    monkeypatch.setattr(transcript_chunker, "tiktoken", None)
+    supabase = FakeSupabase(provider_documents=[], provider_knowledge=[])
+    monkeypatch.setattr(spotify, "supabase", supabase)
+    return supabase
+
+
+def test_a_failed_episode_leaves_no_document_and_is_retried(spotify, supabase, monkeypatch):
+    monkeypatch.setattr(spotify, "embed_model", Embeddings(fail=True))
+
+    assert spotify.store_episode(URL, 7, "Episode", SEGMENTS) is False
+    assert supabase.tables["provider_documents"] == []
+
+    # The next batch run doesn't skip it as already existing
+    monkeypatch.setattr(spotify, "embed_model", Embeddings())
+    assert spotify.store_episode(URL, 7, "Episode", SEGMENTS) is True
+    assert len(supabase.tables["provider_documents"]) == 1
+
+
+def test_a_failed_clone_leaves_no_document(spotify, supabase):
+    # The matched document has no chunks to copy, so the clone raises
+    supabase.tables["provider_documents"].append({"id": 99, "provider_id": 7})
+
+    assert spotify.store_episode(URL, 7, "Episode", None, match={"id": 99, "time_shift": 0.0}) is False
+    assert [row["id"] for row in supabase.tables["provider_documents"]] == [99]
+
+
+@pytest.fixture
+def youtube_audio(monkeypatch, tmp_path):
+    module = load_seeder("seed-youtube-audio.py")
+    monkeypatch.setattr(transcript_chunker, "tiktoken", None)
+    monkeypatch.setattr(module, "supabase", FakeSupabase(provider_documents=[], provider_knowledge=[]))
+    monkeypatch.setattr(module, "download_audio", lambda url, scratch: (str(tmp_path / "a.mp3"), "Talk", "abc", None))
+    monkeypatch.setattr(module, "fingerprint_file", lambda path: None)
+    monkeypatch.setattr(module, "transcribe_audio_with_timestamps", lambda client, path: (SEGMENTS, None))
+    return module
+
+
+def test_youtube_audio_removes_the_document_when_embedding_fails(youtube_audio, monkeypatch):
+    monkeypatch.setattr(youtube_audio, "embed_model", Embeddings(fail=True))
+
+    youtube_audio.seed_youtube_audio("https://www.youtube.com/watch?v=abc", 7)
+
+    assert youtube_audio.supabase.tables["provider_documents"] == []
+
+
+def test_youtube_audio_keeps_a_fully_stored_document(youtube_audio, monkeypatch):
+    monkeypatch.setattr(youtube_audio, "embed_model", Embeddings())
+
+    youtube_audio.seed_youtube_audio("https://www.youtube.com/watch?v=abc", 7)
+
+    assert len(youtube_audio.supabase.tables["provider_documents"]) == 1
+    assert youtube_audio.supabase.tables["provider_knowledge"]
@@ -0,0 +1,73 @@
+import pytest
+
+from fake_supabase import FakeSupabase
+from seeder_modules import load_seeder
+
+BASE = "https://example.substack.com"
+BODY = "<p>" + "A paragraph of a long enough article. " * 20 + "</p>"
+POSTS = [
+    {"id": n, "slug": f"post-{n}", "title": f"Post {n}", "canonical_url": f"{BASE}/p/post-{n}"}
+    for n in (1, 2)
+]
+
+
+class Embeddings:
+    def get_text_embedding_batch(self, texts):
+        return [[0.1] for _ in texts]
+
+
+class Response:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"body_html": self.body}
+
+
+class Scraper:
+    def __init__(self, down=(), paywalled=()):
+        self.down = set(down)
+        self.paywalled = set(paywalled)
+
+    def get(self, url, timeout=None):
+        slug = url.rsplit("/", 1)[-1]
+        if slug in self.down:
+            raise ConnectionError("connection reset")
+        return Response("<p>Subscribe to read</p>" if slug in self.paywalled else BODY)
+
+
+@pytest.fixture
+def substack(monkeypatch):
+    module = load_seeder("seed-substack.py")
+    monkeypatch.setattr(module, "supabase", FakeSupabase(provider_documents=[], provider_knowledge=[]))
+    monkeypatch.setattr(module, "embed_model", Embeddings())
+    monkeypatch.setattr(module, "list_archive_posts", lambda base_url: list(POSTS))
+    return module
+
+
+def stored_urls(module):
+    return sorted(doc["source_url"] for doc in module.supabase.tables["provider_documents"])
+
+
+def test_a_post_that_failed_to_download_is_retried_by_the_next_backfill(substack, monkeypatch):
+    monkeypatch.setattr(substack, "scraper", Scraper(down={"post-2"}))
+    substack.seed_substack(BASE, 7, backfill=True)
+
+    assert stored_urls(substack) == [f"{BASE}/p/post-1"]
+    assert substack.load_feed_state(f"{BASE}/feed")["guids"] == ["1"]
+
+    monkeypatch.setattr(substack, "scraper", Scraper())
+    substack.seed_substack(BASE, 7, backfill=True)
+
+    assert stored_urls(substack) == [f"{BASE}/p/post-1", f"{BASE}/p/post-2"]
+
+
+def test_a_paywalled_post_is_remembered(substack, monkeypatch):
+    monkeypatch.setattr(substack, "scraper", Scraper(paywalled={"post-2"}))
+    substack.seed_substack(BASE, 7, backfill=True)
+
+    assert stored_urls(substack) == [f"{BASE}/p/post-1"]
+    assert substack.load_feed_state(f"{BASE}/feed")["guids"] == ["1", "2"]
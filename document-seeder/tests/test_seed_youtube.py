@@ -0,0 +1,50 @@
+import pytest
+
+from fake_supabase import FakeSupabase
+from local_functions import transcript_chunker
+from seeder_modules import load_seeder
+
+SEGMENTS = [{"text": f"Sentence number {n} of the talk.", "start": n, "end": n + 1} for n in range(40)]
+
+
+class FailingEmbeddings:
+    def get_text_embedding_batch(self, texts):
+        raise RuntimeError("embeddings API down")
+
+
+class Embeddings:
+    def get_text_embedding_batch(self, texts):
+        return [[0.1] for _ in texts]
+
+
+@pytest.fixture(scope="module")
+def seed_youtube():
+    return load_seeder("seed-youtube.py")
+
+
+@pytest.fixture
+def supabase(seed_youtube, monkeypatch):
+    monkeypatch.setattr(transcript_chunker, "tiktoken", None)
+    supabase = FakeSupabase(provider_documents=[], provider_knowledge=[])
+    monkeypatch.setattr(seed_youtube, "supabase", supabase)
+    return supabase
+
+
+def test_a_failed_embed_removes_the_document_so_the_video_is_retried(seed_youtube, supabase, monkeypatch):
+    monkeypatch.setattr(seed_youtube, "embed_model", FailingEmbeddings())
+    url = seed_youtube.watch_url("abcdefghijk")
+
+    assert seed_youtube.store_video("abcdefghijk", url, 7, SEGMENTS, "Talk", None) is False
+
+    assert supabase.tables["provider_documents"] == []
+    assert seed_youtube.fetch_existing_video_ids(7, ["abcdefghijk"]) == set()
+
+
+def test_a_stored_video_counts_as_seeded(seed_youtube, supabase, monkeypatch):
+    monkeypatch.setattr(seed_youtube, "embed_model", Embeddings())
+    url = seed_youtube.watch_url("abcdefghijk")
+
+    assert seed_youtube.store_video("abcdefghijk", url, 7, SEGMENTS, "Talk", None) is True
+
+    assert len(supabase.tables["provider_knowledge"]) >= 1
+    assert [row["source_url"] for row in supabase.tables["provider_documents"]] == [url]
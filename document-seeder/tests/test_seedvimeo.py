@@ -0,0 +1,36 @@
+import pytest
+
+from fake_supabase import FakeSupabase
+from seeder_modules import load_seeder
+
+
+@pytest.fixture(scope="module")
+def seedvimeo():
+    return load_seeder("seedvimeo.py")
+
+
+def test_requeue_clears_everything_derived_from_the_old_recording(seedvimeo, monkeypatch):
+    supabase = FakeSupabase(
+        provider_documents=[
+            {
+                "id": 1,
+                "is_active": True,
+                "seed_checkpoint": {"chunks": 4},
+                "audio_fingerprint": "AAAA",
+                "audio_duration": 90.0,
+                "word_index": {"hello": [0]},
+                "claimed_by": "worker-1",
+            }
+        ],
+        provider_knowledge=[{"id": 10, "document_id": 1}, {"id": 11, "document_id": 2}],
+    )
+    monkeypatch.setattr(seedvimeo, "supabase", supabase)
+
+    seedvimeo.requeue_document(1)
+
+    document = supabase.tables["provider_documents"][0]
+    assert document["is_active"] is False
+    assert document["seed_priority"] == 1
+    for column in ("seed_checkpoint", "audio_fingerprint", "audio_duration", "word_index", "claimed_by"):
+        assert document[column] is None
+    assert [row["document_id"] for row in supabase.tables["provider_knowledge"]] == [2]
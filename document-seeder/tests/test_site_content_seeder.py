@@ -0,0 +1,104 @@
+import pytest
+
+from fake_supabase import FakeSupabase
+from local_functions.leases import LeaseClient
+from memory_leases import MemoryLeaseBackend
+from seeder_modules import load_seeder
+
+
+@pytest.fixture(params=["site-content-seeder.py", "site-content-seeder-dom.py"], scope="module")
+def seeder(request):
+    return load_seeder(request.param)
+
+
+@pytest.fixture
+def site(seeder, monkeypatch):
+    supabase = FakeSupabase(
+        sitemap_feeds=[{"id": 1, "provider_id": 7, "feed_url": "https://example.com/sitemap.xml"}],
+        sitemap_pages=[
+            {"id": 10, "feed_id": 1, "page_url": "https://example.com/done", "processed": "done"},
+            {"id": 11, "feed_id": 1, "page_url": "https://example.com/failed-before", "processed": "failed"},
+            # Seeded before processed was written, and missed by sql/sitemap_pages_processed.sql
+            {"id": 12, "feed_id": 1, "page_url": "https://example.com/legacy", "processed": None},
+        ],
+        site_content=[
+            {"id": 100, "sitemap_page_id": 10, "chunk_text": "done page"},
+            {"id": 101, "sitemap_page_id": 12, "chunk_text": "old legacy chunk"},
+        ],
+    )
+    backend = MemoryLeaseBackend()
+    processed = []
+
+    def extract_page_text(page_url):
+        processed.append(page_url)
+        if "broken" in page_url:
+            raise RuntimeError("parser crashed")
+        return page_url
+
+    monkeypatch.setattr(seeder, "supabase", supabase)
+    monkeypatch.setattr(seeder, "open_leases", lambda: LeaseClient(backend, owner="this-instance"))
+    monkeypatch.setattr(seeder, "extract_page_text", extract_page_text)
+    monkeypatch.setattr(seeder, "chunk_sentences", lambda text, *limits: [f"chunk of {text}"])
+    monkeypatch.setattr(seeder, "embed_chunks", lambda chunks: [[0.1] for _ in chunks])
+    monkeypatch.setattr(seeder, "fetch_page_title", lambda page_url: None)
+    monkeypatch.setattr(seeder.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(
+        seeder,
+        "fetch_sitemap_urls",
+        lambda url: ["https://example.com/done", "https://example.com/new", "https://example.com/broken"],
+    )
+    return supabase, backend, processed
+
+
+def statuses(supabase) -> dict:
+    return {row["page_url"].rsplit("/", 1)[1]: row["processed"] for row in supabase.tables["sitemap_pages"]}
+
+
+def test_sync_stores_new_pages_and_processes_every_pending_page(seeder, site):
+    supabase, backend, processed = site
+
+    seeder.process_provider(7, [1], force=False)
+
+    assert sorted(url.rsplit("/", 1)[1] for url in processed) == ["broken", "failed-before", "legacy", "new"]
+    assert statuses(supabase) == {
+        "done": "done",
+        "failed-before": "done",
+        "legacy": "done",
+        "new": "done",
+        "broken": "failed",
+    }
+    # Every lease, including the failed page's, is released
+    assert not backend.leases
+
+
+def test_reprocessing_a_page_replaces_its_chunks(seeder, site):
+    supabase, backend, processed = site
+
+    seeder.process_provider(7, [1], force=False)
+
+    chunks = {}
+    for row in supabase.tables["site_content"]:
+        chunks.setdefault(row["sitemap_page_id"], []).append(row["chunk_text"])
+    assert chunks[10] == ["done page"]
+    assert chunks[12] == ["chunk of https://example.com/legacy"]
+    assert 11 in chunks and not any("broken" in text for texts in chunks.values() for text in texts)
+
+
+def test_an_instance_that_loses_the_feed_still_processes_stored_pages(seeder, site):
+    supabase, backend, processed = site
+    LeaseClient(backend, owner="other-instance").claim("sitemap_feed", [1])
+
+    seeder.process_provider(7, [1], force=False)
+
+    assert sorted(url.rsplit("/", 1)[1] for url in processed) == ["failed-before", "legacy"]
+    assert len(supabase.tables["sitemap_pages"]) == 3
+
+
+def test_pages_leased_elsewhere_are_skipped(seeder, site):
+    supabase, backend, processed = site
+    LeaseClient(backend, owner="other-instance").claim("sitemap_page", [11])
+
+    seeder.process_provider(7, [1], force=False)
+
+    assert "https://example.com/failed-before" not in processed
+    assert statuses(supabase)["failed-before"] == "failed"
@@ -0,0 +1,81 @@
+import pytest
+
+from local_functions import transcript_chunker
+from local_functions.transcript_chunker import chunk_segments, count_tokens, segment_fields, transcript_text
+
+
+@pytest.fixture(autouse=True)
+def char_tokenizer(monkeypatch):
+    # ~4 chars/token, so budgets below are exact and no BPE file is fetched
+    monkeypatch.setattr(transcript_chunker, "tiktoken", None)
+
+
+def seg(text: str, start: float) -> dict:
+    return {"text": text, "start": start, "end": start + 2}
+
+
+def words(count: int, end: str = "") -> str:
+    """count tokens of text: four characters each."""
+    return "abc " * (count - 1) + "abcd" + end
+
+
+def test_chunks_cover_every_segment_in_order():
+    segments = [seg(words(10, "." if n % 3 == 2 else ""), n * 2) for n in range(60)]
+
+    chunks = list(chunk_segments(segments, max_tokens=100, overlap_tokens=20))
+
+    assert chunks[0]["segmentStart"] == 0
+    assert chunks[-1]["segmentEnd"] == 59
+    for previous, chunk in zip(chunks, chunks[1:]):
+        # Each chunk starts inside or right after the previous one, never past it
+        assert previous["segmentStart"] < chunk["segmentStart"] <= previous["segmentEnd"] + 1
+    assert all(sum(count_tokens(segments[n]["text"]) for n in range(c["segmentStart"], c["segmentEnd"] + 1)) <= 100 for c in chunks)
+
+
+def test_chunks_end_on_a_sentence_when_one_is_in_the_back_half():
+    segments = [seg(words(10, "." if n in (6, 9) else ""), n) for n in range(20)]
+
+    first = next(chunk_segments(segments, max_tokens=100, overlap_tokens=0))
+
+    # Segment 9 ends a sentence at the full budget; 6 is past half too, but 9 is later
+    assert first["segmentEnd"] == 9
+    assert first["content"].endswith(".")
+
+
+def test_overlap_carries_trailing_segments_into_the_next_chunk():
+    segments = [seg(words(10), n) for n in range(30)]
+
+    first, second = list(chunk_segments(segments, max_tokens=100, overlap_tokens=20))[:2]
+
+    assert first["segmentEnd"] == 9
+    assert second["segmentStart"] == 8
+
+
+def test_chunk_offsets_and_timestamps_index_the_transcript():
+    segments = [seg("  Hello there.  ", 0.4), seg("", 2), seg("General Kenobi.", 3.9)]
+    text = transcript_text(segments)
+
+    (chunk,) = chunk_segments(segments)
+
+    assert text == "Hello there. General Kenobi."
+    assert chunk["content"] == text[chunk["charStart"]:]
+    assert (chunk["timestampStart"], chunk["timestampEnd"]) == (0, 5)
+
+
+def test_an_oversized_segment_is_its_own_chunk():
+    segments = [seg(words(5), 0), seg(words(300), 1), seg(words(5), 2)]
+
+    chunks = list(chunk_segments(segments, max_tokens=100, overlap_tokens=10))
+
+    assert [(c["segmentStart"], c["segmentEnd"]) for c in chunks] == [(0, 0), (1, 1), (2, 2)]
+
+
+def test_empty_transcript_has_no_chunks():
+    assert list(chunk_segments([seg(" ", 0)])) == []
+
+
+def test_segment_objects_and_dicts_read_the_same():
+    class Segment:
+        text, start, end = "hi", 1.0, 2.0
+
+    assert segment_fields(Segment()) == segment_fields({"text": "hi", "start": 1.0, "end": 2.0})
@@ -0,0 +1,72 @@
+import pytest
+import requests
+
+from local_functions import url_canonicalizer
+from local_functions.url_canonicalizer import NORMALIZER_VERSION, normalize_url, resolve_many
+
+
+@pytest.mark.parametrize(
+    "raw, normalized",
+    [
+        ("HTTPS://Example.COM/Path/", "https://example.com/Path"),
+        ("https://example.com", "https://example.com/"),
+        ("https://example.com/post#comments", "https://example.com/post"),
+        # Identifying parameters survive, tracking parameters don't
+        ("https://blog.example.com/?p=123&utm_source=x&fbclid=y", "https://blog.example.com/?p=123"),
+        ("https://example.com/page?id=7&ref=home", "https://example.com/page?id=7"),
+        ("https://www.youtube.com/watch?v=abc&t=30s&feature=share", "https://www.youtube.com/watch?v=abc"),
+        ("https://podcasts.apple.com/us/podcast/x/id1?i=99&uo=4", "https://podcasts.apple.com/us/podcast/x/id1?i=99"),
+        ("https://open.spotify.com/episode/abc?si=123", "https://open.spotify.com/episode/abc"),
+        ("https://open.spotify.com/episode/abc?si=1&dlsi=2&nd=1", "https://open.spotify.com/episode/abc"),
+        ("https://youtu.be/x?si=abc&t=5", "https://youtu.be/x"),
+        ("https://youtu.be/x?list=PL1&si=abc", "https://youtu.be/x?list=PL1"),
+        ("https://news.substack.com/p/post?r=abc&showWelcome=true", "https://news.substack.com/p/post"),
+        ("", ""),
+    ],
+)
+def test_normalize_url(raw, normalized):
+    assert normalize_url(raw) == normalized
+
+
+@pytest.fixture
+def redirects(monkeypatch):
+    """Maps URL -> final URL for _follow; counts the lookups made."""
+    monkeypatch.setattr(url_canonicalizer, "_cache", None)
+    table = {}
+    lookups = []
+
+    def follow(url):
+        lookups.append(url)
+        if table.get(url) is None:
+            raise requests.exceptions.ConnectionError(url)
+        return table[url]
+
+    monkeypatch.setattr(url_canonicalizer, "_follow", follow)
+    return table, lookups
+
+
+def test_redirects_are_followed_once_and_cached(redirects):
+    table, lookups = redirects
+    table["https://short.example/a"] = "https://Example.com/a/?utm_source=x"
+
+    assert resolve_many(["https://short.example/a"] * 2) == {"https://short.example/a": "https://example.com/a"}
+    assert resolve_many(["https://short.example/a"]) == {"https://short.example/a": "https://example.com/a"}
+    assert lookups == ["https://short.example/a"]
+
+
+def test_failed_lookups_fall_back_to_the_normalized_input(redirects):
+    table, lookups = redirects
+
+    assert resolve_many(["https://down.example/b/"]) == {"https://down.example/b/": "https://down.example/b"}
+
+
+def test_entries_from_another_normalizer_version_are_ignored(redirects, monkeypatch):
+    table, lookups = redirects
+    table["https://short.example/a"] = "https://example.com/a?p=1"
+    resolve_many(["https://short.example/a"])
+
+    monkeypatch.setattr(url_canonicalizer, "_cache", None)
+    monkeypatch.setattr(url_canonicalizer, "NORMALIZER_VERSION", NORMALIZER_VERSION + 1)
+    resolve_many(["https://short.example/a"])
+
+    assert len(lookups) == 2
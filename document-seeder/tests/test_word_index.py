@@ -0,0 +1,61 @@
+from array import array
+
+from fake_supabase import FakeSupabase
+from local_functions.word_index import WordIndex, build_word_index, media_time_for_match, save_word_index
+
+
+def seg(text: str, start: float) -> dict:
+    return {"text": text, "start": start, "end": start + 1}
+
+
+def word(text: str, start: float) -> dict:
+    return {"word": text, "start": start}
+
+
+SEGMENTS = [seg("Hello there,", 0), seg("general Kenobi.", 1.5)]
+WORDS = [word(" Hello", 0.0), word(" there,", 0.6), word(" General", 1.5), word(" Kenobi", 2.1)]
+
+
+def test_words_are_aligned_to_their_transcript_offsets():
+    index = build_word_index(SEGMENTS, WORDS)
+
+    # transcript_text: "Hello there, general Kenobi."
+    assert list(index.offsets) == [0, 6, 13, 21]
+    assert index.time_at(22) == 2.1
+    assert index.time_in_chunk(13, 2) == 1.5
+
+
+def test_misheard_words_are_skipped_without_derailing_the_rest():
+    words = [word("Hello", 0.0), word("zzz", 0.3), word("there", 0.6), word("Kenobi", 2.1)]
+
+    index = build_word_index(SEGMENTS, words)
+
+    assert list(index.offsets) == [0, 6, 21]
+
+
+def test_times_never_go_backwards():
+    words = [word("Hello", 1.0), word("there", 0.5)]
+
+    assert list(build_word_index(SEGMENTS, words).times_ms) == [1000, 1000]
+
+
+def test_encode_round_trips_large_deltas():
+    index = WordIndex(array("I", [0, 5, 200_000]), array("I", [0, 100, 90_000_000]))
+
+    decoded = WordIndex.decode(index.encode())
+
+    assert list(decoded.offsets) == list(index.offsets)
+    assert list(decoded.times_ms) == list(index.times_ms)
+
+
+def test_unknown_versions_decode_to_an_empty_index():
+    assert len(WordIndex.decode({"v": 99})) == 0
+    assert WordIndex.decode(None).time_at(10) is None
+
+
+def test_match_time_falls_back_to_the_chunk_start():
+    supabase = FakeSupabase(provider_documents=[{"id": 1}, {"id": 2}])
+    save_word_index(supabase, 1, build_word_index(SEGMENTS, WORDS))
+
+    assert media_time_for_match(supabase, 1, {"charStart": 13, "timestampStart": 1}, 9) == 2.1
+    assert media_time_for_match(supabase, 2, {"charStart": 0, "timestampStart": 7}, 3) == 7
@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+from local_functions import job_queue, worker_runtime
+from local_functions.worker_runtime import WorkerRuntime, validate_job
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    folder = tmp_path / "uploads"
+    folder.mkdir()
+    monkeypatch.setattr(worker_runtime, "UPLOAD_DIRS", [str(folder)])
+    return folder
+
+
+def test_integer_params_sent_as_strings_are_converted():
+    params = {"url": "https://example.com", "provider_id": "12", "workers": "4"}
+
+    assert validate_job("site", params) is None
+    assert params["provider_id"] == 12 and params["workers"] == 4
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"provider_id": "twelve"},
+        {"provider_id": True},
+        {"provider_id": 0},
+        {"provider_id": 12, "workers": -1},
+        {"provider_id": 12, "workers": 1000},
+        {"provider_id": 12, "document_id": 1.5},
+    ],
+)
+def test_bad_integer_params_are_rejected(params):
+    assert validate_job("site", {"url": "https://example.com", **params})
+
+
+def test_pdf_must_come_from_the_upload_dir(upload_dir, tmp_path):
+    (upload_dir / "report.pdf").write_bytes(b"%PDF")
+
+    assert validate_job("pdf", {"file_path": str(upload_dir / "report.pdf"), "provider_id": 1}) is None
+    assert validate_job("pdf", {"file_path": "/etc/passwd", "provider_id": 1})
+    assert validate_job("pdf", {"file_path": str(upload_dir / ".." / "report.pdf"), "provider_id": 1})
+
+
+def test_pdf_symlink_out_of_the_upload_dir_is_rejected(upload_dir, tmp_path):
+    (tmp_path / "secret.pdf").write_bytes(b"%PDF")
+    (upload_dir / "link.pdf").symlink_to(tmp_path / "secret.pdf")
+
+    assert validate_job("pdf", {"file_path": str(upload_dir / "link.pdf"), "provider_id": 1})
+
+
+def echo_worker(conn, max_tasks):
+    for _ in range(max_tasks):
+        job_id, job_type, params, db_path = conn.recv()
+        conn.send({"error": None, "progress": {"lines": 0}, "log_tail": [job_id]})
+
+
+def hanging_worker(conn, max_tasks):
+    conn.recv()
+    time.sleep(600)
+
+
+@pytest.fixture
+def job_logs(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_LOG_DIR", str(tmp_path / "logs"))
+
+
+def test_workers_are_recycled_after_max_tasks(monkeypatch, job_logs):
+    monkeypatch.setattr(worker_runtime, "_worker_main", echo_worker)
+    runtime = WorkerRuntime(workers=1, max_tasks_per_child=2)
+    try:
+        first = runtime._idle.queue[0].process
+        assert [runtime.run(f"job-{n}", "site", {}, "")["log_tail"] for n in range(3)] == [["job-0"], ["job-1"], ["job-2"]]
+        assert runtime._idle.queue[0].process is not first
+        assert not first.is_alive()
+    finally:
+        runtime.shutdown()
+
+
+def test_a_job_past_its_timeout_has_its_worker_killed(monkeypatch, job_logs):
+    monkeypatch.setattr(worker_runtime, "_worker_main", hanging_worker)
+    monkeypatch.setattr(worker_runtime, "KILL_GRACE_SECONDS", 1)
+    runtime = WorkerRuntime(workers=1, timeout_seconds=0)
+    try:
+        stuck = runtime._idle.queue[0].process
+        result = runtime.run("stuck", "site", {}, "")
+
+        assert "worker killed" in result["error"]
+        assert result["progress"]["failed"] == 1
+        assert not stuck.is_alive()
+        assert runtime._idle.queue[0].process.is_alive()
+    finally:
+        for worker in list(runtime._idle.queue):
+            worker.stop(kill=True)